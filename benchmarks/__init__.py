@@ -0,0 +1,5 @@
+"""
+Benchmarks for the Excel Monitor application.
+
+Run from the project root, e.g. ``python -m benchmarks.bench_batch_sync``.
+"""
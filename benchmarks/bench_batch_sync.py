@@ -0,0 +1,51 @@
+"""
+Rows/second of the batched row sync at different batch sizes.
+
+Sends sensor rows shaped like PCRZb_231113.csv to the local stub server.
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from benchmarks.stub_server import StubServer
+from modules.sync_client import BatchSyncClient
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'PCRZb_231113.csv')
+
+
+def load_rows(count: int):
+    """Repeat the sample export until it has the requested number of rows"""
+    df = pd.read_csv(SAMPLE_FILE)
+    repeats = count // len(df) + 1
+    return pd.concat([df] * repeats, ignore_index=True).iloc[:count].to_dict('records')
+
+
+def run(batch_sizes, rows, compress=True):
+    records = load_rows(rows)
+    server = StubServer().start()
+    try:
+        for batch_size in batch_sizes:
+            client = BatchSyncClient(server.url, 'benchmark', max_rows=batch_size,
+                                     max_bytes=64 * 1024 * 1024, compress=compress)
+            server.rows = 0
+            start = time.perf_counter()
+            sent = client.send_rows('benchmark', records)
+            elapsed = time.perf_counter() - start
+            client.close()
+            assert server.rows == sent
+            print(f"batch={batch_size:>5}  rows={sent:>6}  {elapsed:7.2f}s  "
+                  f"{sent / elapsed:10.0f} rows/s")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--no-compress', action='store_true')
+    args = parser.parse_args()
+    run(args.batch_sizes, args.rows, compress=not args.no_compress)
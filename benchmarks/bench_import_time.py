@@ -0,0 +1,83 @@
+"""
+Import time of the entry points, from `python -X importtime`.
+
+Imports each entry point in a fresh interpreter, reports the median total
+import time and the modules that took longest, and names any heavy
+dependency (pandas, requests, openpyxl, ...) loaded at import although it
+should only load at first use. It exits with status 1 if an entry point
+takes longer than --budget-ms (DEFAULT_BUDGET_MS by default, 0 to only
+report) or loads a heavy dependency, so it can guard a build against
+startup regressions. The build workflow runs it as its own step; the
+timing depends on the machine, so the test suite only checks the lazy
+imports (tests/test_lazy_imports.py).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed once a file is monitored, synced or read as a workbook
+LAZY_MODULES = ('pandas', 'numpy', 'requests', 'watchdog')
+WORKBOOK_MODULES = ('openpyxl', 'xlrd', 'pyxlsb')
+
+# Median import time no entry point may exceed, about twice the slowest today
+DEFAULT_BUDGET_MS = 1000
+
+# Entry point module and the dependencies it must not load at import
+ENTRY_POINTS = {
+    'gui': ('main', LAZY_MODULES + WORKBOOK_MODULES),
+    'headless': ('modules.headless', WORKBOOK_MODULES),
+}
+
+
+def import_times(code: str) -> dict:
+    """Return {module: (self_us, cumulative_us)} of the imports made running `code`"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        check=True, capture_output=True, text=True, cwd=ROOT,
+        env=dict(os.environ, QT_QPA_PLATFORM='offscreen')).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def run(entry_points: list, runs: int, top: int, budget_ms: float = None) -> bool:
+    within_budget = True
+    # Modules every interpreter imports at startup (site, .pth files) are not ours
+    startup = set(import_times('pass'))
+    for entry in entry_points:
+        module, lazy = ENTRY_POINTS[entry]
+        samples = [import_times(f'import {module}') for _ in range(runs)]
+        total_ms = statistics.median(times[module][1] for times in samples) / 1000
+        times = {name: value for name, value in samples[-1].items() if name not in startup}
+        eager = [name for name in lazy if name in times]
+        print(f"{entry:>9}: import {module} {total_ms:7.1f} ms"
+              + (f"  (budget {budget_ms:.0f} ms)" if budget_ms else ""))
+        heaviest = sorted(((cumulative, name) for name, (_, cumulative) in times.items()
+                           if name.count('.') == 0 and name != module), reverse=True)
+        for cumulative, name in heaviest[:top]:
+            print(f"           {name:<30} {cumulative / 1000:7.1f} ms")
+        if eager:
+            print(f"           loaded at import: {', '.join(eager)}")
+        if budget_ms and (total_ms > budget_ms or eager):
+            within_budget = False
+    return within_budget
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entry', nargs='+', choices=sorted(ENTRY_POINTS),
+                        default=sorted(ENTRY_POINTS))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+    if not run(args.entry, args.runs, args.top, args.budget_ms):
+        sys.exit(1)
@@ -0,0 +1,63 @@
+"""
+Rows/second and latency of the outbox sync with 1..N requests in flight.
+
+Queues rows of several files in a fresh outbox and drains it through
+CloudSync against the local stub server, which answers each request after a
+fixed delay standing in for network and server time.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.stub_server import StubServer
+from modules.outbox import Outbox
+from modules.sync_client import CloudSync
+
+
+class Settings:
+    def __init__(self, **values):
+        self.values = values
+
+    def value(self, key, default=None):
+        return self.values.get(key, default)
+
+
+def run(in_flight, rows, files, batch_rows, delay_ms):
+    server = StubServer(delay=delay_ms / 1000).start()
+    try:
+        for limit in in_flight:
+            directory = tempfile.mkdtemp()
+            outbox = Outbox(os.path.join(directory, 'outbox.db'))
+            for index in range(files):
+                payloads = [b'{"A": %d, "B": "sensor"}' % i for i in range(rows // files)]
+                outbox.append(f'file-{index}', f'file-{index}', payloads)
+            settings = Settings(api_url=server.url, api_key='benchmark',
+                                sync_batch_rows=batch_rows, sync_in_flight=limit)
+            sync = CloudSync(settings, outbox)
+            start = time.perf_counter()
+            sync.start()
+            while outbox.pending():
+                time.sleep(0.005)
+            elapsed = time.perf_counter() - start
+            stats = sync.stats()
+            sync.stop()
+            outbox.close()
+            shutil.rmtree(directory)
+            print(f"in_flight={limit:>3}  requests={stats['requests']:>5}  {elapsed:6.2f}s  "
+                  f"{stats['rows'] / elapsed:9.0f} rows/s  "
+                  f"p50 {stats['latency_p50_ms']:6.1f} ms  p95 {stats['latency_p95_ms']:6.1f} ms")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--in-flight', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--batch-rows', type=int, default=500)
+    parser.add_argument('--delay-ms', type=float, default=50)
+    args = parser.parse_args()
+    run(args.in_flight, args.rows, args.files, args.batch_rows, args.delay_ms)
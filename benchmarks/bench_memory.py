@@ -0,0 +1,105 @@
+"""
+Resident memory of monitoring many files: retained DataFrames vs FileState.
+
+Writes N sensor exports with 50 float tag columns, then measures the RSS
+growth of loading all of them in a fresh interpreter, once keeping the last
+parsed frame per file (the old ``last_content``) and once keeping only the
+per-file FileState of a FileMonitor.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+def rss_bytes() -> int:
+    """Current resident set size, or the peak where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def write_files(directory: str, count: int, rows: int, columns: int = 50):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(100, 5, size=(rows, columns)).round(3),
+                      columns=[f"TI-{500 + i}" for i in range(columns)])
+    df.insert(0, 'TIME', '12:00:00 AM')
+    df.insert(0, 'DATE', '11/13/2023')
+    first = os.path.join(directory, 'sensor_0.csv')
+    df.to_csv(first, index=False)
+    paths = [first]
+    for i in range(1, count):
+        path = os.path.join(directory, f'sensor_{i}.csv')
+        shutil.copyfile(first, path)
+        paths.append(path)
+    return paths
+
+
+class NullSettings:
+    def value(self, key, default=None):
+        return default
+
+
+def measure(mode: str, directory: str):
+    """Load every file in `directory` the given way and print the RSS growth"""
+    from modules.file_monitor import FileMonitor
+    from modules.outbox import Outbox
+
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.endswith('.csv'))
+    outbox = Outbox(os.path.join(directory, 'outbox.db'))
+    gc.collect()
+    before = rss_bytes()
+
+    kept = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path in paths:
+            if mode == 'frames':
+                kept.append(pd.read_csv(path))
+            else:
+                monitor = FileMonitor(path, NullSettings(), outbox)
+                monitor.initialize()
+                kept.append(monitor)
+    gc.collect()
+    print(rss_bytes() - before)
+
+
+def run(files: int, rows: int):
+    directory = tempfile.mkdtemp()
+    try:
+        write_files(directory, files, rows)
+        results = {}
+        for mode in ('frames', 'state'):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_memory', '--measure', mode, directory],
+                check=True, capture_output=True, text=True).stdout
+            results[mode] = int(output.split()[-1])
+            print(f"{mode:>6}: {results[mode] / 2 ** 20:8.1f} MiB for {files} files "
+                  f"x {rows} rows")
+        print(f"saved: {(results['frames'] - results['state']) / 2 ** 20:8.1f} MiB")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--measure', nargs=2, metavar=('MODE', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure)
+    else:
+        run(args.files, args.rows)
@@ -0,0 +1,122 @@
+"""
+GUI responsiveness while a large file is re-parsed: thread vs process parsing.
+
+Writes a CSV export of about N MB, takes it as the monitor's baseline, then
+edits its first row so the next check re-reads and diffs the whole file.
+That check runs on a background thread, as on the MonitorManager's parse
+pool, while a Qt event loop on the main thread runs a 5 ms timer. Each
+timer tick that fires late measures how long the event loop was stalled:
+
+- thread: the parse runs in the background thread itself
+- process: the background thread hands the parse to a worker process
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MODES = ('thread', 'process')
+TICK_MS = 5
+
+
+class Settings:
+    def value(self, key, default=None):
+        return default
+
+
+def write_csv(path: str, megabytes: int):
+    row = "11/13/2023,12:08:28 PM," + ",".join(f"{100 + i / 10:.3f}" for i in range(10)) + "\n"
+    rows = megabytes * 2 ** 20 // len(row)
+    with open(path, 'w') as f:
+        f.write("DATE,TIME," + ",".join(f"TI-{500 + i}" for i in range(10)) + "\n")
+        for _ in range(rows // 10000):
+            f.write(row * 10000)
+
+
+def measure(mode: str, path: str):
+    from PySide6.QtCore import QCoreApplication, QTimer
+    from modules.file_monitor import FileMonitor
+    from modules.outbox import Outbox
+    from modules.parse_jobs import ParseBackend
+
+    directory = tempfile.mkdtemp()
+    backend = ParseBackend(1 if mode == 'process' else 0)
+    outbox = Outbox(os.path.join(directory, 'outbox.db'))
+    try:
+        monitor = FileMonitor(path, Settings(), outbox, parse_backend=backend)
+        monitor.initialize()
+        # Edit the first row in place, so the whole file has to be re-read
+        with open(path, 'r+b') as f:
+            f.seek(len(f.readline()))
+            f.write(b'11/14')
+
+        app = QCoreApplication.instance() or QCoreApplication([])
+        stalls = []
+        last = [time.perf_counter()]
+
+        elapsed = []
+
+        def parse():
+            start = time.perf_counter()
+            monitor.check_excel_changes()
+            elapsed.append(time.perf_counter() - start)
+
+        worker = threading.Thread(target=parse)
+
+        def tick():
+            now = time.perf_counter()
+            stalls.append(max(0.0, (now - last[0]) * 1000 - TICK_MS))
+            last[0] = now
+            if elapsed:
+                app.quit()
+
+        timer = QTimer()
+        timer.timeout.connect(tick)
+        timer.start(TICK_MS)
+        worker.start()
+        app.exec()
+        worker.join()
+        stalls.sort()
+        p99 = stalls[int(len(stalls) * 0.99)] if stalls else 0.0
+        print(f"{elapsed[0]} {max(stalls, default=0.0)} {p99} {sum(stalls)} "
+              f"{monitor.parse_count}")
+    finally:
+        backend.shutdown()
+        outbox.close()
+        shutil.rmtree(directory)
+
+
+def run(megabytes: int):
+    directory = tempfile.mkdtemp()
+    try:
+        source = os.path.join(directory, 'source.csv')
+        print(f"Writing {megabytes} MB CSV...")
+        write_csv(source, megabytes)
+        for mode in MODES:
+            path = os.path.join(directory, f'{mode}.csv')
+            shutil.copyfile(source, path)
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_parse_stall', '--measure', mode, path],
+                check=True, capture_output=True, text=True,
+                env=dict(os.environ, QT_QPA_PLATFORM='offscreen')).stdout
+            elapsed, worst, p99, total, parses = output.split()[-5:]
+            print(f"{mode:>8}: parse {float(elapsed):6.2f}s  worst stall {float(worst):7.1f} ms  "
+                  f"p99 {float(p99):6.1f} ms  stalled {float(total) / 1000:5.2f}s  "
+                  f"parses={parses}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mb', type=int, default=100)
+    parser.add_argument('--measure', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure[0], args.measure[1])
+    else:
+        run(args.mb)
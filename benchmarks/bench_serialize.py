@@ -0,0 +1,72 @@
+"""
+Time to turn a block of new rows into payloads, per 10k rows.
+
+Rows shaped like PCRZb_231113.csv, with `--missing` of the sensor values
+blanked out, are serialised three ways:
+
+- iterrows: the old monitor path, a Series and dict per row for the log and
+  to_dict('records') plus json.dumps(default=str) for the outbox
+- to_dict: to_dict('records') plus json.dumps(default=str) alone
+- encode_rows: the column-wise encoder, whose payloads also feed the log
+
+Payloads that are not strict JSON (bare NaN or Infinity) are counted.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_batch_sync import SAMPLE_FILE
+from modules.sync_client import encode_rows
+
+
+def load_frame(count: int, missing: float) -> pd.DataFrame:
+    df = pd.read_csv(SAMPLE_FILE)
+    df = pd.concat([df] * (count // len(df) + 1), ignore_index=True).iloc[:count]
+    numeric = df.select_dtypes('number').columns
+    df[numeric] = df[numeric].astype('float64').mask(
+        np.random.default_rng(0).random((len(df), len(numeric))) < missing)
+    return df
+
+
+def iterrows(df: pd.DataFrame) -> list:
+    log = [f"Row {index + 1}: {row.to_dict()}" for index, row in df.iterrows()]
+    return to_dict(df) if log else []
+
+
+def to_dict(df: pd.DataFrame) -> list:
+    return [json.dumps(row, default=str).encode('utf-8') for row in df.to_dict('records')]
+
+
+def invalid(payloads) -> int:
+    def strict(constant):
+        raise ValueError(constant)
+    count = 0
+    for payload in payloads:
+        try:
+            json.loads(payload, parse_constant=strict)
+        except ValueError:
+            count += 1
+    return count
+
+
+def run(rows: int, missing: float):
+    df = load_frame(rows, missing)
+    scale = 10000 / rows
+    for name, encode in (('iterrows', iterrows), ('to_dict', to_dict),
+                         ('encode_rows', encode_rows)):
+        start = time.perf_counter()
+        payloads = encode(df)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>12}: {elapsed * scale * 1000:8.1f} ms per 10k rows  "
+              f"invalid JSON rows={invalid(payloads)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--missing', type=float, default=0.01)
+    args = parser.parse_args()
+    run(args.rows, args.missing)
@@ -0,0 +1,99 @@
+"""
+Startup time and memory of the GUI against the headless monitor.
+
+Each run starts a fresh interpreter that imports its entry point, starts
+monitoring one small CSV file and reports once the file is being monitored:
+
+- gui: main.MainWindow on an offscreen Qt platform
+- headless: modules.headless, without Qt
+
+Reported are the median wall time from spawning the process to that point
+and the median peak resident set size (Unix only).
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ('gui', 'headless')
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def wait_monitoring(manager, process_events=None):
+    while not any(s['status'] == "Monitoring" for s in manager.file_status()):
+        if process_events:
+            process_events()
+        time.sleep(0.005)
+
+
+def measure(mode: str, path: str, spawned: float):
+    directory = os.path.dirname(path)
+    os.environ['EXCEL_MONITOR_OUTBOX_PATH'] = os.path.join(directory, f'{mode}.db')
+    if mode == 'gui':
+        from PySide6.QtWidgets import QApplication
+        app = QApplication([])
+        import main
+        window = main.MainWindow()
+        window.show()
+        window.start_monitoring(path)
+        wait_monitoring(window.monitor.manager, app.processEvents)
+        ready = time.time() - spawned
+        window.monitor.stop()
+    else:
+        from modules.config import ConfigSettings
+        from modules.headless import create_manager
+        manager = create_manager(ConfigSettings())
+        manager.add_file(path)
+        manager.start()
+        wait_monitoring(manager)
+        ready = time.time() - spawned
+        manager.stop()
+    print(f"{ready} {peak_rss_mb()}")
+
+
+def run(runs: int):
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'startup.csv')
+        with open(path, 'w') as f:
+            f.write("A,B,C\n" + "1,2,3\n" * 100)
+        for mode in MODES:
+            times, peaks = [], []
+            for _ in range(runs):
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_startup', '--measure', mode, path,
+                     repr(time.time())],
+                    check=True, capture_output=True, text=True,
+                    env=dict(os.environ, QT_QPA_PLATFORM='offscreen')).stdout
+                ready, peak = output.split()[-2:]
+                times.append(float(ready))
+                peaks.append(float(peak))
+            print(f"{mode:>9}: ready in {statistics.median(times) * 1000:7.0f} ms  "
+                  f"peak RSS {statistics.median(peaks):6.1f} MB")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--measure', nargs=3, metavar=('MODE', 'PATH', 'SPAWNED'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure[0], args.measure[1], float(args.measure[2]))
+    else:
+        run(args.runs)
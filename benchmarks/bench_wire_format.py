@@ -0,0 +1,52 @@
+"""
+Bytes on the wire and encode time per 10k rows: JSON rows vs columnar batches.
+
+Rows shaped like PCRZb_231113.csv are queued the way the monitor queues them
+(one JSON document per row), then turned into request bodies of
+`--batch-rows` rows each, as the sender does. Encode time covers building
+the bodies, and the gzip time compressing them.
+"""
+import argparse
+import gzip
+import time
+
+from benchmarks.bench_batch_sync import load_rows
+from modules.sync_client import BatchSyncClient, encode_rows
+from modules.wire_format import encode_columnar
+
+FORMATS = ('json', 'columnar')
+
+
+def run(rows, batch_rows):
+    payloads = encode_rows(load_rows(rows))
+    batches = [payloads[i:i + batch_rows] for i in range(0, len(payloads), batch_rows)]
+    client = BatchSyncClient('http://localhost', 'benchmark')
+    scale = 10000 / len(payloads)
+    try:
+        for wire_format in FORMATS:
+            start = time.perf_counter()
+            if wire_format == 'json':
+                bodies = [client.build_payload('benchmark', batch, seq=i)
+                          for i, batch in enumerate(batches)]
+            else:
+                bodies = [encode_columnar('benchmark', batch, seq=i)
+                          for i, batch in enumerate(batches)]
+            encoded = time.perf_counter() - start
+            start = time.perf_counter()
+            compressed = [gzip.compress(body, compresslevel=6) for body in bodies]
+            zipped = time.perf_counter() - start
+            raw = sum(map(len, bodies)) * scale
+            wire = sum(map(len, compressed)) * scale
+            print(f"{wire_format:>9}: {raw / 1024:8.0f} KiB raw  {wire / 1024:7.0f} KiB gzip  "
+                  f"encode {encoded * scale * 1000:6.1f} ms  gzip {zipped * scale * 1000:6.1f} ms"
+                  f"  (per 10k rows)")
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--batch-rows', type=int, default=500)
+    args = parser.parse_args()
+    run(args.rows, args.batch_rows)
@@ -0,0 +1,89 @@
+"""
+Reading a large .xlsx sheet: pd.read_excel vs the streaming XlsxSheetReader.
+
+Writes a workbook with N rows of sensor-like data, then times each way of
+reading it in a fresh interpreter and reports its peak RSS:
+
+- read_excel: the whole sheet through pandas, as before
+- stream_full: every row hashed for change detection, no DataFrame built
+- stream_tail: only the last 100 rows, skipping the rest unparsed
+"""
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MODES = ('read_excel', 'stream_full', 'stream_tail')
+TAIL_ROWS = 100
+
+
+def write_workbook(path: str, rows: int, columns: int):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Data')
+    sheet.append(['TIMESTAMP'] + [f"TI-{500 + i}" for i in range(columns - 1)])
+    start = datetime(2023, 11, 13)
+    for row in range(rows):
+        sheet.append([start + timedelta(seconds=2 * row)] +
+                     [round(100 + ((row * 31 + i * 17) % 997) / 10, 3) for i in range(columns - 1)])
+    workbook.save(path)
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(mode: str, path: str, rows: int):
+    import numpy as np
+    import pandas as pd
+    from modules.xlsx_reader import XlsxSheetReader
+
+    start = time.perf_counter()
+    if mode == 'read_excel':
+        count = len(pd.read_excel(path, sheet_name='Data'))
+    elif mode == 'stream_full':
+        reader = XlsxSheetReader(path, 'Data')
+        _, _, hashes, count = reader.scan(np.empty(0, dtype=np.uint64), keep_rows=False)
+    else:
+        count = len(XlsxSheetReader(path, 'Data').read_rows(rows - TAIL_ROWS))
+    print(f"{time.perf_counter() - start} {peak_rss_mib()} {count}")
+
+
+def run(rows: int, columns: int, workbook: str = None):
+    directory = tempfile.mkdtemp()
+    try:
+        path = workbook or os.path.join(directory, 'bench.xlsx')
+        if not os.path.exists(path):
+            print(f"Writing {rows} x {columns} workbook...")
+            write_workbook(path, rows, columns)
+        print(f"{os.path.getsize(path) / 2 ** 20:.1f} MiB workbook")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_xlsx_read', '--measure', mode, path,
+                 '--rows', str(rows)],
+                check=True, capture_output=True, text=True).stdout
+            elapsed, peak, count = output.split()[-3:]
+            print(f"{mode:>12}: {float(elapsed):7.2f}s  peak RSS {float(peak):7.1f} MiB  "
+                  f"rows={count}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--workbook', help="reuse (or create) this workbook file")
+    parser.add_argument('--measure', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure[0], args.measure[1], args.rows)
+    else:
+        run(args.rows, args.columns, args.workbook)
@@ -0,0 +1,155 @@
+"""
+Local stand-in for the cloud file-management API.
+
+Accepts the upload and row sync requests the monitor sends, counts the rows it
+receives and answers with a small JSON body. Meant for benchmarks and manual
+testing only.
+"""
+import gzip
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules.wire_format import COLUMNAR_CONTENT_TYPE, decode_columnar
+
+
+CHUNK_URL = re.compile(r'/api/file-management/files/([^/]+)/chunks/(?:(\d+)/)?$')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+
+        rows = 0
+        payload = {}
+        content_type = self.headers.get('Content-Type', '')
+        if not self.server.bulk and self.path.endswith('/bulk/'):
+            self.send_json({'error': 'not found'}, status=404)
+            return
+        if content_type.startswith('application/json'):
+            payload = json.loads(body)
+            rows = len(payload.get('rows', [])) or int('update_data' in payload)
+        elif content_type == COLUMNAR_CONTENT_TYPE:
+            if not self.server.columnar:
+                self.send_json({'error': 'unsupported media type'}, status=415)
+                return
+            payload = decode_columnar(body)
+            rows = len(payload['rows'])
+
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        with self.server.lock:
+            throttled = self.server.throttle > 0
+            self.server.throttle -= throttled
+        if throttled:
+            self.send_json({'error': 'slow down'}, status=429,
+                           headers={'Retry-After': str(self.server.retry_after)})
+            return
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.rows += rows
+            self.server.bytes += length
+            if 'seq' in payload:
+                self.server.batches.append((payload['file_id'], payload['seq'], rows))
+            self.server.formats[content_type] = self.server.formats.get(content_type, 0) + 1
+
+        self.send_json({'status': 'success', 'rows': rows})
+
+    def do_PUT(self):
+        """Receive one chunk of a chunked upload"""
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        match = CHUNK_URL.match(self.path)
+        if not match or match.group(2) is None:
+            self.send_json({'error': 'not found'}, status=404)
+            return
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.bytes += length
+            self.server.chunks.setdefault(match.group(1), set()).add(int(match.group(2)))
+        self.send_json({'status': 'success'})
+
+    def do_GET(self):
+        """List the chunks received so far for a file"""
+        match = CHUNK_URL.match(self.path)
+        if not match:
+            self.send_json({'error': 'not found'}, status=404)
+            return
+        with self.server.lock:
+            chunks = sorted(self.server.chunks.get(match.group(1), ()))
+        self.send_json({'chunks': chunks})
+
+    def send_json(self, payload, status=200, headers=None):
+        response = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Stub API answering every row sync request after `delay` seconds
+
+    `batches` records the (file_id, seq, rows) of every sequenced batch in
+    the order the responses were sent. The next `throttle` row sync requests
+    are answered with 429 and a Retry-After of `retry_after` seconds.
+    Columnar batches are refused with 415 unless `columnar` is set, the
+    bulk row endpoint answers 404 unless `bulk` is set, and `formats` counts
+    the accepted requests per content type.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, delay: float = 0.0,
+                 columnar: bool = True, bulk: bool = True):
+        super().__init__((host, port), StubHandler)
+        self.delay = delay
+        self.columnar = columnar
+        self.bulk = bulk
+        self.formats = {}
+        self.throttle = 0
+        self.retry_after = 1
+        self.batches = []
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+        self.bytes = 0
+        self.chunks = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests on a background thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    server = StubServer(port=8000)
+    print(f"Stub API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,10 +1,23 @@
 import PyInstaller.__main__
+import argparse
 import os
 import shutil
 import sys
 
-def build_executable():
-    print("Starting build process...")
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+def build_executable(onedir=False):
+    """Build dist/ExcelMonitor.exe, or dist/ExcelMonitor/ with `onedir`
+
+    A --onefile executable unpacks all of Python, Qt and pandas to a
+    temporary directory on every launch. The --onedir build is a folder that
+    starts without that extraction, at the cost of shipping many files.
+    """
+    print(f"Starting {'onedir' if onedir else 'onefile'} build process...")
     
     # Clean previous builds
     print("Cleaning previous builds...")
@@ -19,7 +32,7 @@ def build_executable():
         PyInstaller.__main__.run([
             'main.py',
             '--name=ExcelMonitor',
-            '--onefile',
+            '--onedir' if onedir else '--onefile',
             '--windowed',
             '--icon=app_icon.ico',
             '--add-data=README.md;.',
@@ -29,7 +42,10 @@ def build_executable():
         ])
         
         # Verify the executable was created
-        exe_path = os.path.join('dist', 'ExcelMonitor.exe')
+        if onedir:
+            exe_path = os.path.join('dist', 'ExcelMonitor', 'ExcelMonitor.exe')
+        else:
+            exe_path = os.path.join('dist', 'ExcelMonitor.exe')
         if os.path.exists(exe_path):
             print(f"Successfully created executable at: {exe_path}")
             print(f"File size: {os.path.getsize(exe_path) / 1024 / 1024:.2f} MB")
@@ -38,7 +54,7 @@ def build_executable():
             print("\nFiles in dist directory:")
             for file in os.listdir('dist'):
                 file_path = os.path.join('dist', file)
-                size_mb = os.path.getsize(file_path) / 1024 / 1024
+                size_mb = directory_size(file_path) / 1024 / 1024
                 print(f"  - {file}: {size_mb:.2f} MB")
         else:
             print("Error: Executable was not created!")
@@ -55,4 +71,7 @@ def build_executable():
         sys.exit(1)
 
 if __name__ == "__main__":
-    build_executable() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the ExcelMonitor executable")
+    parser.add_argument('--onedir', action='store_true',
+                        help="build a folder instead of a single self-extracting executable")
+    build_executable(parser.parse_args().onedir) 
\ No newline at end of file
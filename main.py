@@ -1,12 +1,13 @@
 import sys
 import os
-from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox
+import logging
+import multiprocessing
+from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QInputDialog
 from PySide6.QtCore import Qt, QSettings, QTimer
 from PySide6.QtGui import QIcon
-from modules.monitor import ExcelMonitor
+from modules.event_bridge import format_counters
 from modules.settings import SettingsDialog
-from modules.file_handler import ExcelHandler
-from modules.logger import Logger
+from modules.logger import Logger, setup_logging
 from ui.main_window import Ui_MainWindow
 
 class MainWindow(QMainWindow):
@@ -35,7 +36,7 @@ class MainWindow(QMainWindow):
                 border: 1px solid #cccccc;
                 padding: 5px;
             }
-            QTextEdit {
+            QListView {
                 background-color: #ffffff;
                 border: 1px solid #cccccc;
                 color: #000000;
@@ -52,7 +53,6 @@ class MainWindow(QMainWindow):
         self.settings = QSettings("ExcelMonitor", "Settings")
         self.logger = Logger()
         self.monitor = None
-        self.file_handler = None
         
         # Connect signals
         self.ui.select_file_button.clicked.connect(self.select_file)
@@ -71,22 +71,36 @@ class MainWindow(QMainWindow):
         )
         
         if file_path:
-            self.start_monitoring(file_path)
+            for target in self.select_targets(file_path):
+                self.start_monitoring(target)
+    
+    def select_targets(self, file_path):
+        # A workbook can be monitored per sheet, named range or table
+        if os.path.splitext(file_path)[1].lower() not in ('.xlsx', '.xls', '.xlsm', '.xlsb'):
+            return [file_path]
+        names, ok = QInputDialog.getText(
+            self,
+            "Select Targets",
+            "Sheets, named ranges or tables to monitor (comma separated, blank for the first sheet):"
+        )
+        names = [name.strip() for name in names.split(',') if name.strip()] if ok else []
+        return [f"{file_path}#{name}" for name in names] or [file_path]
     
     def start_monitoring(self, file_path):
-        if self.monitor:
-            self.monitor.stop()
-        
-        self.monitor = ExcelMonitor(file_path)
-        self.monitor.log_signal.connect(self.log_message)
-        self.monitor.status_signal.connect(self.update_status)
-        self.monitor.start()
+        # One monitor watches every selected file with a shared set of threads
+        if self.monitor is None:
+            # pandas, requests and watchdog load with the monitor, not at startup
+            from modules.monitor import ExcelMonitor
+            self.monitor = ExcelMonitor()
+            # Events from parse and sync threads arrive in batches on the GUI thread
+            self.monitor.events_signal.connect(self.on_events)
+            self.ui.metrics_panel.set_metrics(self.monitor.manager.metrics)
+            self.monitor.start()
         
-        self.file_handler = ExcelHandler(self.monitor.check_excel_changes)
-        self.file_handler.start_watching(file_path)
+        self.monitor.add_file(file_path)
         
         self.log_message(f"Started monitoring: {file_path}")
-        self.update_status("Monitoring")
+        self.update_status(f"Monitoring {len(self.monitor.file_paths())} file(s)")
     
     def show_settings(self):
         dialog = SettingsDialog(self)
@@ -97,18 +111,34 @@ class MainWindow(QMainWindow):
         self.ui.log_text.append(message)
         self.logger.log(message)
     
+    def log_error(self, message):
+        self.ui.log_text.append(message, 'error')
+        self.logger.log(message, logging.ERROR)
+    
+    def on_events(self, batch):
+        for file_path, level, message in batch.logs:
+            if level == 'error':
+                self.log_error(message)
+            else:
+                self.log_message(message)
+        for file_path, status in batch.statuses.items():
+            self.update_status(self.monitor.format_message(file_path, status))
+        self.ui.counters_label.setText(format_counters(batch.counters, batch.rates))
+    
     def update_status(self, status):
         self.ui.status_label.setText(f"Status: {status}")
     
     def closeEvent(self, event):
         if self.monitor:
             self.monitor.stop()
-        if self.file_handler:
-            self.file_handler.stop()
         event.accept()
 
 if __name__ == "__main__":
+    # Parse worker processes are spawned from the frozen executable too
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    # Records below `log_level` are dropped before they are formatted
+    setup_logging(level=QSettings("ExcelMonitor", "Settings").value('log_level', 'INFO'))
     
     # Force light mode for the entire application
     app.setStyle("Fusion")
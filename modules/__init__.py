@@ -3,9 +3,30 @@ Excel Monitor Application Modules
 
 This package contains the following modules:
 - settings: Contains the SettingsDialog class for managing application settings
-- file_handler: Contains the ExcelHandler class for monitoring file changes
-- monitor: Contains the ExcelMonitor class for managing the monitoring process
+- file_handler: Contains the ExcelHandler class, the single change-detection engine per file
+- monitor: Contains the ExcelMonitor class, the Qt front end of the monitoring process
+- event_bridge: Contains the EventBridge class, handing worker-thread log, status and counter events to the GUI in timed batches
+- monitor_manager: Contains the MonitorManager class for monitoring many files with shared threads
+- file_monitor: Contains the FileMonitor class with the per-file change detection state
+- config: Contains the ConfigSettings class, QSettings-style settings from an INI file and the environment
+- headless: The Qt-free entry point, `python -m modules.headless`, for unattended servers
 - ui: Contains the MainWindow class for the application's user interface
+- logger: Contains setup_logging, the queued, leveled and rotated JSON lines logging of the application, and the Logger class of the activity log
+- metrics: Contains the Metrics registry of per-file counters and stage latency histograms and the MetricsServer exporting it
+- metrics_panel: Contains the MetricsPanel widget showing rows/s, end-to-end lag and stage latencies
+- log_view: Contains the LogModel and LogView classes, a bounded ring buffer of log lines refreshed at a fixed rate
+- outbox: Contains the Outbox class, the durable queue of row changes waiting to be synced
+- sync_engine: Contains the AsyncOutboxSender class, sending outbox batches from an asyncio loop with several requests in flight
+- flow_control: Contains the FlowControl and TokenBucket classes pacing the row sync and sizing its batches
+- wire_format: Contains the columnar row batch encoding offered to the server next to JSON
+- sync_client: Contains the BatchSyncClient and CloudSync classes for sending rows to the cloud
+- uploader: Contains the FileUploader class for streamed and chunked file uploads
+- tail_reader: Contains the CsvTailReader class for reading rows appended to CSV files
+- row_diff: Contains the row hashing and diffing used to detect inserted, updated and deleted rows
+- file_state: Contains the FileState class, the compact per-file change detection state, and file_identity
+- schema: Contains the CsvSchema class with the cached, downcast column types of CSV exports
+- xlsx_reader: Contains the XlsxWorkbook and XlsxSheetReader classes for streaming sheet, named range and table rows out of .xlsx files
+- parse_jobs: Contains the parse jobs and the ParseBackend class that runs them in threads or worker processes
 """
 
 # This file makes the modules directory a Python package 
\ No newline at end of file
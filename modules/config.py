@@ -0,0 +1,42 @@
+import configparser
+import os
+
+ENV_PREFIX = 'EXCEL_MONITOR_'
+SECTION = 'monitor'
+
+
+class ConfigSettings:
+    """QSettings-style settings read from an INI file and the environment
+
+    Keys are the QSettings keys of the GUI (api_url, api_key, sync_in_flight,
+    ...), read from the [monitor] section of `path` and overridden by
+    EXCEL_MONITOR_<KEY> environment variables, so a server needs neither Qt
+    nor the registry. Values are strings, as QSettings returns them from an
+    INI file; callers convert them. The files to monitor are the `files` key,
+    one per line or separated by ';'.
+    """
+
+    def __init__(self, path: str = None, environ=None):
+        self.path = path
+        self.environ = os.environ if environ is None else environ
+        self.values = {}
+        if path:
+            parser = configparser.ConfigParser(interpolation=None)
+            with open(path, encoding='utf-8') as f:
+                parser.read_file(f)
+            if parser.has_section(SECTION):
+                self.values = dict(parser.items(SECTION))
+
+    def value(self, key: str, default=None):
+        env = self.environ.get(ENV_PREFIX + key.upper())
+        if env is not None:
+            return env
+        return self.values.get(key.lower(), default)
+
+    def setValue(self, key: str, value):
+        self.values[key.lower()] = value
+
+    def files(self) -> list:
+        """Return the files and workbook targets named by the `files` key"""
+        value = self.value('files', '')
+        return [path.strip() for path in value.replace(';', '\n').splitlines() if path.strip()]
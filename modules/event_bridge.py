@@ -0,0 +1,97 @@
+import threading
+import time
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class EventBatch:
+    """Everything the monitor reported since the previous flush
+
+    `logs` holds (file_path, level, message) tuples in order, `statuses` the
+    latest status of each file that changed, `counters` the totals from the
+    counters callback and `rates` the per-second change of each counter
+    since the previous flush.
+    """
+
+    __slots__ = ('logs', 'statuses', 'counters', 'rates')
+
+    def __init__(self, logs: list, statuses: dict, counters: dict, rates: dict):
+        self.logs = logs
+        self.statuses = statuses
+        self.counters = counters
+        self.rates = rates
+
+    def __repr__(self):
+        return (f"EventBatch(logs={len(self.logs)}, statuses={len(self.statuses)}, "
+                f"counters={self.counters})")
+
+
+def format_counters(counters: dict, rates: dict) -> str:
+    """One-line throughput summary of MonitorManager.counters() for the status bar"""
+    if not counters:
+        return ""
+    return (f"Detected {counters['rows_detected']:,} rows "
+            f"({rates.get('rows_detected', 0):,.0f}/s) | "
+            f"Synced {counters['rows_synced']:,} ({rates.get('rows_synced', 0):,.0f}/s) | "
+            f"Queued {counters['queue_depth']:,} | "
+            f"Failed requests {counters['sync_failures']:,}")
+
+
+class EventBridge(QObject):
+    """Collect log, status and counter events from worker threads for the GUI
+
+    log(), error() and status() may be called from any thread; they only
+    append to a list under a lock. Every `interval_ms` a timer on the thread
+    that owns the bridge (the GUI thread) takes everything collected, reads
+    `counters()` and emits one EventBatch through `batch_signal`. A burst of
+    thousands of events therefore costs the GUI one signal per interval
+    instead of one queued cross-thread event each.
+    """
+
+    batch_signal = Signal(object)
+
+    def __init__(self, counters=None, interval_ms: int = 250, parent=None):
+        super().__init__(parent)
+        self.counters = counters
+        self.lock = threading.Lock()
+        self.logs = []
+        self.statuses = {}
+        self.last_counters = None
+        self.active = False
+        self.last_flush = time.monotonic()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def log(self, file_path: str, message: str, level: str = 'info'):
+        with self.lock:
+            self.logs.append((file_path, level, message))
+
+    def error(self, file_path: str, message: str):
+        self.log(file_path, message, 'error')
+
+    def status(self, file_path: str, status: str):
+        with self.lock:
+            self.statuses[file_path] = status
+
+    def flush(self):
+        """Emit the events collected since the last flush as one EventBatch"""
+        with self.lock:
+            logs, self.logs = self.logs, []
+            statuses, self.statuses = self.statuses, {}
+        counters = self.counters() if self.counters else {}
+        now = time.monotonic()
+        elapsed = now - self.last_flush
+        rates = {}
+        if self.last_counters is not None and elapsed > 0:
+            rates = {name: (value - self.last_counters.get(name, 0)) / elapsed
+                     for name, value in counters.items()}
+        # One more batch after the counters stop moving brings the rates to zero
+        active = counters != self.last_counters
+        emit = logs or statuses or active or self.active
+        self.active = active
+        self.last_counters = counters
+        self.last_flush = now
+        if emit:
+            self.batch_signal.emit(EventBatch(logs, statuses, counters, rates))
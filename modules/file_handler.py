@@ -1,143 +1,196 @@
+import logging
 import os
-import pandas as pd
+import threading
+import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from datetime import datetime
-import time
-from PySide6.QtCore import QTimer
+
+log = logging.getLogger(__name__)
+
 
 class ExcelHandler(FileSystemEventHandler):
-    def __init__(self, callback):
+    """Single change-detection engine for one monitored file
+
+    Watchdog events and an mtime/size poll both only mark the file as dirty.
+    One dispatcher thread coalesces them and calls `callback(file_path)` once
+    the file's (mtime, size) has been stable for `quiet_period` seconds, and
+    only if it differs from what the previous callback saw. A write that is
+    reported by watchdog and by the poll therefore still causes one parse,
+    and multi-step saves are not read half-written. A file that never goes
+    quiet is still delivered at least every `max_latency` seconds.
+
+    start_watching() runs the handler standalone with its own observer and
+    thread; MonitorManager instead drives many handlers through step().
+    """
+
+    def __init__(self, callback, polling_interval: float = 1.0,
+                 quiet_period: float = 0.5, max_latency: float = 5.0):
         self.callback = callback
-        self.last_row_count = 0
-        self.last_modified = 0
+        self.polling_interval = polling_interval
+        self.quiet_period = quiet_period
+        self.max_latency = max_latency
         self.observer = None
         self.watched_file = None
-        self.last_content = None
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.check_file)
-        self.polling_interval = 1000  # Check every second
-    
-    def read_excel_file(self, file_path):
-        """Read Excel file with appropriate engine"""
+        self.watched_key = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.last_seen = None
+        self.last_notified = None
+        self.last_event = None
+        self.pending_since = None
+        self.pending_signature = None
+        self.next_poll = 0
+
+        # Counters: raw watchdog events, polls that saw a change, quiet periods
+        # extended because the file was still being written, callbacks made
+        self.events = 0
+        self.poll_hits = 0
+        self.deferrals = 0
+        self.notifications = 0
+
+    def file_signature(self):
+        """Return (mtime_ns, size) of the watched file, or None if it is missing"""
         try:
-            if file_path.endswith('.xlsx'):
-                return pd.read_excel(file_path, engine='openpyxl')
-            elif file_path.endswith('.xls'):
-                return pd.read_excel(file_path, engine='xlrd')
-            elif file_path.endswith('.csv'):
-                return pd.read_csv(file_path)
-            elif file_path.endswith('.xlsm'):
-                return pd.read_excel(file_path, engine='openpyxl')
-            elif file_path.endswith('.xlsb'):
-                return pd.read_excel(file_path, engine='pyxlsb')
-            else:
-                raise ValueError(f"Unsupported file format: {file_path}")
-        except Exception as e:
-            print(f"Error reading file {file_path}: {e}")
+            stat = os.stat(self.watched_file)
+        except OSError:
             return None
-    
+        return stat.st_mtime_ns, stat.st_size
+
+    def prepare(self, file_path):
+        """Set the watched file and take its current state as already seen"""
+        self.watched_file = file_path
+        self.watched_key = os.path.normcase(os.path.abspath(file_path))
+        self.last_seen = self.last_notified = self.file_signature()
+        self.last_event = self.pending_since = self.pending_signature = None
+        self.next_poll = time.monotonic() + self.polling_interval
+
     def start_watching(self, file_path):
         """Start watching the specified file for changes"""
-        print(f"Starting to watch file: {file_path}")
-        
-        if self.observer:
-            self.observer.stop()
-            self.observer.join()
-        
-        self.watched_file = file_path
-        self.observer = Observer()
-        
+        log.info("Starting to watch file: %s", file_path)
+        self.stop()
+        self.prepare(file_path)
+        self.stopped.clear()
+
         # Watch the directory containing the file
-        directory = os.path.dirname(file_path)
-        print(f"Watching directory: {directory}")
-        
+        directory = os.path.dirname(os.path.abspath(file_path))
+        log.debug("Watching directory: %s", directory)
+        self.observer = Observer()
         self.observer.schedule(self, directory, recursive=False)
         self.observer.start()
-        
-        # Set initial state
-        df = self.read_excel_file(file_path)
-        if df is not None:
-            self.last_row_count = len(df)
-            self.last_content = df
-            print(f"Initial row count: {self.last_row_count}")
-        
-        # Start polling timer
-        self.timer.start(self.polling_interval)
-    
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
     def stop(self):
         """Stop watching the file"""
+        self.stopped.set()
+        self.wakeup.set()
         if self.observer:
-            print("Stopping file watcher")
+            log.info("Stopping file watcher")
             self.observer.stop()
             self.observer.join()
             self.observer = None
-            self.watched_file = None
-            self.last_content = None
-        
-        # Stop polling timer
-        self.timer.stop()
-    
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def notify(self):
+        """Mark the file as changed; the dispatcher decides when to parse it"""
+        signature = self.file_signature()
+        with self.lock:
+            self.last_event = time.monotonic()
+            if self.pending_since is None:
+                self.pending_since = self.last_event
+            self.pending_signature = signature
+        self.wakeup.set()
+
     def check_file(self):
-        """Check the file for changes"""
-        if not self.watched_file or not os.path.exists(self.watched_file):
+        """Poll the file's mtime and size and mark it dirty if they changed"""
+        signature = self.file_signature()
+        if signature is not None and signature != self.last_seen:
+            self.last_seen = signature
+            self.poll_hits += 1
+            self.notify()
+
+    def step(self, now: float = None) -> float:
+        """Run any poll or delivery that is due and return the next deadline"""
+        now = now or time.monotonic()
+        if now >= self.next_poll:
+            self.next_poll = now + self.polling_interval
+            self.check_file()
+
+        ready = False
+        with self.lock:
+            if self.last_event is not None:
+                deadline = min(self.last_event + self.quiet_period,
+                               self.pending_since + self.max_latency)
+                if now >= deadline:
+                    signature = self.file_signature()
+                    # Still being written: wait for another quiet period unless
+                    # the change has already been pending for max_latency
+                    if (signature != self.pending_signature and
+                            now < self.pending_since + self.max_latency):
+                        self.pending_signature = signature
+                        self.last_event = now
+                        self.deferrals += 1
+                    else:
+                        self.last_event = self.pending_since = self.pending_signature = None
+                        ready = True
+        if ready:
+            self.deliver()
+
+        with self.lock:
+            if self.last_event is None:
+                return self.next_poll
+            return min(self.next_poll,
+                       self.last_event + self.quiet_period,
+                       self.pending_since + self.max_latency)
+
+    def run(self):
+        """Dispatcher loop: poll, coalesce and deliver change notifications"""
+        while not self.stopped.is_set():
+            timeout = self.step() - time.monotonic()
+            if timeout > 0:
+                self.wakeup.wait(timeout)
+                self.wakeup.clear()
+
+    def deliver(self):
+        """Call the callback if the file changed since the last notification"""
+        signature = self.file_signature()
+        if signature is None or signature == self.last_notified:
             return
-        
+        self.last_seen = self.last_notified = signature
+        self.notifications += 1
         try:
-            # Get current file modification time
-            current_mtime = os.path.getmtime(self.watched_file)
-            
-            # Only check if file has been modified
-            if current_mtime > self.last_modified:
-                self.last_modified = current_mtime
-                
-                # Read the Excel file
-                df = self.read_excel_file(self.watched_file)
-                if df is None:
-                    print("Failed to read file")
-                    return
-                
-                current_row_count = len(df)
-                print(f"Current row count: {current_row_count}, Last row count: {self.last_row_count}")
-                
-                # Check if there are new rows
-                if current_row_count > self.last_row_count:
-                    # Get the new rows
-                    new_rows = df.iloc[self.last_row_count:].to_dict('records')
-                    print(f"Found {len(new_rows)} new rows:")
-                    
-                    # Print each new row's content
-                    for i, row in enumerate(new_rows, start=self.last_row_count + 1):
-                        print(f"Row {i}: {row}")
-                    
-                    # Update the last content and row count
-                    self.last_content = df
-                    self.last_row_count = current_row_count
-                    
-                    # Call the callback with new rows
-                    self.callback(new_rows)
-                else:
-                    print("No new rows detected")
-        
-        except Exception as e:
-            print(f"Error checking file: {e}")
-            import traceback
-            traceback.print_exc()
-    
+            self.callback(self.watched_file)
+        except Exception:
+            log.exception("Error checking file %s", self.watched_file)
+
+    def matches(self, path):
+        return os.path.normcase(os.path.abspath(path)) == self.watched_key
+
     def on_modified(self, event):
         """Handle file modification events"""
-        if not event.is_directory and event.src_path == self.watched_file:
-            print(f"File modified: {event.src_path}")
-            # The polling mechanism will handle the actual change detection
-    
+        if not event.is_directory and self.matches(event.src_path):
+            self.events += 1
+            self.notify()
+
     def on_created(self, event):
         """Handle file creation events"""
-        if not event.is_directory and event.src_path == self.watched_file:
-            print(f"File created: {event.src_path}")
-            self.start_watching(event.src_path)
-    
+        if not event.is_directory and self.matches(event.src_path):
+            self.events += 1
+            self.notify()
+
+    def on_moved(self, event):
+        """Handle a temp file being renamed over the watched file"""
+        if not event.is_directory and self.matches(event.dest_path):
+            self.events += 1
+            self.notify()
+
     def on_deleted(self, event):
         """Handle file deletion events"""
-        if not event.is_directory and event.src_path == self.watched_file:
-            print(f"File deleted: {event.src_path}")
-            self.stop() 
\ No newline at end of file
+        if not event.is_directory and self.matches(event.src_path):
+            # Editors often delete and re-create the file on save, keep watching
+            log.info("File deleted: %s", event.src_path)
@@ -0,0 +1,506 @@
+import logging
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import requests
+
+from modules.file_state import FileState, file_identity, replaced, same_version
+from modules.parse_jobs import CsvJob, FileJob, ParseBackend, SheetTarget, WorkbookJob, read_file
+from modules.row_diff import RowDiff
+from modules.sync_client import encode_deletes, encode_rows, encode_updates
+from modules.tail_reader import CsvTailReader
+from modules.xlsx_reader import XlsxSheetReader, XlsxWorkbook
+from modules.uploader import FileUploader
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls', '.xlsm', '.xlsb')
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm')
+
+log = logging.getLogger(__name__)
+
+
+def split_target(spec: str):
+    """Split 'book.xlsx#Target' into the file path and the target, or None
+
+    A target names a sheet, a named range or a table of a workbook.
+    """
+    path, separator, target = spec.rpartition('#')
+    if separator and target and os.path.splitext(path)[1].lower() in EXCEL_EXTENSIONS:
+        return path, target
+    return spec, None
+
+
+def target_key(spec: str) -> str:
+    """Return the key identifying a monitored file or workbook target"""
+    path, target = split_target(spec)
+    key = os.path.normcase(os.path.abspath(path))
+    return f'{key}#{target}' if target else key
+
+
+class FileMonitor:
+    """Row change detection and sync queueing for one monitored file
+
+    Independent of Qt: progress is reported through the optional `on_log`,
+    `on_error`, `on_status` and `on_queued(count)` callbacks, and `settings`
+    only needs a QSettings-style `value(key, default)` method. Detected rows
+    are written to the shared outbox and `notify_sender` is called to wake
+    its sender.
+
+    Instead of keeping the last DataFrame, the monitor keeps a compact
+    FileState with one uint64 hash per row and diffs each new version against
+    it, so edits to existing rows are synced as updates and removed rows as
+    deletes.
+
+    `file_path` may name a target inside a workbook as 'book.xlsx#Target'
+    (see split_target); each target has its own state, file ID and outbox
+    stream. Targets of one .xlsx/.xlsm workbook can share an XlsxWorkbook and
+    be scanned together by one WorkbookJob of their sheet_target()s.
+
+    Reading and diffing run as parse jobs on `parse_backend`, in the calling
+    thread by default or in a worker process; only the changed rows, hashes
+    and counts come back, and apply_result() updates the state with them.
+
+    With `metrics` (a Metrics registry) the detect, read, diff, serialize
+    and queue stages of every change are timed and the detected rows
+    counted, labelled with the monitor's name.
+
+    The checkpoint saved with every queued change also keeps the file ID,
+    whether the file was uploaded under it and the file_identity() of the
+    version read, so a restart resumes the same server file and only stats
+    a file that has not changed since. The row hashes are saved with it,
+    only those of rows changed since the previous save.
+    """
+
+    def __init__(self, file_path: str, settings, outbox, notify_sender=None,
+                 on_log=None, on_error=None, on_status=None, workbook: XlsxWorkbook = None,
+                 parse_backend: ParseBackend = None, on_queued=None, metrics=None):
+        self.name = file_path
+        self.file_path, self.target = split_target(file_path)
+        self.file_key = target_key(file_path)
+        self.settings = settings
+        self.outbox = outbox
+        self.notify_sender = notify_sender
+        self.on_log = on_log
+        self.on_error = on_error
+        self.on_status = on_status
+        self.on_queued = on_queued
+        self.parse_backend = parse_backend or ParseBackend()
+        self.metrics = metrics
+        self.file_id = str(uuid.uuid4())[:16]
+        self.uploaded = False
+        self.detected_at = None
+        # Identity of the version the running parse job reads
+        self.reading = None
+        # First row whose hash changed since the hashes were last saved
+        self.hashes_from = None
+        if metrics is not None:
+            metrics.register_file(self.file_id, self.name)
+        self.state = FileState()
+        self.parse_count = 0
+        self.skip_count = 0
+        self.status = "Idle"
+        self.last_error = None
+        extension = os.path.splitext(self.file_path)[1].lower()
+        self.tail_reader = CsvTailReader(self.file_path) if extension == '.csv' else None
+        self.xlsx_reader = None
+        if extension in WORKBOOK_EXTENSIONS:
+            self.xlsx_reader = XlsxSheetReader(self.file_path, self.target, workbook)
+        log.debug("Monitor initialized for %s with file ID %s", self.name, self.file_id)
+
+    @property
+    def last_row_count(self) -> int:
+        return self.state.row_count
+
+    @last_row_count.setter
+    def last_row_count(self, value: int):
+        self.state.row_count = value
+
+    @property
+    def row_hashes(self):
+        return self.state.row_hashes
+
+    def log(self, message: str):
+        if self.on_log:
+            self.on_log(message)
+
+    def error(self, message: str):
+        self.last_error = message
+        if self.on_error:
+            self.on_error(message)
+
+    def record(self, stage: str, seconds: float):
+        if self.metrics is not None:
+            self.metrics.stage(stage, seconds, self.name)
+
+    def set_status(self, status: str):
+        self.status = status
+        if self.on_status:
+            self.on_status(status)
+
+    def initialize(self, upload: bool = False) -> bool:
+        """Resume from the saved checkpoint, or take the current rows as the baseline
+
+        With `upload` the whole file is uploaded first, unless the checkpoint
+        records that it already was under the file ID it restores. Returns
+        False, with the error reported, if there is no baseline to diff against.
+        """
+        try:
+            checkpoint = self.outbox.get_checkpoint(self.file_key)
+            resumed = checkpoint is not None and self.restore_checkpoint(checkpoint)
+            if checkpoint is not None and not resumed:
+                log.info("%s no longer matches its checkpoint, starting over as file %s",
+                         self.name, self.file_id)
+            if upload and not self.uploaded:
+                self.upload_file()
+            if resumed:
+                pending = self.outbox.pending(self.file_key)
+                log.info("Resuming %s at row %d, %d rows pending",
+                         self.name, self.last_row_count, pending)
+                self.log(f"Resuming at row {self.last_row_count} ({pending} rows pending sync)")
+                if self.row_hashes is None:
+                    # Without saved hashes edits cannot be told apart, rehash the whole file
+                    log.info("No saved row hashes for %s, reading it once in full", self.name)
+                    self.state.fingerprint = None
+                    self.check_excel_changes(self.file_path)
+                elif same_version(self.state.identity, self.identity()):
+                    log.debug("%s unchanged since the checkpoint, not reading it", self.name)
+                else:
+                    # Pick up rows written while the monitor was not running
+                    self.check_excel_changes(self.file_path)
+                rehashed = self.hashes_from is not None and self.status != "Error"
+                if rehashed or self.uploaded and not checkpoint.get('uploaded'):
+                    self.save_checkpoint()
+            else:
+                result = self.parse_backend.run(self.parse_job(baseline=True))[0]
+                _, _, self.last_row_count = self.apply_result(result, baseline=True)
+                self.save_checkpoint()
+                log.info("Initial row count of %s: %d", self.name, self.last_row_count)
+                self.log(f"Initial rows: {self.last_row_count}")
+            self.set_status("Monitoring")
+            return True
+        except Exception as e:
+            log.exception("Error reading %s", self.name)
+            self.error(f"Error reading file: {str(e)}")
+            self.set_status("Error")
+            return False
+
+    def read_file(self, file_path: str) -> pd.DataFrame:
+        log.debug("Reading file: %s", file_path)
+        file_path, target = split_target(file_path)
+        return read_file(file_path, target or self.target)
+
+    def identity(self):
+        """Return the file_identity() of the file, or None if it cannot be read"""
+        try:
+            return file_identity(self.file_path)
+        except OSError:
+            return None
+
+    def checkpoint(self) -> dict:
+        """Return the position in the source file that has been queued for sync"""
+        if self.tail_reader is not None:
+            checkpoint = self.tail_reader.state()
+        else:
+            checkpoint = {'row_count': self.last_row_count, 'fingerprint': self.state.fingerprint,
+                          'columns': list(self.state.columns) if self.state.columns else None}
+        checkpoint.update(file_id=self.file_id, uploaded=self.uploaded,
+                          identity=self.state.identity)
+        return checkpoint
+
+    def unsaved_hashes(self):
+        """Return (start, packed) row hashes changed since they were last saved, or None"""
+        if self.hashes_from is None:
+            return None
+        hashes = self.row_hashes
+        return self.hashes_from, b'' if hashes is None else hashes[self.hashes_from:].tobytes()
+
+    def save_checkpoint(self):
+        """Save the checkpoint and the row hashes changed since the last save"""
+        self.outbox.save_checkpoint(self.file_key, self.checkpoint(), hashes=self.unsaved_hashes())
+        self.hashes_from = None
+
+    def restore_checkpoint(self, checkpoint: dict) -> bool:
+        """Resume from a saved checkpoint, returning False if it no longer applies
+
+        It does not apply to another file put in place of the one it was
+        saved for, nor, for CSV files, to one whose start was rewritten.
+        """
+        if replaced(checkpoint.get('identity'), self.identity()):
+            return False
+        if self.tail_reader is not None:
+            if not self.tail_reader.restore(checkpoint):
+                return False
+            self.last_row_count = self.tail_reader.row_count
+            self.state.offset = self.tail_reader.offset
+            self.state.columns = tuple(self.tail_reader.columns or ())
+        else:
+            self.last_row_count = checkpoint['row_count']
+            self.state.fingerprint = checkpoint.get('fingerprint')
+            if checkpoint.get('columns'):
+                self.state.columns = tuple(checkpoint['columns'])
+                if self.xlsx_reader is not None:
+                    self.xlsx_reader.columns = list(checkpoint['columns'])
+        hashes = self.outbox.get_row_hashes(self.file_key)
+        if hashes is not None and len(hashes) == 8 * self.last_row_count:
+            self.state.set_hashes(np.frombuffer(hashes, dtype=np.uint64))
+        self.state.identity = checkpoint.get('identity')
+        if checkpoint.get('file_id'):
+            self.file_id = checkpoint['file_id']
+            if self.metrics is not None:
+                self.metrics.register_file(self.file_id, self.name)
+        self.uploaded = bool(checkpoint.get('uploaded'))
+        return True
+
+    def parse_job(self, baseline: bool = False):
+        """Return the job that reads and diffs the current version of the file
+
+        A baseline job re-reads the whole file and ships back no rows.
+        """
+        keep_rows = not baseline
+        self.reading = self.identity()
+        if self.xlsx_reader is not None:
+            return WorkbookJob(self.file_path, [self.sheet_target(baseline)],
+                               self.xlsx_reader.workbook)
+        if self.tail_reader is not None:
+            # Tail reads cannot rebuild missing row hashes, a resync can
+            return CsvJob(self.tail_reader, self.row_hashes, self.last_row_count,
+                          resync=baseline or self.row_hashes is None, keep_rows=keep_rows)
+        return FileJob(self.file_path, self.target, self.row_hashes, self.last_row_count,
+                       keep_rows=keep_rows)
+
+    def sheet_target(self, baseline: bool = False) -> SheetTarget:
+        """Return this workbook target's part of a WorkbookJob"""
+        self.reading = self.identity()
+        if baseline:
+            return SheetTarget(self.target, np.empty(0, dtype=np.uint64), keep_rows=False)
+        return SheetTarget(self.target, self.row_hashes, self.last_row_count,
+                           tail_only=not int(self.settings.value('xlsx_detect_edits', 1)),
+                           fingerprint=self.state.fingerprint,
+                           columns=self.xlsx_reader.columns)
+
+    def apply_result(self, result, baseline: bool = False):
+        """Update the file state from a parse result and return (frame, diff, row_count)
+
+        Positions in the diff are file row numbers, which are also the index
+        labels of `frame`.
+        """
+        if result.error is not None:
+            raise result.error
+        self.state.identity = self.reading
+        if result.skipped:
+            # The target's cell data and shared strings are byte-identical
+            self.skip_count += 1
+            log.debug("Sheet data unchanged, skipping parse: %s", self.name)
+            empty = np.empty(0, dtype=np.int64)
+            return pd.DataFrame(), RowDiff(empty, empty, empty), self.last_row_count
+
+        if not baseline:
+            self.parse_count += 1
+            # Changes count as detected when the read that found them started
+            self.detected_at = time.time() - sum(result.timings.values())
+            for stage, seconds in result.timings.items():
+                self.record(stage, seconds)
+        if result.reader is not None:
+            # A worker process sends back its copy of the tail reader
+            self.tail_reader = result.reader
+            self.state.offset = result.reader.offset
+        if not result.full:
+            if self.row_hashes is not None:
+                start = len(self.row_hashes)
+                self.hashes_from = start if self.hashes_from is None else min(self.hashes_from,
+                                                                              start)
+            self.state.append_hashes(result.hashes)
+        else:
+            self.hashes_from = 0
+            if result.hashes is None:
+                self.state.clear_hashes()
+            else:
+                self.state.set_hashes(result.hashes)
+        if result.columns is not None:
+            self.state.columns = result.columns
+            if self.xlsx_reader is not None:
+                self.xlsx_reader.columns = list(result.columns)
+        if result.fingerprint is not None:
+            self.state.fingerprint = result.fingerprint
+        return result.frame, result.diff, result.row_count
+
+    def detect_changes(self, file_path: str = None):
+        """Return (frame, diff, row_count) for the changes since the last check
+
+        `frame` holds the inserted and updated rows, indexed by their row
+        number in the file.
+        """
+        return self.apply_result(self.parse_backend.run(self.parse_job())[0])
+
+    def check_excel_changes(self, file_path: str = None, result=None):
+        """Detect and queue the changes of the file, or those of a parse result"""
+        file_path = file_path or self.file_path
+        try:
+            log.debug("Checking for changes in: %s", self.name)
+            if result is not None:
+                frame, diff, current_row_count = self.apply_result(result)
+            else:
+                frame, diff, current_row_count = self.detect_changes(file_path)
+
+            if diff:
+                self.record_detect()
+                start = time.perf_counter()
+                # Inserted rows are encoded once, for the outbox and the debug log
+                inserted = encode_rows(frame.loc[diff.inserted]) if len(diff.inserted) else []
+                changes = self.encode_changes(frame, diff, inserted)
+                self.record('serialize', time.perf_counter() - start)
+                if inserted:
+                    log.info("Found %d new rows in %s", len(inserted), self.name)
+                    # One line per batch; row contents only go to the debug log
+                    first, last = int(diff.inserted.min()) + 1, int(diff.inserted.max()) + 1
+                    rows = f"row {first:,}" if first == last else f"rows {first:,}-{last:,}"
+                    self.log(f"New rows detected: {len(inserted):,} ({rows})")
+                    if log.isEnabledFor(logging.DEBUG):
+                        for index, payload in zip(diff.inserted.tolist(), inserted):
+                            log.debug("New row %d: %s", index + 1, payload.decode('utf-8'))
+                if len(diff.updated):
+                    log.info("Found %d updated rows in %s", len(diff.updated), self.name)
+                    self.log(f"Rows updated: {len(diff.updated)}")
+                if len(diff.deleted):
+                    log.info("Found %d deleted rows in %s", len(diff.deleted), self.name)
+                    self.log(f"Rows deleted: {len(diff.deleted)}")
+
+                self.last_row_count = current_row_count
+                self.queue_changes(changes)
+            elif current_row_count != self.last_row_count:
+                self.last_row_count = current_row_count
+                self.save_checkpoint()
+        except Exception as e:
+            log.exception("Error processing changes in %s", self.name)
+            self.error(f"Error processing changes: {str(e)}")
+            self.set_status("Error")
+
+    def record_detect(self):
+        """Record the time from the last write of the file to the read that saw it"""
+        if self.metrics is None or self.detected_at is None:
+            return
+        try:
+            modified = os.path.getmtime(self.file_path)
+        except OSError:
+            return
+        self.record('detect', max(0.0, self.detected_at - modified))
+
+    def sync_changes(self, frame: pd.DataFrame, diff: RowDiff, inserted: list = None) -> bool:
+        """Queue the inserted, updated and deleted rows of a diff for sync
+
+        Diff positions are file row numbers and select rows of `frame` by label.
+        `inserted` are the inserted rows if they were already encoded.
+        """
+        return self.queue_changes(self.encode_changes(frame, diff, inserted))
+
+    def encode_changes(self, frame: pd.DataFrame, diff: RowDiff, inserted: list = None) -> list:
+        """Encode a diff as the (op, row_indexes, payloads) groups of queue_changes()"""
+        changes = []
+        if len(diff.inserted):
+            if inserted is None:
+                inserted = encode_rows(frame.loc[diff.inserted])
+            changes.append(('insert', diff.inserted, inserted))
+        if len(diff.updated):
+            changes.append(('update', diff.updated,
+                            encode_updates(frame.loc[diff.updated], diff.updated)))
+        if len(diff.deleted):
+            changes.append(('delete', diff.deleted, encode_deletes(diff.deleted)))
+        return changes
+
+    def sync_to_cloud(self, new_rows: pd.DataFrame) -> bool:
+        """Queue rows appended at the end of the file for the background sender"""
+        payloads = encode_rows(new_rows)
+        first_row = max(0, self.last_row_count - len(payloads))
+        return self.queue_changes([('insert', range(first_row, first_row + len(payloads)),
+                                    payloads)])
+
+    def queue_changes(self, changes) -> bool:
+        """Write (op, row_indexes, payloads) groups to the durable outbox"""
+        try:
+            start = time.perf_counter()
+            self.outbox.append_changes(self.file_key, self.file_id, changes,
+                                       checkpoint=self.checkpoint(), detected_at=self.detected_at,
+                                       hashes=self.unsaved_hashes())
+            self.hashes_from = None
+            self.record('queue', time.perf_counter() - start)
+            if self.notify_sender:
+                self.notify_sender()
+
+            count = sum(len(payloads) for _, _, payloads in changes)
+            if self.metrics is not None:
+                for op, _, payloads in changes:
+                    self.metrics.inc('rows_detected', len(payloads), file=self.name, op=op)
+            if self.on_queued:
+                self.on_queued(count)
+            log.info("Queued %d rows of %s for sync", count, self.name,
+                     extra={'file_id': self.file_id, 'rows': count})
+            self.log(f"Syncing {count} rows...")
+            return True
+        except Exception as e:
+            log.exception("Failed to queue rows of %s", self.name)
+            self.error(f"Sync failed: {str(e)}")
+            self.set_status("Error")
+            return False
+
+    def upload_file(self):
+        """Upload the whole file in the background, reporting progress as status"""
+        try:
+            api_url = self.settings.value('api_url')
+            api_key = self.settings.value('api_key')
+
+            if not api_url or not api_key:
+                log.warning("API credentials not set")
+                self.error("API credentials not set")
+                return
+
+            self.log("Uploading file...")
+
+            # Get file extension and type
+            file_ext = os.path.splitext(self.file_path)[1].lower()
+            file_type = 'csv' if file_ext == '.csv' else 'excel'
+
+            log.info("Uploading %s to %s/api/file-management/files/ as %s file %s",
+                     self.name, api_url, file_type, self.file_id)
+
+            uploader = FileUploader(
+                api_url,
+                api_key,
+                chunk_size=int(self.settings.value('upload_chunk_bytes', 8 * 1024 * 1024)),
+                chunk_threshold=int(self.settings.value('upload_chunk_threshold', 32 * 1024 * 1024)),
+            )
+            last_percent = [-1]
+
+            def on_progress(sent, total):
+                percent = int(sent * 100 / total) if total else 100
+                if percent != last_percent[0]:
+                    last_percent[0] = percent
+                    self.set_status(f"Uploading {percent}%")
+
+            try:
+                uploader.upload(self.file_path, self.file_id, file_type, on_progress=on_progress)
+            finally:
+                uploader.close()
+
+            self.uploaded = True
+            log.info("File %s uploaded, ID %s", self.name, self.file_id)
+            self.log(f"File uploaded successfully. ID: {self.file_id}")
+        except requests.exceptions.RequestException as e:
+            status_code = getattr(e.response, 'status_code', None)
+            log.error("Upload of %s failed with status %s: %s", self.name, status_code, e)
+            if hasattr(e.response, 'text'):
+                log.debug("Error response: %s", e.response.text)
+
+            # Check for specific error cases
+            if status_code == 401:
+                self.error("Authentication failed. Please check your API key.")
+            elif status_code == 400:
+                self.error(f"Bad request: {e.response.text}")
+            else:
+                self.error(f"Upload failed: {str(e)}")
+            self.set_status("Error")
+        except Exception as e:
+            log.exception("Upload of %s failed", self.name)
+            self.error(f"Upload failed: {str(e)}")
+            self.set_status("Error")
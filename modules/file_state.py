@@ -0,0 +1,93 @@
+import hashlib
+import os
+
+import numpy as np
+
+# Bytes hashed to tell a replaced file from the same file rewritten
+HEAD_BYTES = 4096
+
+
+def file_identity(file_path: str) -> dict:
+    """Return the inode, size, modification time and a hash of the first bytes of a file"""
+    stat = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        head = hashlib.sha1(f.read(HEAD_BYTES)).hexdigest()
+    return {'inode': stat.st_ino, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'head': head}
+
+
+def same_version(identity: dict, other: dict) -> bool:
+    """Whether two identities are of the same, unmodified version of a file"""
+    return bool(identity and other) and all(
+        identity.get(key) == other.get(key) for key in ('inode', 'size', 'mtime_ns'))
+
+
+def replaced(identity: dict, other: dict) -> bool:
+    """Whether `other` is of another file put in place of the one of `identity`
+
+    Both the inode and the first bytes differ: a file rewritten in place
+    keeps its inode, and one saved through a temporary file and renamed
+    (as Excel does) usually keeps its first bytes.
+    """
+    return bool(identity and other) and identity.get('inode') != other.get('inode') \
+        and identity.get('head') != other.get('head')
+
+
+class FileState:
+    """What change detection remembers about one monitored file
+
+    Only the row count, the byte offset read up to, the column schema, a
+    fingerprint of the parts of the file last parsed and one uint64 hash per
+    row are kept, never the parsed rows themselves. Hashes live in a growable
+    array, so appending rows is amortised O(new rows). `identity` is the
+    file_identity() of the version the state was read from.
+    """
+
+    __slots__ = ('row_count', 'offset', 'columns', 'fingerprint', 'identity',
+                 '_hashes', '_hash_count')
+
+    def __init__(self):
+        self.row_count = 0
+        self.offset = 0
+        self.columns = None
+        self.fingerprint = None
+        self.identity = None
+        self._hashes = None
+        self._hash_count = 0
+
+    @property
+    def row_hashes(self):
+        """The per-row hashes, or None if they are not known"""
+        if self._hashes is None:
+            return None
+        return self._hashes[:self._hash_count]
+
+    def set_hashes(self, hashes: np.ndarray):
+        """Replace the row hashes with those of a freshly read version"""
+        self._hashes = np.array(hashes, dtype=np.uint64)
+        self._hash_count = len(self._hashes)
+
+    def append_hashes(self, hashes: np.ndarray):
+        """Add the hashes of appended rows, growing the buffer geometrically"""
+        if self._hashes is None:
+            return
+        needed = self._hash_count + len(hashes)
+        if needed > len(self._hashes):
+            grown = np.empty(max(needed, 2 * len(self._hashes), 64), dtype=np.uint64)
+            grown[:self._hash_count] = self._hashes[:self._hash_count]
+            self._hashes = grown
+        self._hashes[self._hash_count:needed] = hashes
+        self._hash_count = needed
+
+    def clear_hashes(self):
+        self._hashes = None
+        self._hash_count = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the row hashes"""
+        return 0 if self._hashes is None else self._hashes.nbytes
+
+    def __repr__(self):
+        return (f"FileState(rows={self.row_count}, offset={self.offset}, "
+                f"columns={len(self.columns or ())}, hash_bytes={self.nbytes})")
@@ -0,0 +1,121 @@
+import email.utils
+import time
+
+import requests
+
+# Responses telling the client to slow down
+THROTTLE_STATUSES = (429, 503, 504)
+# Client errors that may still succeed when the request is retried
+RETRYABLE_CLIENT_STATUSES = (408, 425, 429)
+
+
+def retry_after(error) -> float:
+    """Return the Retry-After delay in seconds of a failed request, or None
+
+    Accepts both forms of the header: a number of seconds or an HTTP date.
+    """
+    response = getattr(error, 'response', None)
+    value = response is not None and response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def status_code(error):
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def is_permanent(error) -> bool:
+    """Check whether the server refused a request in a way retrying cannot fix"""
+    status = status_code(error)
+    return status is not None and 400 <= status < 500 and status not in RETRYABLE_CLIENT_STATUSES
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, in bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self, until: float):
+        """Hold back every token until the monotonic time `until`"""
+        self.tokens = 0.0
+        self.updated = max(self.updated, until)
+
+
+class FlowControl:
+    """Pace requests and size batches from the API's latency and error codes
+
+    The number of rows per batch follows AIMD: it grows by `increase` rows
+    after every request answered within `target_latency` seconds, up to
+    `max_rows`, and is halved (down to `min_rows`) after a slow answer, a
+    timeout or a 429/503/504. With `rate` set, a token bucket caps the
+    requests per second. A Retry-After header pauses all requests until it
+    has passed.
+    """
+
+    def __init__(self, max_rows: int = 500, min_rows: int = 1, rate: float = 0.0,
+                 burst: float = None, target_latency: float = 2.0, increase: int = None,
+                 decrease: float = 0.5):
+        self.max_rows = max(1, max_rows)
+        self.min_rows = max(1, min(min_rows, self.max_rows))
+        self.batch_rows = self.max_rows
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.target_latency = target_latency
+        self.increase = increase or max(1, self.max_rows // 20)
+        self.decrease = decrease
+        self.paused_until = 0.0
+        self.throttled = 0
+
+    def acquire(self) -> float:
+        """Return 0 if a request may start now, else the seconds to wait first"""
+        wait = self.paused_until - time.monotonic()
+        if wait > 0:
+            return wait
+        return self.bucket.take() if self.bucket is not None else 0.0
+
+    def on_success(self, latency: float):
+        if latency > self.target_latency:
+            self.shrink()
+        else:
+            self.batch_rows = min(self.max_rows, self.batch_rows + self.increase)
+
+    def on_failure(self, error, backoff: float) -> float:
+        """Adapt to a failed request and return the seconds to wait before retrying it"""
+        delay = retry_after(error)
+        timed_out = isinstance(error, (TimeoutError, requests.Timeout))
+        if timed_out or status_code(error) in THROTTLE_STATUSES:
+            self.throttled += 1
+            self.shrink()
+        if delay is None:
+            return backoff
+        until = time.monotonic() + delay
+        self.paused_until = max(self.paused_until, until)
+        if self.bucket is not None:
+            self.bucket.drain(until)
+        return delay
+
+    def shrink(self):
+        self.batch_rows = max(self.min_rows, int(self.batch_rows * self.decrease))
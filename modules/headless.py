@@ -0,0 +1,93 @@
+"""
+Run the monitor without Qt, for unattended servers.
+
+    python -m modules.headless --config monitor.ini [FILE ...]
+
+Settings come from the [monitor] section of the config file (or the file
+named by EXCEL_MONITOR_CONFIG) and EXCEL_MONITOR_<KEY> environment
+variables, see ConfigSettings. The files to monitor are the FILE arguments,
+or the `files` setting. The same MonitorManager as the GUI detects and
+syncs the changes; progress goes to the log and, every `status_interval_s`
+seconds, a line with the row counters. Stops on Ctrl+C or SIGTERM.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+from modules.config import ConfigSettings
+from modules.logger import message_level, setup_logging, shutdown_logging
+from modules.monitor_manager import MonitorManager
+
+log = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m modules.headless',
+                                     description="Monitor files and sync new rows without a GUI")
+    parser.add_argument('files', nargs='*', help="files or 'book.xlsx#Sheet' targets to monitor")
+    parser.add_argument('--config', default=os.environ.get('EXCEL_MONITOR_CONFIG'),
+                        help="INI file with a [monitor] section of settings")
+    parser.add_argument('--log-level', help="overrides the log_level setting")
+    return parser.parse_args(argv)
+
+
+def create_manager(settings) -> MonitorManager:
+    """Return a MonitorManager reporting its progress to the log"""
+
+    def on_log(file_path, message):
+        log.log(message_level(message), "[%s] %s", file_path, message)
+
+    def on_error(file_path, message):
+        log.error("[%s] %s", file_path, message)
+
+    def on_status(file_path, status):
+        log.info("[%s] Status: %s", file_path, status)
+
+    return MonitorManager(settings, on_log=on_log, on_error=on_error, on_status=on_status)
+
+
+def run(manager: MonitorManager, files: list, stopped: threading.Event,
+        status_interval: float = 60.0):
+    """Monitor `files` until `stopped` is set, logging the counters periodically"""
+    for file_path in files:
+        manager.add_file(file_path)
+    manager.start()
+    log.info("Monitoring %d file(s)", len(files))
+    try:
+        while not stopped.wait(status_interval):
+            counters = manager.counters()
+            log.info("Detected %d rows, synced %d, queued %d, failed requests %d",
+                     counters['rows_detected'], counters['rows_synced'],
+                     counters['queue_depth'], counters['sync_failures'])
+    finally:
+        manager.stop()
+        log.info("Monitor stopped")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    settings = ConfigSettings(args.config)
+    setup_logging(level=args.log_level or settings.value('log_level', 'INFO'),
+                  log_dir=settings.value('log_dir'), console=True)
+    try:
+        files = args.files or settings.files()
+        if not files:
+            log.error("No files to monitor: pass them as arguments or set `files`")
+            return 2
+
+        stopped = threading.Event()
+        for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), lambda signum, frame: stopped.set())
+        run(create_manager(settings), files, stopped,
+            float(settings.value('status_interval_s', 60)))
+        return 0
+    finally:
+        shutdown_logging()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import collections
+import re
+from datetime import datetime
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QAbstractItemView, QListView
+
+from modules.logger import ROW_LINE
+
+# Bulk events, optionally prefixed with '[file] ', summarised per refresh
+SYNCED_LINE = re.compile(r'^(\[[^\]]*\] )?Synced (\d+) rows \((\d+) pending\)$')
+
+LEVEL_COLORS = {'error': QColor('#FF5252'), 'warning': QColor('#FFB300')}
+
+
+def summarize(entries: list) -> list:
+    """Collapse per-row lines of one refresh into one summary line per file
+
+    `entries` are (time, level, message) tuples. Runs of 'Row N: ...' lines
+    become "1,204 rows detected (rows 12-1,215)" and 'Synced N rows (P
+    pending)' lines "1,204 rows synced (0 pending)", placed where the first
+    line of the run was.
+    """
+    # (kind, prefix) -> [position, lines, first row or rows synced, last row, pending]
+    summaries = {}
+    result = []
+    for entry in entries:
+        timestamp, level, message = entry
+        match = ROW_LINE.match(message)
+        if match:
+            key = ('rows', match.group(1))
+            row = int(match.group(2))
+            if key not in summaries:
+                summaries[key] = [len(result), 0, row, row, None]
+                result.append(entry)
+            summary = summaries[key]
+            summary[1] += 1
+            summary[2], summary[3] = min(summary[2], row), max(summary[3], row)
+            continue
+        match = SYNCED_LINE.match(message)
+        if match:
+            key = ('synced', match.group(1))
+            if key not in summaries:
+                summaries[key] = [len(result), 0, 0, 0, None]
+                result.append(entry)
+            summary = summaries[key]
+            summary[1] += 1
+            summary[2] += int(match.group(2))
+            summary[4] = int(match.group(3))
+            continue
+        result.append(entry)
+
+    for (kind, prefix), (position, count, first, last, pending) in summaries.items():
+        if count == 1:
+            continue
+        timestamp, level, _ = result[position]
+        if kind == 'rows':
+            message = f"{count:,} rows detected (rows {first:,}-{last:,})"
+        else:
+            message = f"{first:,} rows synced ({pending:,} pending)"
+        result[position] = (timestamp, level, (prefix or '') + message)
+    return result
+
+
+class LogModel(QAbstractListModel):
+    """Ring buffer of the last `max_lines` log lines, refreshed `fps` times a second
+
+    append() only queues a line; the queued lines are summarised (see
+    summarize) and inserted into the model together on the next refresh,
+    and the oldest lines dropped once the buffer is full. Views therefore
+    get at most `fps` updates a second, however fast lines arrive.
+    """
+
+    def __init__(self, max_lines: int = 10000, fps: int = 10, parent=None):
+        super().__init__(parent)
+        self.lines = collections.deque(maxlen=max(1, max_lines))
+        self.pending = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(1, 1000 // max(1, fps)))
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def append(self, message: str, level: str = 'info'):
+        """Queue a line for the next refresh"""
+        self.pending.append((datetime.now().strftime("%H:%M:%S"), level, message))
+
+    def flush(self):
+        """Insert the queued lines, dropping the oldest ones past `max_lines`"""
+        if not self.pending:
+            return
+        entries, self.pending = summarize(self.pending), []
+        entries = entries[-self.lines.maxlen:]
+        overflow = len(self.lines) + len(entries) - self.lines.maxlen
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self.lines.popleft()
+            self.endRemoveRows()
+        start = len(self.lines)
+        self.beginInsertRows(QModelIndex(), start, start + len(entries) - 1)
+        self.lines.extend(entries)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.lines):
+            return None
+        timestamp, level, message = self.lines[index.row()]
+        if role == Qt.DisplayRole:
+            if level == 'error':
+                return f"[{timestamp}] ERROR: {message}"
+            return f"[{timestamp}] {message}"
+        if role == Qt.ForegroundRole:
+            return LEVEL_COLORS.get(level)
+        if role == Qt.ToolTipRole:
+            return message
+        return None
+
+
+class LogView(QListView):
+    """Virtualised view of a LogModel that follows new lines while scrolled to the end
+
+    Only the visible lines are laid out and painted, since every line has
+    the same height.
+    """
+
+    def __init__(self, parent=None, max_lines: int = 10000, fps: int = 10):
+        super().__init__(parent)
+        self.log_model = LogModel(max_lines, fps, self)
+        self.setModel(self.log_model)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.follow = True
+        self.verticalScrollBar().valueChanged.connect(self.on_scrolled)
+        self.log_model.rowsInserted.connect(self.on_rows_inserted)
+
+    def append(self, message: str, level: str = 'info'):
+        self.log_model.append(message, level)
+
+    def on_scrolled(self, value: int):
+        self.follow = value >= self.verticalScrollBar().maximum()
+
+    def on_rows_inserted(self):
+        if self.follow:
+            self.scrollToBottom()
@@ -1,36 +1,158 @@
-import os
+import atexit
+import json
 import logging
-from datetime import datetime
+import logging.handlers
+import os
+import queue
+import re
 import sys
+from datetime import datetime
+
+# Attributes every LogRecord has; anything else came in through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+# Per-row activity lines, optionally prefixed with '[file] '
+ROW_LINE = re.compile(r'^(\[[^\]]*\] )?Row (\d+): ')
+
+_listener = None
+
+
+def default_log_dir() -> str:
+    """Return the logs directory next to the executable or package"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "logs")
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format records as one JSON object per line
+
+    Fields passed as `extra={...}` (file, rows, seq, ...) are kept as their
+    own keys, so the log can be filtered and aggregated without parsing
+    message text.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RotatingLogHandler(logging.handlers.TimedRotatingFileHandler):
+    """Rotate the log file at the `when` interval or once it reaches `max_bytes`"""
+
+    def __init__(self, filename: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 7,
+                 when: str = 'midnight'):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding='utf-8',
+                         delay=True)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.seek(0, 2)
+        return self.stream.tell() >= self.max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Several size rotations within one interval need distinct names
+        name, count = default_name, 0
+        while os.path.exists(name):
+            count += 1
+            name = f"{default_name}.{count}"
+        return name
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records unformatted, leaving all formatting to the writer thread
+
+    Records stay in this process, so their arguments and tracebacks need not
+    be rendered to text first as the stock QueueHandler does.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level='INFO', log_dir: str = None, max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 7, when: str = 'midnight', console: bool = False):
+    """Route all logging through a queue to a background writer thread
+
+    Callers only put records on a queue (DeferredQueueHandler); a QueueListener
+    formats them and writes them to a size- and time-rotated JSON lines file
+    in `log_dir`, and to stderr with `console`. Records below `level` are
+    dropped before their message is formatted. Calling it again replaces
+    the previous configuration.
+    """
+    global _listener
+    shutdown_logging()
+    log_dir = log_dir or default_log_dir()
+    os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = RotatingLogHandler(os.path.join(log_dir, "excel_monitor.log"),
+                                      max_bytes, backup_count, when)
+    file_handler.setFormatter(StructuredFormatter())
+    handlers = [file_handler]
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(
+            logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        handlers.append(stream_handler)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(records))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Write out the queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def message_level(message: str, level: int = logging.INFO) -> int:
+    """Return the level to log an activity line at
+
+    Lines with the contents of one row are only logged at DEBUG, so the log
+    file does not fill up with row data at the default level.
+    """
+    return logging.DEBUG if level == logging.INFO and ROW_LINE.match(message) else level
+
 
 class Logger:
-    def __init__(self):
-        # Get the directory where the executable is running
-        if getattr(sys, 'frozen', False):
-            # If running as compiled executable
-            base_dir = os.path.dirname(sys.executable)
-        else:
-            # If running as script
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # Create logs directory in the same location as the executable
-        self.log_dir = os.path.join(base_dir, "logs")
-        if not os.path.exists(self.log_dir):
-            os.makedirs(self.log_dir)
-        
-        # Set log file path
-        self.log_file = os.path.join(self.log_dir, "excel_monitor.log")
-        
-        # Configure logging
-        logging.basicConfig(
-            filename=self.log_file,
-            level=logging.INFO,
-            format='%(asctime)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        self.logger = logging.getLogger('ExcelMonitor')
-    
-    def log(self, message):
-        """Log a message with timestamp"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.logger.info(f"{timestamp} - {message}") 
\ No newline at end of file
+    """Activity log of the main window, written through the logging pipeline"""
+
+    def __init__(self, name: str = 'ExcelMonitor'):
+        self.logger = logging.getLogger(name)
+
+    def log(self, message, level: int = logging.INFO):
+        """Log a message at message_level(); the formatter adds the timestamp"""
+        self.logger.log(message_level(message, level), "%s", message)
@@ -0,0 +1,224 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stages a detected row passes through, in order; 'lag' spans all of them
+STAGES = ('detect', 'read', 'diff', 'serialize', 'queue', 'send', 'ack')
+
+# Upper bounds in seconds, from sub-millisecond encodes to minutes of backlog
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, float('inf'))
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their total count and sum"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float, count: int = 1):
+        """Record `count` observations of `value`"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += count
+        self.count += count
+        self.sum += value * count
+
+    def copy(self) -> 'Histogram':
+        histogram = Histogram(self.bounds)
+        histogram.merge(self)
+        return histogram
+
+    def merge(self, other: 'Histogram'):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile, interpolating linearly inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-2]
+
+
+def label_text(labels: tuple, extra: str = '') -> str:
+    parts = [f'{name}="{escape(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metrics:
+    """Counters and latency histograms of the monitor, labelled per file
+
+    inc() and observe() may be called from any thread; each takes one lock
+    for a few additions. Stage latencies are observed as `stage_seconds`
+    with a `stage` label (see STAGES) and the time from detection to
+    acknowledgement of each row as `lag_seconds`. Sync requests only know
+    their server file id, so monitors map it to their name with
+    register_file().
+    """
+
+    def __init__(self, prefix: str = 'excel_monitor'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.files = {}
+        self.started = time.time()
+
+    def register_file(self, file_id: str, name: str):
+        self.files[file_id] = name
+
+    def file_name(self, file_id: str) -> str:
+        return self.files.get(file_id, file_id)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, count: int = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds, count)
+
+    def stage(self, stage: str, seconds: float, file: str, count: int = 1):
+        """Observe the latency of one pipeline stage of a file"""
+        self.observe('stage_seconds', seconds, count, stage=stage, file=file)
+
+    def total(self, name: str, **labels) -> float:
+        """Sum of a counter over every label set containing `labels`"""
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(value for (key, key_labels), value in self.counters.items()
+                       if key == name and wanted <= set(key_labels))
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """Merge of a histogram over every label set containing `labels`"""
+        wanted = set(labels.items())
+        merged = Histogram()
+        with self.lock:
+            for (key, key_labels), histogram in self.histograms.items():
+                if key == name and wanted <= set(key_labels):
+                    merged.merge(histogram)
+        return merged
+
+    def snapshot(self) -> dict:
+        """Return every counter and histogram summary as JSON-serialisable values"""
+        with self.lock:
+            counters = list(self.counters.items())
+            histograms = [(key, histogram.copy()) for key, histogram in self.histograms.items()]
+        return {
+            'time': time.time(),
+            'uptime_s': time.time() - self.started,
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in counters],
+            'histograms': [{
+                'name': name,
+                'labels': dict(labels),
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99),
+            } for (name, labels), histogram in histograms],
+        }
+
+    def prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, histogram.copy())
+                                for key, histogram in self.histograms.items())
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            full = f'{self.prefix}_{name}_total'
+            if full not in typed:
+                typed.add(full)
+                lines.append(f'# TYPE {full} counter')
+            lines.append(f'{full}{label_text(labels)} {value}')
+        for (name, labels), histogram in histograms:
+            full = f'{self.prefix}_{name}'
+            if full not in typed:
+                typed.add(full)
+                lines.append(f'# TYPE {full} histogram')
+            cumulative = 0
+            for bound, bucket in zip(histogram.bounds, histogram.counts):
+                cumulative += bucket
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f'{full}_bucket{label_text(labels, le)} {cumulative}')
+            lines.append(f'{full}_sum{label_text(labels)} {histogram.sum}')
+            lines.append(f'{full}_count{label_text(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serve a Metrics registry on localhost: /metrics as Prometheus text, /metrics.json"""
+
+    def __init__(self, metrics: Metrics, port: int = 9464, host: str = '127.0.0.1'):
+        self.metrics = metrics
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = registry.prometheus(), PROMETHEUS_CONTENT_TYPE
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(registry.snapshot()), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics',
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,69 @@
+import time
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QFrame, QLabel, QVBoxLayout
+
+from modules.metrics import STAGES
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:,.0f} ms"
+    return f"{seconds:,.1f} s"
+
+
+def summarize_metrics(metrics, rows_per_s: float) -> tuple:
+    """Return the throughput and lag line and the per-stage line of the panel"""
+    lag = metrics.histogram('lag_seconds')
+    summary = (f"Synced {rows_per_s:,.0f} rows/s | End-to-end lag "
+               f"p50 {format_seconds(lag.quantile(0.5))}, "
+               f"p99 {format_seconds(lag.quantile(0.99))}")
+    stages = []
+    for stage in STAGES:
+        histogram = metrics.histogram('stage_seconds', stage=stage)
+        if histogram.count:
+            stages.append(f"{stage} {format_seconds(histogram.quantile(0.5))}"
+                          f"/{format_seconds(histogram.quantile(0.99))}")
+    return summary, ("p50/p99: " + " | ".join(stages)) if stages else ""
+
+
+class MetricsPanel(QFrame):
+    """Rows synced per second, end-to-end lag and stage latencies of a Metrics registry
+
+    Reads the registry once every `interval_ms` on the GUI thread; nothing
+    is pushed to it by the workers.
+    """
+
+    def __init__(self, parent=None, interval_ms: int = 1000):
+        super().__init__(parent)
+        self.metrics = None
+        self.last_rows = None
+        self.last_time = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.summary_label = QLabel("")
+        self.stages_label = QLabel("")
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.stages_label)
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    def set_metrics(self, metrics):
+        self.metrics = metrics
+        self.last_rows = self.last_time = None
+        self.refresh()
+
+    def refresh(self):
+        if self.metrics is None:
+            return
+        now = time.monotonic()
+        rows = self.metrics.total('rows_synced')
+        rate = 0.0
+        if self.last_time is not None and now > self.last_time:
+            rate = (rows - self.last_rows) / (now - self.last_time)
+        self.last_rows, self.last_time = rows, now
+        summary, stages = summarize_metrics(self.metrics, rate)
+        self.summary_label.setText(summary)
+        self.stages_label.setText(stages)
@@ -1,215 +1,136 @@
+import logging
 import os
-import time
-import uuid
-from datetime import datetime
 from typing import Optional
 
 import pandas as pd
 from PySide6.QtCore import QThread, Signal, QSettings
-from watchdog.observers import Observer
-import requests
 
-from modules.file_handler import ExcelHandler
+from modules.event_bridge import EventBatch, EventBridge
+from modules.monitor_manager import MonitorManager
+from modules.outbox import Outbox
+
+log = logging.getLogger(__name__)
+
+# Worker processes the GUI parses in unless the parse_processes setting says
+# otherwise, so parsing a large file does not hold the GIL the GUI runs under
+GUI_PARSE_PROCESSES = 2
+
 
 class ExcelMonitor(QThread):
+    """Qt front end of the MonitorManager
+
+    Turns the manager's callbacks into signals for the GUI. The file passed
+    to the constructor is the primary file, which the single-file helpers
+    (read_file, check_excel_changes, sync_to_cloud, ...) operate on; more
+    files, and sheets, named ranges or tables of a workbook given as
+    'book.xlsx#Name', can be registered with add_file().
+
+    The manager's callbacks run on worker threads and go to an EventBridge,
+    which hands them to the GUI thread every `ui_refresh_ms` (250 by
+    default) as one EventBatch through `events_signal`, with the manager's
+    counters and their rates. The per-line signals are still emitted, from
+    the GUI thread, when a batch is flushed.
+    """
+    events_signal = Signal(object)
     log_signal = Signal(str)
     error_signal = Signal(str)
     status_signal = Signal(str)
+    file_status_signal = Signal(str, str)
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: Optional[str] = None, outbox: Optional[Outbox] = None):
         super().__init__()
         self.file_path = file_path
-        self.observer = Observer()
-        self.handler = ExcelHandler(self.check_excel_changes)
-        self.running = True
-        self.last_row_count = 0
         self.settings = QSettings('ExcelMonitor', 'Settings')
-        self.file_id = str(uuid.uuid4())[:16]
-        print(f"[DEBUG] Monitor initialized for file: {file_path}")
-        print(f"[DEBUG] Generated file ID: {self.file_id}")
-        self.upload_file()
+        self.bridge = EventBridge(interval_ms=int(self.settings.value('ui_refresh_ms', 250)))
+        self.manager = MonitorManager(
+            self.settings,
+            outbox,
+            on_log=self.bridge.log,
+            on_error=self.bridge.error,
+            on_status=self.bridge.status,
+            parse_processes=GUI_PARSE_PROCESSES,
+        )
+        self.bridge.counters = self.manager.counters
+        self.bridge.batch_signal.connect(self.on_events)
+        if file_path:
+            self.add_file(file_path)
 
     def run(self):
-        print("[DEBUG] Starting monitor thread")
-        self.observer.schedule(self.handler, os.path.dirname(self.file_path), recursive=False)
-        self.observer.start()
-        self.log_signal.emit("Monitor started")
-        self.status_signal.emit("Monitoring")
-        
-        try:
-            df = self.read_file(self.file_path)
-            self.last_row_count = len(df)
-            print(f"[DEBUG] Initial row count: {self.last_row_count}")
-            self.log_signal.emit(f"Initial rows: {self.last_row_count}")
-        except Exception as e:
-            print(f"[DEBUG] Error reading file: {str(e)}")
-            self.error_signal.emit(f"Error reading file: {str(e)}")
-            self.status_signal.emit("Error")
-
-        while self.running:
-            time.sleep(1)
+        log.info("Starting monitor threads")
+        self.manager.start()
+        self.bridge.log(None, "Monitor started")
+        self.bridge.status(None, "Monitoring")
 
     def stop(self):
-        print("[DEBUG] Stopping monitor")
-        self.running = False
-        self.observer.stop()
-        self.observer.join()
-        self.log_signal.emit("Monitor stopped")
-        self.status_signal.emit("Stopped")
+        log.info("Stopping monitor")
+        self.wait()
+        self.manager.stop()
+        self.bridge.log(None, "Monitor stopped")
+        self.bridge.status(None, "Stopped")
+        self.bridge.flush()
+        self.bridge.timer.stop()
+        # The bridge and manager refer to each other; break the cycle so they are
+        # freed on this thread, not by the garbage collector on a worker thread
+        self.bridge.counters = None
+
+    def add_file(self, file_path: str):
+        self.manager.add_file(file_path)
+        if self.file_path is None:
+            self.file_path = file_path
+
+    def remove_file(self, file_path: str):
+        self.manager.remove_file(file_path)
+
+    def file_paths(self) -> list:
+        return [status['file_path'] for status in self.manager.file_status()]
+
+    def format_message(self, file_path: str, message: str) -> str:
+        if file_path and len(self.manager.monitors()) > 1:
+            return f"[{os.path.basename(file_path)}] {message}"
+        return message
+
+    def on_events(self, batch: EventBatch):
+        """Prefix the file names of a flushed batch and pass it on, on the GUI thread"""
+        batch.logs = [(file_path, level, self.format_message(file_path, message))
+                      for file_path, level, message in batch.logs]
+        self.events_signal.emit(batch)
+        for file_path, level, message in batch.logs:
+            (self.error_signal if level == 'error' else self.log_signal).emit(message)
+        for file_path, status in batch.statuses.items():
+            if file_path:
+                self.file_status_signal.emit(file_path, status)
+            self.status_signal.emit(self.format_message(file_path, status))
+
+    @property
+    def file_monitor(self):
+        """The FileMonitor of the primary file"""
+        return self.manager.get_monitor(self.file_path)
+
+    @property
+    def handler(self):
+        return self.manager.get_file(self.file_path).handler
+
+    @property
+    def file_id(self) -> str:
+        return self.file_monitor.file_id
+
+    @property
+    def last_row_count(self) -> int:
+        return self.file_monitor.last_row_count
+
+    @last_row_count.setter
+    def last_row_count(self, value: int):
+        self.file_monitor.last_row_count = value
+
+    @property
+    def parse_count(self) -> int:
+        return self.file_monitor.parse_count
 
     def read_file(self, file_path: str) -> pd.DataFrame:
-        print(f"[DEBUG] Reading file: {file_path}")
-        file_ext = os.path.splitext(file_path)[1].lower()
-        if file_ext == '.csv':
-            return pd.read_csv(file_path)
-        elif file_ext in ['.xlsx', '.xls', '.xlsm', '.xlsb']:
-            return pd.read_excel(file_path)
-        else:
-            raise ValueError(f"Unsupported file format: {file_ext}")
+        return self.file_monitor.read_file(file_path)
 
     def check_excel_changes(self, file_path: str):
-        try:
-            print(f"[DEBUG] Checking for changes in: {file_path}")
-            df = self.read_file(file_path)
-            current_row_count = len(df)
-            
-            if current_row_count > self.last_row_count:
-                new_rows = df.iloc[self.last_row_count:]
-                print(f"[DEBUG] Found {len(new_rows)} new rows")
-                self.log_signal.emit(f"New rows detected: {len(new_rows)}")
-                
-                for idx, row in new_rows.iterrows():
-                    row_data = row.to_dict()
-                    print(f"[DEBUG] New row {idx + 1}: {row_data}")
-                    self.log_signal.emit(f"Row {idx + 1}: {row_data}")
-                
-                self.sync_to_cloud(new_rows)
-                self.last_row_count = current_row_count
-        except Exception as e:
-            print(f"[DEBUG] Error processing changes: {str(e)}")
-            self.error_signal.emit(f"Error processing changes: {str(e)}")
-            self.status_signal.emit("Error")
-
-    def upload_file(self):
-        try:
-            api_url = self.settings.value('api_url')
-            api_key = self.settings.value('api_key')
-            
-            print(f"[DEBUG] API URL: {api_url}")
-            print(f"[DEBUG] API Key: {api_key}")
-            
-            if not api_url or not api_key:
-                print("[DEBUG] API credentials not set")
-                self.error_signal.emit("API credentials not set")
-                return
-
-            print("[DEBUG] Starting file upload")
-            self.log_signal.emit("Uploading file...")
-            
-            with open(self.file_path, 'rb') as file:
-                file_content = file.read()
-
-            # Get file extension and type
-            file_ext = os.path.splitext(self.file_path)[1].lower()
-            file_type = 'csv' if file_ext == '.csv' else 'excel'
-            
-            # Prepare the request
-            files = {
-                'file': (os.path.basename(self.file_path), file_content)
-            }
-            data = {
-                'file_id': self.file_id
-            }
-            
-            # Set proper headers for multipart form data
-            headers = {
-                'Authorization': f'Token {api_key}',
-                'original_filename': os.path.basename(self.file_path),
-                'file_type': file_type
-            }
-            
-            print(f"[DEBUG] Uploading to: {api_url}/api/file-management/files/")
-            print(f"[DEBUG] Headers: {headers}")
-            print(f"[DEBUG] File ID: {self.file_id}")
-            print(f"[DEBUG] File type: {file_type}")
-            
-            # Make the request
-            response = requests.post(
-                f"{api_url}/api/file-management/files/",
-                data=data,
-                files=files,
-                headers=headers
-            )
-            
-            # Log response details
-            print(f"[DEBUG] Response status: {response.status_code}")
-            print(f"[DEBUG] Response headers: {response.headers}")
-            print(f"[DEBUG] Response content: {response.text}")
-            
-            # Check for specific error cases
-            if response.status_code == 401:
-                print("[DEBUG] Authentication failed. Check API key.")
-                self.error_signal.emit("Authentication failed. Please check your API key.")
-                return
-            elif response.status_code == 400:
-                print("[DEBUG] Bad request. Check request format.")
-                self.error_signal.emit(f"Bad request: {response.text}")
-                return
-            
-            response.raise_for_status()
-            
-            print(f"[DEBUG] File uploaded successfully. ID: {self.file_id}")
-            self.log_signal.emit(f"File uploaded successfully. ID: {self.file_id}")
-        except requests.exceptions.RequestException as e:
-            print(f"[DEBUG] Request error: {str(e)}")
-            if hasattr(e.response, 'text'):
-                print(f"[DEBUG] Error response: {e.response.text}")
-            self.error_signal.emit(f"Upload failed: {str(e)}")
-            self.status_signal.emit("Error")
-        except Exception as e:
-            print(f"[DEBUG] Unexpected error: {str(e)}")
-            self.error_signal.emit(f"Upload failed: {str(e)}")
-            self.status_signal.emit("Error")
-
-    def sync_to_cloud(self, new_rows: pd.DataFrame):
-        try:
-            api_url = self.settings.value('api_url')
-            api_key = self.settings.value('api_key')
-            
-            if not api_url or not api_key:
-                print("[DEBUG] API credentials not set")
-                self.error_signal.emit("API credentials not set")
-                return
-
-            print(f"[DEBUG] Starting sync of {len(new_rows)} rows")
-            self.log_signal.emit(f"Syncing {len(new_rows)} rows...")
-            
-            for idx, (_, row) in enumerate(new_rows.iterrows(), 1):
-                update_data = row.to_dict()
-                payload = {
-                    "file_id": self.file_id,
-                    "update_data": update_data
-                }
-                
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json'
-                }
-                
-                print(f"[DEBUG] Updating row {idx}: {update_data}")
-                self.log_signal.emit(f"Updating row {idx}: {update_data}")
-                
-                response = requests.post(f"{api_url}/api/file-management/files/update_rows/", 
-                                      json=payload, 
-                                      headers=headers)
-                response.raise_for_status()
-                
-                print(f"[DEBUG] Row {idx} updated successfully")
-                self.log_signal.emit(f"Row {idx} updated successfully")
-            
-            print("[DEBUG] All rows synced successfully")
-            self.log_signal.emit("All rows synced successfully")
-        except Exception as e:
-            print(f"[DEBUG] Sync failed: {str(e)}")
-            self.error_signal.emit(f"Sync failed: {str(e)}")
-            self.status_signal.emit("Error") 
\ No newline at end of file
+        self.file_monitor.check_excel_changes(file_path)
+
+    def sync_to_cloud(self, new_rows: pd.DataFrame) -> bool:
+        return self.file_monitor.sync_to_cloud(new_rows)
@@ -0,0 +1,379 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from modules.file_handler import ExcelHandler
+from modules.file_monitor import WORKBOOK_EXTENSIONS, FileMonitor, split_target, target_key
+from modules.metrics import Metrics, MetricsServer
+from modules.outbox import Outbox
+from modules.parse_jobs import ParseBackend, WorkbookJob
+from modules.sync_client import CloudSync
+from modules.xlsx_reader import XlsxWorkbook
+
+log = logging.getLogger(__name__)
+
+
+class DirectoryHandler(FileSystemEventHandler):
+    """Route the events of one watched directory to the handlers of its files"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        targets = set()
+        for path in (event.src_path, getattr(event, 'dest_path', '')):
+            handler = self.handlers.get(os.path.normcase(os.path.abspath(path))) if path else None
+            if handler is not None:
+                targets.add(handler)
+        for handler in targets:
+            handler.dispatch(event)
+
+
+class MonitoredFile:
+    """Book-keeping for one registered file and the targets monitored in it
+
+    `monitors` maps target keys to their FileMonitor: the file itself, or
+    sheets, named ranges and tables of a workbook, which share `workbook`.
+    """
+
+    def __init__(self, handler: ExcelHandler, workbook: XlsxWorkbook = None):
+        self.handler = handler
+        self.workbook = workbook
+        self.monitors = {}
+        self.initialized = set()
+        self.running = False
+        self.rerun = False
+
+    @property
+    def monitor(self) -> FileMonitor:
+        """The first registered target"""
+        return next(iter(self.monitors.values()))
+
+
+class MonitorManager:
+    """Monitor many files with a fixed set of threads
+
+    All files share one watchdog Observer (one watch per directory), one
+    scheduler thread that drives every file's poll and quiet-period timing,
+    a bounded pool of parse workers and one outbox sender, which keeps up to
+    `sync_in_flight` requests in flight (see sync_stats()). With the
+    `parse_processes` setting (`parse_processes` by default) above 0, the
+    parse workers hand the reading and diffing to that many worker processes
+    and only wait for them; with 0 they parse in-thread, holding the GIL of
+    the process while they do. A file is never parsed by two workers at
+    once; a change arriving during a parse queues one more parse after it.
+    All targets registered in one workbook ('book.xlsx#Sheet', see
+    split_target) share its watch and are scanned together, with one read
+    of the workbook per change.
+
+    Progress is reported through `on_log(file_path, message)`,
+    `on_error(file_path, message)` and `on_status(file_path, status)`, and
+    totals of rows detected and synced through counters(). Per-file counters
+    and stage latencies go to `metrics`, which is served on localhost at
+    /metrics (Prometheus text) and /metrics.json while running if the
+    `metrics_port` setting is above 0.
+
+    Without an `outbox`, the manager opens the one at the `outbox_path`
+    setting (or the default path) and closes it in stop().
+    """
+
+    def __init__(self, settings, outbox: Outbox = None, max_workers: int = None,
+                 on_log=None, on_error=None, on_status=None, parse_processes: int = 0):
+        self.settings = settings
+        self.owns_outbox = outbox is None
+        self.outbox = outbox or Outbox(settings.value('outbox_path') or None)
+        self.max_workers = max_workers or int(settings.value('parse_workers', 4))
+        self.on_log = on_log
+        self.on_error = on_error
+        self.on_status = on_status
+        self.files = {}
+        self.directories = {}
+        self.lock = threading.RLock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.observer = None
+        self.scheduler = None
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix='parse')
+        self.parse_backend = ParseBackend(int(settings.value('parse_processes',
+                                                             parse_processes)))
+        self.counter_lock = threading.Lock()
+        self.rows_detected = 0
+        self.rows_synced = 0
+        self.sync_failures = 0
+        self.queue_depth = self.outbox.pending()
+        self.metrics = Metrics()
+        self.metrics_server = None
+        self.cloud_sync = CloudSync(settings, self.outbox, on_sent=self.on_rows_sent,
+                                    on_error=self.on_send_error, metrics=self.metrics)
+
+    def start(self):
+        """Start the observer, scheduler and sender threads"""
+        self.stopped.clear()
+        with self.lock:
+            self.observer = Observer()
+            for directory, entry in self.directories.items():
+                entry[1] = self.observer.schedule(entry[0], directory, recursive=False)
+        self.observer.start()
+        self.cloud_sync.start()
+        port = int(self.settings.value('metrics_port', 0))
+        if port > 0 and self.metrics_server is None:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, port)
+                self.metrics_server.start()
+            except OSError:
+                log.exception("Cannot serve metrics on port %d", port)
+                self.metrics_server = None
+        self.scheduler = threading.Thread(target=self.run, name='monitor-scheduler', daemon=True)
+        self.scheduler.start()
+        for key in list(self.files):
+            self.submit(key)
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+        if self.scheduler is not None:
+            self.scheduler.join()
+            self.scheduler = None
+        self.executor.shutdown(wait=True)
+        self.parse_backend.shutdown()
+        self.cloud_sync.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self.owns_outbox:
+            self.outbox.close()
+
+    def add_file(self, file_path: str) -> FileMonitor:
+        """Register a file or workbook target; it is initialised on a parse worker once started"""
+        path = split_target(file_path)[0]
+        key = os.path.normcase(os.path.abspath(path))
+        monitor_key = target_key(file_path)
+        with self.lock:
+            entry = self.files.get(key)
+            if entry is not None and monitor_key in entry.monitors:
+                return entry.monitors[monitor_key]
+
+            if entry is None:
+                handler = ExcelHandler(
+                    lambda changed: self.submit(key),
+                    polling_interval=int(self.settings.value('polling_interval_ms', 1000)) / 1000,
+                    quiet_period=int(self.settings.value('quiet_period_ms', 500)) / 1000,
+                    max_latency=int(self.settings.value('max_latency_ms', 5000)) / 1000,
+                )
+                # Handlers share the scheduler's wake-up event instead of their own thread
+                handler.wakeup = self.wakeup
+                handler.prepare(path)
+                workbook = None
+                if os.path.splitext(path)[1].lower() in WORKBOOK_EXTENSIONS:
+                    workbook = XlsxWorkbook(path)
+                entry = self.files[key] = MonitoredFile(handler, workbook)
+
+                directory = os.path.dirname(key)
+                if directory not in self.directories:
+                    dir_handler = DirectoryHandler()
+                    watch = None
+                    if self.observer is not None:
+                        watch = self.observer.schedule(dir_handler, directory, recursive=False)
+                    self.directories[directory] = [dir_handler, watch]
+                self.directories[directory][0].handlers[key] = handler
+
+            monitor = FileMonitor(
+                file_path,
+                self.settings,
+                self.outbox,
+                notify_sender=self.cloud_sync.notify,
+                on_log=lambda message: self.on_log and self.on_log(file_path, message),
+                on_error=lambda message: self.on_error and self.on_error(file_path, message),
+                on_status=lambda status: self.on_status and self.on_status(file_path, status),
+                workbook=entry.workbook,
+                metrics=self.metrics,
+                parse_backend=self.parse_backend,
+                on_queued=self.on_rows_queued,
+            )
+            entry.monitors[monitor_key] = monitor
+
+        # The first parse on the worker pool uploads and initialises the target
+        if self.scheduler is not None:
+            self.submit(key)
+            self.wakeup.set()
+        return monitor
+
+    def remove_file(self, file_path: str):
+        """Unregister a file or workbook target; the watch goes with the last target"""
+        key = os.path.normcase(os.path.abspath(split_target(file_path)[0]))
+        with self.lock:
+            entry = self.files.get(key)
+            monitor = entry and entry.monitors.pop(target_key(file_path), None)
+            if monitor is None:
+                return
+            entry.initialized.discard(monitor)
+            if entry.monitors:
+                monitor.set_status("Stopped")
+                return
+            del self.files[key]
+            directory = os.path.dirname(key)
+            dir_handler, watch = self.directories[directory]
+            dir_handler.handlers.pop(key, None)
+            if not dir_handler.handlers:
+                if watch is not None and self.observer is not None:
+                    self.observer.unschedule(watch)
+                del self.directories[directory]
+        monitor.set_status("Stopped")
+
+    def submit(self, key: str):
+        """Queue a parse of a changed file on the worker pool"""
+        with self.lock:
+            entry = self.files.get(key)
+            if entry is None:
+                return
+            if entry.running:
+                entry.rerun = True
+                return
+            entry.running = True
+        self.executor.submit(self.parse, entry)
+
+    def parse(self, entry: MonitoredFile):
+        while True:
+            with self.lock:
+                monitors = list(entry.monitors.values())
+            ready = [monitor for monitor in monitors if monitor in entry.initialized]
+            for monitor in monitors:
+                if monitor in entry.initialized:
+                    continue
+                try:
+                    # A monitor without a baseline is initialized again on the next change
+                    if monitor.initialize(upload=True):
+                        entry.initialized.add(monitor)
+                except Exception as e:
+                    log.exception("Error initializing %s", monitor.name)
+                    monitor.error(f"Error processing changes: {str(e)}")
+            if ready:
+                self.check_changes(entry, ready)
+            with self.lock:
+                if not entry.rerun:
+                    entry.running = False
+                    return
+                entry.rerun = False
+
+    def check_changes(self, entry: MonitoredFile, monitors: list):
+        """Check the targets of one file, scanning a workbook once for all of them"""
+        try:
+            if entry.workbook is not None and len(monitors) > 1:
+                job = WorkbookJob(monitors[0].file_path,
+                                  [monitor.sheet_target() for monitor in monitors], entry.workbook)
+                for monitor, result in zip(monitors, self.parse_backend.run(job)):
+                    monitor.check_excel_changes(result=result)
+            else:
+                for monitor in monitors:
+                    monitor.check_excel_changes()
+        except Exception as e:
+            log.exception("Error checking %s", entry.handler.watched_file)
+            for monitor in monitors:
+                monitor.error(f"Error processing changes: {str(e)}")
+
+    def run(self):
+        """Scheduler loop driving the poll and quiet-period timing of every file"""
+        while not self.stopped.is_set():
+            with self.lock:
+                handlers = [entry.handler for entry in self.files.values()]
+            next_deadline = time.monotonic() + 1.0
+            for handler in handlers:
+                next_deadline = min(next_deadline, handler.step())
+            timeout = next_deadline - time.monotonic()
+            if timeout > 0:
+                self.wakeup.wait(timeout)
+                self.wakeup.clear()
+
+    def get_file(self, file_path: str):
+        """Return the MonitoredFile entry of a registered file or target, or None"""
+        with self.lock:
+            return self.files.get(os.path.normcase(os.path.abspath(split_target(file_path)[0])))
+
+    def get_monitor(self, file_path: str):
+        """Return the FileMonitor of a registered file or target, or None"""
+        entry = self.get_file(file_path)
+        return None if entry is None else entry.monitors.get(target_key(file_path))
+
+    def monitors(self) -> list:
+        """Return the FileMonitor of every registered file and target"""
+        with self.lock:
+            return [monitor for entry in self.files.values() for monitor in entry.monitors.values()]
+
+    def file_status(self) -> list:
+        """Return a status dict for every registered file and target"""
+        return [{
+            'file_path': monitor.name,
+            'status': monitor.status,
+            'rows': monitor.last_row_count,
+            'parses': monitor.parse_count,
+            'skips': monitor.skip_count,
+            'pending': self.outbox.pending(monitor.file_key),
+            'last_error': monitor.last_error,
+        } for monitor in self.monitors()]
+
+    def sync_stats(self) -> dict:
+        """Return the latency and throughput counters of the row sync"""
+        return self.cloud_sync.stats()
+
+    def counters(self) -> dict:
+        """Return the rows detected and synced, failed sync requests and rows queued"""
+        with self.counter_lock:
+            return {
+                'rows_detected': self.rows_detected,
+                'rows_synced': self.rows_synced,
+                'sync_failures': self.sync_failures,
+                'queue_depth': self.queue_depth,
+            }
+
+    def on_rows_queued(self, count: int):
+        with self.counter_lock:
+            self.rows_detected += count
+            self.queue_depth += count
+
+    def monitor_for_file_id(self, file_id: str):
+        for monitor in self.monitors():
+            if monitor.file_id == file_id:
+                return monitor
+        return None
+
+    def on_rows_sent(self, file_id: str, count: int):
+        with self.counter_lock:
+            self.rows_synced += count
+            self.queue_depth = max(0, self.queue_depth - count)
+        monitor = self.monitor_for_file_id(file_id)
+        if monitor is None:
+            return
+        pending = self.outbox.pending(monitor.file_key)
+        log.debug("Synced %d rows of %s, %d pending", count, monitor.name, pending)
+        monitor.log(f"Synced {count} rows ({pending} pending)")
+        if not pending:
+            monitor.set_status("Monitoring")
+
+    def on_send_error(self, file_id: str, error: Exception, delay: float):
+        with self.counter_lock:
+            self.sync_failures += 1
+            if delay is None:
+                self.queue_depth = self.outbox.pending()
+        monitor = self.monitor_for_file_id(file_id)
+        if delay is None:
+            log.error("Sync of %s was refused: %s, batch parked", file_id, error)
+            if monitor is not None:
+                monitor.error(f"Sync refused: {str(error)}. The rows were set aside")
+            return
+        log.warning("Sync of %s failed: %s, retrying in %.1fs", file_id, error, delay)
+        if monitor is None:
+            return
+        monitor.error(f"Sync failed: {str(error)}. Retrying in {delay:.0f}s")
+        monitor.set_status("Sync pending")
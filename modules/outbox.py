@@ -0,0 +1,371 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+
+def default_data_dir() -> str:
+    """Return the directory for local state, next to the executable or package"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+
+    data_dir = os.path.join(base_dir, "data")
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+    return data_dir
+
+
+class Outbox:
+    """Durable append-only queue of encoded row changes waiting to be synced
+
+    Backed by SQLite in WAL mode with a full fsync on every commit. Each call
+    to append() is one transaction, so a detected batch is queued together
+    with the source checkpoint it was read up to, or not at all. Every row
+    carries an operation: 'insert', 'update' or 'delete', and the wall-clock
+    time its change was detected.
+
+    The row hashes of each file are kept next to its checkpoint as chunks
+    of packed uint64s, so appending rows only writes the hashes of the new
+    rows. Chunks are merged once a file has more than HASH_CHUNKS of them.
+    Rows are numbered into batches when a batch is first taken: every row
+    stores the sequence number of its batch, and the last number used for
+    each server file is kept, so a batch resent after a restart has the same
+    rows and number, and numbering continues where it stopped. Batches the
+    server rejected for good are moved to the parked table.
+    """
+
+    OPERATIONS = ('insert', 'update', 'delete')
+    HASH_CHUNKS = 256
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(default_data_dir(), "outbox.db")
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=FULL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS rows (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_key TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                row_index INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                op TEXT NOT NULL DEFAULT 'insert',
+                detected_at REAL,
+                batch_seq INTEGER
+            )
+        """)
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(rows)')]
+        if 'op' not in columns:
+            # Outboxes written before row operations existed only hold inserts
+            self.conn.execute("ALTER TABLE rows ADD COLUMN op TEXT NOT NULL DEFAULT 'insert'")
+        if 'detected_at' not in columns:
+            self.conn.execute('ALTER TABLE rows ADD COLUMN detected_at REAL')
+        if 'batch_seq' not in columns:
+            self.conn.execute('ALTER TABLE rows ADD COLUMN batch_seq INTEGER')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                file_key TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                acked_rows INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS row_hashes (
+                file_key TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                hashes BLOB NOT NULL,
+                PRIMARY KEY (file_key, start)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sequences (
+                file_id TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS parked (
+                id INTEGER PRIMARY KEY,
+                file_key TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                row_index INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                op TEXT NOT NULL,
+                detected_at REAL,
+                batch_seq INTEGER,
+                error TEXT,
+                parked_at REAL NOT NULL
+            )
+        """)
+
+    def append(self, file_key: str, file_id: str, payloads, first_row: int = 0,
+               checkpoint: dict = None, op: str = 'insert', row_indexes=None) -> int:
+        """Queue encoded rows and save the source checkpoint in one transaction
+
+        Rows are numbered from `first_row` unless `row_indexes` is given.
+        """
+        if row_indexes is None:
+            row_indexes = range(first_row, first_row + len(payloads))
+        return self.append_changes(file_key, file_id, [(op, row_indexes, payloads)], checkpoint)
+
+    def append_changes(self, file_key: str, file_id: str, changes,
+                       checkpoint: dict = None, detected_at: float = None,
+                       hashes: tuple = None) -> int:
+        """Queue several (op, row_indexes, payloads) groups and the checkpoint together
+
+        `detected_at` is the time.time() the changes were detected, now by
+        default. `hashes` is a (start, packed) pair as for save_checkpoint().
+        """
+        detected_at = time.time() if detected_at is None else detected_at
+        records = []
+        for op, row_indexes, payloads in changes:
+            if op not in self.OPERATIONS:
+                raise ValueError(f"Unknown row operation: {op}")
+            records.extend((file_key, file_id, int(row_index), payload, op, detected_at)
+                           for row_index, payload in zip(row_indexes, payloads))
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany(
+                    'INSERT INTO rows (file_key, file_id, row_index, payload, op, detected_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    records)
+                if checkpoint is not None:
+                    self._save_checkpoint(file_key, checkpoint)
+                if hashes is not None:
+                    self._save_hashes(file_key, *hashes)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return len(records)
+
+    def peek(self, max_rows: int = 500, max_bytes: int = 1024 * 1024, after: dict = None):
+        """Return (file_id, op, ids, payloads) for the oldest pending rows, or None
+
+        Rows in one batch always belong to the same server file and operation,
+        and are returned in the order they were queued. A batch stops at the
+        first row of that file with a different operation, so the changes of
+        one file reach the server in order. Rows already numbered by take()
+        are returned as the batch they were numbered in, whatever the limits.
+        `after` maps file ids to the last row id already taken (and still in
+        flight); earlier rows of those files are skipped.
+        """
+        with self.lock:
+            batch = self._select(max_rows, max_bytes, after)
+        return batch[:4] if batch else None
+
+    def take(self, max_rows: int = 500, max_bytes: int = 1024 * 1024, after: dict = None):
+        """Return (file_id, op, ids, payloads, seq) for the oldest pending rows, or None
+
+        Like peek(), but a batch taken for the first time gets the next
+        sequence number of its server file, saved with its rows in the same
+        transaction. Taking the batch again, after a failure or a restart,
+        returns the same rows and number.
+        """
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                batch = self._select(max_rows, max_bytes, after)
+                if batch is not None and batch[4] is None:
+                    file_id, op, ids, payloads, _ = batch
+                    row = self.conn.execute('SELECT seq FROM sequences WHERE file_id = ?',
+                                            (file_id,)).fetchone()
+                    seq = (row[0] if row else 0) + 1
+                    self.conn.execute(
+                        'INSERT INTO sequences (file_id, seq) VALUES (?, ?) '
+                        'ON CONFLICT(file_id) DO UPDATE SET seq = excluded.seq',
+                        (file_id, seq))
+                    self.conn.execute(
+                        'UPDATE rows SET batch_seq = ? WHERE file_id = ? AND id BETWEEN ? AND ?',
+                        (seq, file_id, ids[0], ids[-1]))
+                    batch = file_id, op, ids, payloads, seq
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return batch
+
+    def _select(self, max_rows, max_bytes, after):
+        skip, params = '', []
+        for file_id, last_id in (after or {}).items():
+            skip += ' AND NOT (file_id = ? AND id <= ?)'
+            params += [file_id, last_id]
+        first = self.conn.execute(
+            f'SELECT file_id, op, batch_seq FROM rows WHERE 1{skip} ORDER BY id LIMIT 1',
+            params).fetchone()
+        if first is None:
+            return None
+        file_id, op, seq = first
+        if seq is not None:
+            rows = self.conn.execute(
+                'SELECT id, payload FROM rows WHERE file_id = ? AND batch_seq = ? ORDER BY id',
+                (file_id, seq)).fetchall()
+            return file_id, op, [row[0] for row in rows], [bytes(row[1]) for row in rows], seq
+
+        cursor = self.conn.execute(
+            'SELECT id, payload, op, batch_seq FROM rows WHERE file_id = ? AND id > ? '
+            'ORDER BY id LIMIT ?',
+            (file_id, (after or {}).get(file_id, 0), max_rows))
+        ids, payloads, size = [], [], 0
+        for row_id, payload, row_op, row_seq in cursor:
+            if row_op != op or row_seq is not None:
+                break
+            if payloads and size + len(payload) + 1 > max_bytes:
+                break
+            ids.append(row_id)
+            payloads.append(bytes(payload))
+            size += len(payload) + 1
+        return file_id, op, ids, payloads, None
+
+    def detected_at(self, file_id: str, ids) -> list:
+        """Return (detected_at, rows) groups of queued rows of a file, oldest first
+
+        `ids` are ascending row ids as returned by peek(). Rows queued before
+        detection times were recorded are left out.
+        """
+        if not ids:
+            return []
+        with self.lock:
+            return self.conn.execute(
+                'SELECT detected_at, COUNT(*) FROM rows WHERE file_id = ? AND id BETWEEN ? AND ? '
+                'AND detected_at IS NOT NULL GROUP BY detected_at ORDER BY detected_at',
+                (file_id, ids[0], ids[-1])).fetchall()
+
+    def ack(self, ids):
+        """Remove sent rows and advance the acknowledged row count of their files"""
+        self._remove(ids)
+
+    def park(self, ids, error: str):
+        """Move rows the server rejected for good to the parked table
+
+        They no longer hold up the rows queued after them, and count as
+        acknowledged for the checkpoint.
+        """
+        self._remove(ids, error)
+
+    def parked(self, file_key: str = None) -> int:
+        """Return the number of parked rows, optionally for one file"""
+        with self.lock:
+            if file_key is None:
+                return self.conn.execute('SELECT COUNT(*) FROM parked').fetchone()[0]
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM parked WHERE file_key = ?', (file_key,)).fetchone()[0]
+
+    def _remove(self, ids, error: str = None):
+        if not ids:
+            return
+        placeholders = ','.join('?' * len(ids))
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                if error is not None:
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO parked (id, file_key, file_id, row_index, payload, '
+                        'op, detected_at, batch_seq, error, parked_at) '
+                        'SELECT id, file_key, file_id, row_index, payload, op, detected_at, '
+                        f'batch_seq, ?, ? FROM rows WHERE id IN ({placeholders})',
+                        [error, time.time(), *ids])
+                acked = self.conn.execute(
+                    f'SELECT file_key, MAX(row_index) FROM rows WHERE id IN ({placeholders}) '
+                    "AND op = 'insert' GROUP BY file_key", ids).fetchall()
+                self.conn.execute(f'DELETE FROM rows WHERE id IN ({placeholders})', ids)
+                for file_key, last_row in acked:
+                    self.conn.execute(
+                        'UPDATE checkpoints SET acked_rows = MAX(acked_rows, ?) WHERE file_key = ?',
+                        (last_row + 1, file_key))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def pending(self, file_key: str = None) -> int:
+        """Return the number of queued rows, optionally for one file"""
+        with self.lock:
+            if file_key is None:
+                return self.conn.execute('SELECT COUNT(*) FROM rows').fetchone()[0]
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM rows WHERE file_key = ?', (file_key,)).fetchone()[0]
+
+    def get_checkpoint(self, file_key: str):
+        """Return the saved source checkpoint of a file, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT state, acked_rows FROM checkpoints WHERE file_key = ?',
+                (file_key,)).fetchone()
+        if row is None:
+            return None
+        state = json.loads(row[0])
+        state['acked_rows'] = row[1]
+        return state
+
+    def save_checkpoint(self, file_key: str, checkpoint: dict, hashes: tuple = None):
+        """Save the source checkpoint of a file, and its row hashes if given
+
+        `hashes` is (start, packed): the packed uint64 hashes of the rows
+        from `start` on, replacing those saved for them.
+        """
+        with self.lock:
+            if hashes is None:
+                self._save_checkpoint(file_key, checkpoint)
+                return
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._save_checkpoint(file_key, checkpoint)
+                self._save_hashes(file_key, *hashes)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def get_row_hashes(self, file_key: str):
+        """Return the saved row hashes of a file packed as uint64s, or None"""
+        with self.lock:
+            chunks = self.conn.execute(
+                'SELECT start, hashes FROM row_hashes WHERE file_key = ? ORDER BY start',
+                (file_key,)).fetchall()
+        if not chunks:
+            return None
+        packed = bytearray()
+        for start, hashes in chunks:
+            if start * 8 != len(packed):
+                # A gap: the saved hashes cannot be trusted
+                return None
+            packed += hashes
+        return bytes(packed)
+
+    def sequences(self) -> dict:
+        """Return the last batch sequence number used for each server file"""
+        with self.lock:
+            return dict(self.conn.execute('SELECT file_id, seq FROM sequences'))
+
+    def _save_checkpoint(self, file_key, checkpoint):
+        self.conn.execute(
+            'INSERT INTO checkpoints (file_key, state) VALUES (?, ?) '
+            'ON CONFLICT(file_key) DO UPDATE SET state = excluded.state',
+            (file_key, json.dumps(checkpoint)))
+
+    def _save_hashes(self, file_key, start, packed):
+        self.conn.execute('DELETE FROM row_hashes WHERE file_key = ? AND start >= ?',
+                          (file_key, start))
+        if packed:
+            self.conn.execute('INSERT INTO row_hashes (file_key, start, hashes) VALUES (?, ?, ?)',
+                              (file_key, start, packed))
+        count = self.conn.execute('SELECT COUNT(*) FROM row_hashes WHERE file_key = ?',
+                                  (file_key,)).fetchone()[0]
+        if count > self.HASH_CHUNKS:
+            merged = b''.join(row[0] for row in self.conn.execute(
+                'SELECT hashes FROM row_hashes WHERE file_key = ? ORDER BY start', (file_key,)))
+            self.conn.execute('DELETE FROM row_hashes WHERE file_key = ?', (file_key,))
+            self.conn.execute('INSERT INTO row_hashes (file_key, start, hashes) VALUES (?, 0, ?)',
+                              (file_key, merged))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
@@ -0,0 +1,235 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.row_diff import RowDiff, diff_rows, hash_rows
+from modules.xlsx_reader import XlsxSheetReader, XlsxWorkbook
+
+# Workbook parts cached by each worker process, by file path
+_workbooks = {}
+
+
+def cached_workbook(file_path: str) -> XlsxWorkbook:
+    workbook = _workbooks.get(file_path)
+    if workbook is None:
+        workbook = _workbooks[file_path] = XlsxWorkbook(file_path)
+    return workbook
+
+
+def read_file(file_path: str, target=None) -> pd.DataFrame:
+    """Read a whole CSV file, or one sheet of a workbook (the first by default)"""
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext == '.csv':
+        return pd.read_csv(file_path)
+    elif file_ext in ('.xlsx', '.xls', '.xlsm', '.xlsb'):
+        return pd.read_excel(file_path, sheet_name=target or 0)
+    else:
+        raise ValueError(f"Unsupported file format: {file_ext}")
+
+
+class ParseResult:
+    """What a parse job ships back to the monitor
+
+    `frame` only holds the inserted and updated rows, indexed by file row
+    number. `hashes` are the row hashes of the whole file when `full` is
+    set, and of the appended rows otherwise. `reader` is the CSV tail reader
+    after the read, `error` the exception of a target that could not be read.
+    `timings` holds the seconds spent on the 'read' and the 'diff'.
+    """
+
+    __slots__ = ('frame', 'diff', 'hashes', 'row_count', 'full', 'skipped', 'fingerprint',
+                 'columns', 'reader', 'error', 'timings')
+
+    def __init__(self, frame=None, diff=None, hashes=None, row_count: int = 0, full: bool = True,
+                 skipped: bool = False, fingerprint=None, columns=None, reader=None, error=None):
+        self.frame = frame
+        self.diff = diff
+        self.hashes = hashes
+        self.row_count = row_count
+        self.full = full
+        self.skipped = skipped
+        self.fingerprint = fingerprint
+        self.columns = columns
+        self.reader = reader
+        self.error = error
+        self.timings = {}
+
+
+def diff_frame(frame: pd.DataFrame, full: bool, row_hashes, row_count: int,
+               keep_rows: bool = True) -> ParseResult:
+    """Diff a read against the previous row hashes, keeping only changed rows
+
+    Without row hashes (after resuming from a checkpoint) only rows past the
+    known row count can be told apart, so they are reported as inserted.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    hashes = hash_rows(frame)
+    if not full:
+        diff = RowDiff(row_count + np.arange(len(frame)), empty, empty)
+        return ParseResult(frame if keep_rows else frame.iloc[:0], diff, hashes,
+                           row_count + len(frame), full=False)
+
+    if row_hashes is None:
+        diff = RowDiff(np.arange(min(row_count, len(frame)), len(frame)), empty, empty)
+    else:
+        diff = diff_rows(row_hashes, hashes)
+    changed = np.sort(np.concatenate([diff.inserted, diff.updated])) if keep_rows else empty
+    frame_changed = frame if len(changed) == len(frame) else frame.loc[changed]
+    return ParseResult(frame_changed, diff, hashes, len(frame), columns=tuple(frame.columns))
+
+
+class CsvJob:
+    """Read the changes of a CSV file with its tail reader and diff them"""
+
+    __slots__ = ('reader', 'row_hashes', 'row_count', 'resync', 'keep_rows')
+
+    def __init__(self, reader, row_hashes=None, row_count: int = 0, resync: bool = False,
+                 keep_rows: bool = True):
+        self.reader = reader
+        self.row_hashes = row_hashes
+        self.row_count = row_count
+        self.resync = resync
+        self.keep_rows = keep_rows
+
+    def run(self) -> list:
+        start = time.perf_counter()
+        if self.resync:
+            frame, full = self.reader.resync(), True
+        else:
+            frame, full = self.reader.read_changes()
+        read = time.perf_counter()
+        result = diff_frame(frame, full, self.row_hashes, self.row_count, self.keep_rows)
+        result.reader = self.reader
+        result.timings = {'read': read - start, 'diff': time.perf_counter() - read}
+        return [result]
+
+
+class FileJob:
+    """Read a whole file (or a sheet of an .xls/.xlsb workbook) and diff it"""
+
+    __slots__ = ('file_path', 'target', 'row_hashes', 'row_count', 'keep_rows')
+
+    def __init__(self, file_path: str, target=None, row_hashes=None, row_count: int = 0,
+                 keep_rows: bool = True):
+        self.file_path = file_path
+        self.target = target
+        self.row_hashes = row_hashes
+        self.row_count = row_count
+        self.keep_rows = keep_rows
+
+    def run(self) -> list:
+        start = time.perf_counter()
+        frame = read_file(self.file_path, self.target)
+        read = time.perf_counter()
+        result = diff_frame(frame, True, self.row_hashes, self.row_count, self.keep_rows)
+        result.timings = {'read': read - start, 'diff': time.perf_counter() - read}
+        return [result]
+
+
+class SheetTarget:
+    """One target of a WorkbookJob and the change state it is scanned against"""
+
+    __slots__ = ('sheet', 'row_hashes', 'row_count', 'tail_only', 'keep_rows', 'fingerprint',
+                 'columns')
+
+    def __init__(self, sheet=None, row_hashes=None, row_count: int = 0, tail_only: bool = False,
+                 keep_rows: bool = True, fingerprint=None, columns=None):
+        self.sheet = sheet
+        self.row_hashes = row_hashes
+        self.row_count = row_count
+        self.tail_only = tail_only
+        self.keep_rows = keep_rows
+        self.fingerprint = fingerprint
+        self.columns = columns
+
+
+class WorkbookJob:
+    """Scan any number of targets of an .xlsx/.xlsm workbook with one read
+
+    `workbook` is the parent's XlsxWorkbook when the job runs in a thread;
+    it is not pickled, so a worker process uses its own cached copy.
+    """
+
+    __slots__ = ('file_path', 'targets', 'workbook')
+
+    def __init__(self, file_path: str, targets: list, workbook: XlsxWorkbook = None):
+        self.file_path = file_path
+        self.targets = targets
+        self.workbook = workbook
+
+    def __getstate__(self):
+        return self.file_path, self.targets
+
+    def __setstate__(self, state):
+        self.file_path, self.targets = state
+        self.workbook = None
+
+    def run(self) -> list:
+        start = time.perf_counter()
+        workbook = self.workbook or cached_workbook(self.file_path)
+        scans = []
+        for target in self.targets:
+            reader = XlsxSheetReader(self.file_path, target.sheet, workbook)
+            reader.columns = target.columns
+            scans.append(reader.begin_scan(target.row_hashes, target.row_count, target.tail_only,
+                                           target.keep_rows, target.fingerprint))
+        workbook.run(scans)
+        # Targets share the read of the workbook; each is diffed on its own
+        read = time.perf_counter() - start
+
+        results = []
+        for scan in scans:
+            start = time.perf_counter()
+            if scan.error is not None:
+                results.append(ParseResult(error=scan.error))
+            elif scan.skipped:
+                results.append(ParseResult(skipped=True, fingerprint=scan.fingerprint))
+            else:
+                frame, diff, hashes, row_count = scan.result()
+                results.append(ParseResult(frame, diff, hashes, row_count,
+                                           fingerprint=scan.fingerprint,
+                                           columns=tuple(scan.reader.columns)))
+            results[-1].timings = {'read': read, 'diff': time.perf_counter() - start}
+        return results
+
+
+def run_job(job) -> list:
+    return job.run()
+
+
+class ParseBackend:
+    """Run parse jobs in the calling thread or in a pool of worker processes
+
+    With `processes` set, each job is pickled to a ProcessPoolExecutor, so
+    parsing, hashing and diffing never hold the GIL of the process running
+    the GUI, and only the results (changed rows, diff, hashes and counts)
+    are sent back. Workers are spawned rather than forked, since the parent
+    runs Qt and watchdog threads.
+    """
+
+    def __init__(self, processes: int = 0):
+        self.processes = processes
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def run(self, job) -> list:
+        """Run a job and return its list of ParseResult, one per target"""
+        if not self.processes:
+            return run_job(job)
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'))
+            executor = self.executor
+        return executor.submit(run_job, job).result()
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
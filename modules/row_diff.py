@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from modules.schema import float32_to_float64
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """Return one uint64 content hash per row, vectorised over the frame
+
+    Numeric columns are hashed as float64 and everything else as text, so the
+    same row hashes the same whether it was parsed alone (tail read) or with
+    the whole file, where pandas may infer a different dtype. float32 columns
+    are hashed as the float64 values they were read from, rounded to the
+    decimals in `df.attrs` (see CsvSchema), so a column widened to float64
+    keeps its hashes.
+    """
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    decimals = df.attrs.get('decimals', {})
+    canonical = {}
+    for i, (name, column) in enumerate(df.items()):
+        if column.dtype == np.float32:
+            canonical[i] = float32_to_float64(column, decimals.get(name))
+        elif is_numeric_dtype(column) and not is_bool_dtype(column):
+            canonical[i] = column.astype('float64')
+        else:
+            canonical[i] = column.astype(str)
+    frame = pd.DataFrame(canonical, index=df.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+class RowDiff:
+    """Positions of inserted, updated and deleted rows between two versions"""
+
+    __slots__ = ('inserted', 'updated', 'deleted')
+
+    def __init__(self, inserted: np.ndarray, updated: np.ndarray, deleted: np.ndarray):
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+
+    def __bool__(self):
+        return bool(len(self.inserted) or len(self.updated) or len(self.deleted))
+
+    def __repr__(self):
+        return (f"RowDiff(inserted={len(self.inserted)}, updated={len(self.updated)}, "
+                f"deleted={len(self.deleted)})")
+
+
+def diff_rows(old_hashes: np.ndarray, new_hashes: np.ndarray) -> RowDiff:
+    """Compare two row hash vectors position by position
+
+    Rows past the end of the old version are inserted, rows past the end of
+    the new version are deleted, and rows in both whose hash differs are
+    updated. Only the hash vectors are needed, not the previous frame.
+    """
+    old_count, new_count = len(old_hashes), len(new_hashes)
+    common = min(old_count, new_count)
+    updated = np.flatnonzero(old_hashes[:common] != new_hashes[:common])
+    inserted = np.arange(common, new_count)
+    deleted = np.arange(common, old_count)
+    return RowDiff(inserted, updated, deleted)
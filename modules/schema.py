@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype
+
+TIMESTAMP_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+TIMESTAMP_COLUMN = 'TIMESTAMP'
+MAX_DECIMALS = 7
+
+
+def column_decimals(values: np.ndarray):
+    """Return the fewest decimals that represent every value exactly, or None"""
+    values = values[~np.isnan(values)]
+    for decimals in range(MAX_DECIMALS + 1):
+        if np.array_equal(np.round(values, decimals), values):
+            return decimals
+    return None
+
+
+def float32_decimals(values: np.ndarray):
+    """Return the decimals at which float32 keeps every value, or None if it does not"""
+    values = values[~np.isnan(values)]
+    decimals = column_decimals(values)
+    if decimals is None or not round_trips(values.astype(np.float32), values, decimals):
+        return None
+    return decimals
+
+
+def fits_float32(values: np.ndarray) -> bool:
+    """Check that float32 keeps every value at the column's decimal precision"""
+    return float32_decimals(values) is not None
+
+
+def round_trips(narrowed: np.ndarray, values: np.ndarray, decimals: int) -> bool:
+    """Check that float32 values rounded to `decimals` give back the float64 values"""
+    return bool(np.array_equal(np.round(narrowed.astype(np.float64), decimals), values,
+                               equal_nan=True))
+
+
+def float32_to_float64(column: pd.Series, decimals: int = None) -> pd.Series:
+    """Return a float32 column as the float64 values it was read from
+
+    A float32 0.500324 becomes 0.500324, not 0.500324010848999. With the
+    column's `decimals` this is one rounding; without, each value goes
+    through its shortest decimal text, which is far slower.
+    """
+    if decimals is None:
+        return column.astype(str).astype('float64')
+    return column.astype('float64').round(decimals)
+
+
+class CsvSchema:
+    """Column types of a CSV export, inferred once and reused for every read
+
+    Integer columns are read as int32 where their range allows. Other numeric
+    columns are float32 when that keeps every value of the first read at its
+    decimal precision, and float64 otherwise; the decimals of each float32
+    column are cached with its type. Later reads narrow a float32 column in
+    one rounding pass at those decimals, and a column with a value that no
+    longer round-trips is widened to float64 for good. Frames read with the
+    schema carry the decimals in `attrs['decimals']`, so hashing and
+    encoding can restore the exact values (see float32_to_float64). Empty
+    "Unnamed" columns (from a trailing comma) are not read at all, and DATE
+    and TIME columns are combined into one TIMESTAMP column.
+    """
+
+    __slots__ = ('dtypes', 'timestamp', 'decimals')
+
+    def __init__(self, dtypes: dict, timestamp: bool = False, decimals: dict = None):
+        self.dtypes = dtypes
+        self.timestamp = timestamp
+        self.decimals = decimals or {}
+
+    @classmethod
+    def infer(cls, df: pd.DataFrame) -> 'CsvSchema':
+        """Build the schema from a frame parsed with pandas' own type inference"""
+        dtypes, decimals = {}, {}
+        for name, column in df.items():
+            if str(name).startswith('Unnamed:') and column.isna().all():
+                continue
+            if is_integer_dtype(column):
+                info = np.iinfo(np.int32)
+                fits = column.empty or (info.min <= column.min() and column.max() <= info.max)
+                dtypes[name] = 'int32' if fits else 'int64'
+            elif is_numeric_dtype(column) and not is_bool_dtype(column):
+                values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+                places = float32_decimals(values)
+                dtypes[name] = 'float64' if places is None else 'float32'
+                if places is not None:
+                    decimals[name] = places
+            else:
+                dtypes[name] = 'str'
+
+        timestamp = False
+        if dtypes.get('DATE') == 'str' and dtypes.get('TIME') == 'str':
+            try:
+                pd.to_datetime(df['DATE'] + ' ' + df['TIME'], format=TIMESTAMP_FORMAT)
+                timestamp = True
+            except (TypeError, ValueError):
+                pass
+        return cls(dtypes, timestamp, decimals)
+
+    @property
+    def usecols(self) -> list:
+        return list(self.dtypes)
+
+    def read_csv(self, source, **kwargs) -> pd.DataFrame:
+        """Parse CSV data with the cached column types"""
+        dtypes = {name: 'float64' if dtype == 'float32' else dtype
+                  for name, dtype in self.dtypes.items()}
+        df = pd.read_csv(source, usecols=self.usecols, dtype=dtypes, **kwargs)
+        return self.finish(self.narrow(df))
+
+    def narrow(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert float32 columns read as float64, widening those that no longer fit"""
+        for name, decimals in list(self.decimals.items()):
+            values = df[name].to_numpy()
+            narrowed = values.astype(np.float32)
+            if round_trips(narrowed, values, decimals):
+                df[name] = narrowed
+            else:
+                self.dtypes[name] = 'float64'
+                del self.decimals[name]
+        return df
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert a frame parsed without the schema to the schema's types"""
+        return self.finish(df[self.usecols].astype(self.dtypes))
+
+    def finish(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Combine DATE and TIME into the leading TIMESTAMP column"""
+        if self.timestamp:
+            timestamp = pd.to_datetime(df['DATE'] + ' ' + df['TIME'], format=TIMESTAMP_FORMAT)
+            df = pd.concat([timestamp.rename(TIMESTAMP_COLUMN),
+                            df.drop(columns=['DATE', 'TIME'])], axis=1)
+        df.attrs['decimals'] = dict(self.decimals)
+        return df
+
+    def to_dict(self) -> dict:
+        return {'dtypes': self.dtypes, 'timestamp': self.timestamp, 'decimals': self.decimals}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'CsvSchema':
+        dtypes, decimals = dict(state['dtypes']), dict(state.get('decimals') or {})
+        for name, dtype in dtypes.items():
+            if dtype == 'float32' and name not in decimals:
+                # Saved before the decimals were kept
+                dtypes[name] = 'float64'
+        return cls(dtypes, state.get('timestamp', False), decimals)
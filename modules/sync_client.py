@@ -0,0 +1,341 @@
+import gzip
+import json
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.flow_control import FlowControl
+from modules.schema import float32_to_float64
+from modules.sync_engine import AsyncOutboxSender
+from modules.wire_format import COLUMNAR_CONTENT_TYPE, JSON_CONTENT_TYPE, encode_columnar
+
+BULK_UPDATE_PATH = '/api/file-management/files/update_rows/bulk/'
+ROW_UPDATE_PATH = '/api/file-management/files/update_rows/'
+
+
+def widen_float32(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert float32 columns to the float64 values they were read from
+
+    Without this a float32 0.500324 would be sent as 0.500324010848999.
+    """
+    narrow = [name for name, dtype in df.dtypes.items() if dtype == 'float32']
+    if not narrow:
+        return df
+    decimals = df.attrs.get('decimals', {})
+    df = df.copy()
+    for name in narrow:
+        df[name] = float32_to_float64(df[name], decimals.get(name))
+    return df
+
+
+def json_value(value):
+    """Return a value JSON can encode: None for missing ones, numpy scalars unboxed
+
+    Used for single values and as the encoder's fallback; NaN, infinities,
+    NaT and pd.NA become null, as bare NaN is not valid JSON.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (str, int, bool, list, dict)):
+        return value
+    return str(value)
+
+
+ENCODER = json.JSONEncoder(default=json_value)
+quote = json.encoder.encode_basestring_ascii
+
+
+def column_json(column: pd.Series) -> list:
+    """Encode every value of a column as JSON text, column-wise
+
+    Floats and integers are unboxed with one tolist() and formatted with
+    their repr, as json.dumps would; missing and non-finite values become
+    null and datetimes the quoted str(Timestamp).
+    """
+    dtype = column.dtype
+    kind = dtype.kind if isinstance(dtype, np.dtype) else 'O'
+    if kind == 'f':
+        values = column.to_numpy()
+        texts = list(map(float.__repr__, values.tolist()))
+        for position in np.flatnonzero(~np.isfinite(values)):
+            texts[position] = 'null'
+        return texts
+    if kind in 'iu':
+        return list(map(int.__repr__, column.to_numpy().tolist()))
+    if kind == 'b':
+        return ['true' if value else 'false' for value in column.to_numpy().tolist()]
+    if kind in 'mM':
+        # astype(str) leaves NaT missing on pandas 3 and 'NaT' before; both end up null
+        texts = [quote(value) if type(value) is str else 'null'
+                 for value in column.astype(str).tolist()]
+    else:
+        texts = [quote(value) if type(value) is str else ENCODER.encode(json_value(value))
+                 for value in column.astype(object).tolist()]
+    for position in np.flatnonzero(column.isna().to_numpy()):
+        texts[position] = 'null'
+    return texts
+
+
+def encode_frame(df: pd.DataFrame) -> list:
+    """Return each row of a DataFrame as the text of a JSON object
+
+    Works column by column and joins the encoded columns into rows, instead
+    of building a Series per row (iterrows) or a dict per row (to_dict).
+    The text matches json.dumps of the row dict, with null for NaN, NaT, pd.NA
+    and infinities, which JSON cannot represent.
+    """
+    df = widen_float32(df)
+    if not df.shape[1]:
+        return ['{}'] * len(df)
+    columns = []
+    for position, name in enumerate(df.columns):
+        prefix = quote(str(name)) + ': '
+        columns.append([prefix + text for text in column_json(df.iloc[:, position])])
+    return ['{' + ', '.join(row) + '}' for row in zip(*columns)]
+
+
+def encode_rows(rows) -> list:
+    """Encode a DataFrame or list of row dicts as one JSON document per row"""
+    if isinstance(rows, pd.DataFrame):
+        return [text.encode('utf-8') for text in encode_frame(rows)]
+    encode = ENCODER.encode
+    return [encode({name: json_value(value) for name, value in row.items()}).encode('utf-8')
+            for row in rows]
+
+
+def encode_updates(rows: pd.DataFrame, row_indexes) -> list:
+    """Encode changed rows as {"row_index": i, "data": {...}} documents"""
+    return [f'{{"row_index": {int(index)}, "data": {text}}}'.encode('utf-8')
+            for index, text in zip(row_indexes, encode_frame(rows))]
+
+
+def encode_deletes(row_indexes) -> list:
+    """Encode removed row positions as {"row_index": i} documents"""
+    return [json.dumps({'row_index': int(index)}).encode('utf-8') for index in row_indexes]
+
+
+class BatchSyncClient:
+    """Send new rows to the cloud API in batches over a pooled keep-alive session
+
+    Rows are packed into chunks limited both by row count and by the size of
+    the (uncompressed) JSON payload, and each chunk is sent gzip-compressed in
+    a single request. Batches of updated or deleted rows carry an "op" field
+    so the server applies them to existing rows instead of appending, and
+    batches sent by the outbox carry their per-file sequence number "seq".
+    The connection pool holds `max_connections` keep-alive connections, one
+    per request in flight.
+
+    With `wire_format='columnar'`, inserted rows are sent in the columnar
+    encoding of modules.wire_format instead. A server that does not accept
+    it answers 415, after which the client resends the batch as JSON and
+    keeps using JSON.
+
+    With `endpoint='per_row'`, or once the bulk endpoint answers 404 or 405,
+    inserted rows are posted one request each to the older per-row endpoint
+    as {"file_id", "update_data"}, uncompressed and without a sequence
+    number. That endpoint only appends rows, so updates and deletes still
+    fail there.
+    """
+
+    def __init__(self, api_url: str, api_key: str, max_rows: int = 500,
+                 max_bytes: int = 1024 * 1024, compress: bool = True,
+                 compress_level: int = 6, timeout: float = 30, max_connections: int = 4,
+                 wire_format: str = 'json', endpoint: str = 'bulk'):
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.max_rows = max(1, max_rows)
+        self.max_bytes = max(1, max_bytes)
+        self.compress = compress
+        self.compress_level = compress_level
+        self.timeout = timeout
+        self.columnar = wire_format == 'columnar'
+        self.bulk = endpoint != 'per_row'
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1,
+                                                  pool_maxsize=max_connections))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1,
+                                                   pool_maxsize=max_connections))
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': JSON_CONTENT_TYPE,
+            'Connection': 'keep-alive',
+        })
+
+    def iter_batches(self, rows):
+        """Yield lists of JSON-encoded rows that fit the row and byte limits"""
+        batch = []
+        batch_bytes = 0
+        for encoded in encode_rows(rows):
+            if batch and (len(batch) >= self.max_rows or
+                          batch_bytes + len(encoded) + 1 > self.max_bytes):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append(encoded)
+            batch_bytes += len(encoded) + 1
+        if batch:
+            yield batch
+
+    def build_payload(self, file_id: str, batch, op: str = 'insert', seq: int = None) -> bytes:
+        """Build the request body for one batch of encoded rows"""
+        head = b'{"file_id":' + json.dumps(file_id).encode('utf-8')
+        if op != 'insert':
+            head += b',"op":' + json.dumps(op).encode('utf-8')
+        if seq is not None:
+            head += b',"seq":' + str(int(seq)).encode('ascii')
+        return head + b',"rows":[' + b','.join(batch) + b']}'
+
+    def send_batch(self, file_id: str, batch, op: str = 'insert',
+                   seq: int = None) -> requests.Response:
+        """Send one batch of encoded rows in a single request"""
+        if not self.bulk and op == 'insert':
+            return self.send_per_row(file_id, batch)
+
+        if self.columnar and op == 'insert':
+            response = self.post(encode_columnar(file_id, batch, op, seq), COLUMNAR_CONTENT_TYPE)
+            if response.status_code != 415:
+                return self.checked(response, file_id, batch, op)
+            self.columnar = False
+
+        response = self.post(self.build_payload(file_id, batch, op, seq), JSON_CONTENT_TYPE)
+        return self.checked(response, file_id, batch, op)
+
+    def checked(self, response: requests.Response, file_id: str, batch,
+                op: str) -> requests.Response:
+        """Raise for a failed bulk request, or resend inserts per row without a bulk endpoint"""
+        if response.status_code in (404, 405) and op == 'insert':
+            self.bulk = False
+            return self.send_per_row(file_id, batch)
+        response.raise_for_status()
+        return response
+
+    def send_per_row(self, file_id: str, batch) -> requests.Response:
+        """Post each encoded row on its own to the per-row endpoint"""
+        head = b'{"file_id":' + json.dumps(file_id).encode('utf-8') + b',"update_data":'
+        response = None
+        for encoded in batch:
+            response = self.session.post(f"{self.api_url}{ROW_UPDATE_PATH}",
+                                         data=head + encoded + b'}', timeout=self.timeout)
+            response.raise_for_status()
+        return response
+
+    def post(self, body: bytes, content_type: str) -> requests.Response:
+        headers = {'Content-Type': content_type}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=self.compress_level)
+            headers['Content-Encoding'] = 'gzip'
+        return self.session.post(f"{self.api_url}{BULK_UPDATE_PATH}",
+                                 data=body, headers=headers, timeout=self.timeout)
+
+    def send_rows(self, file_id: str, rows, on_batch=None) -> int:
+        """Send all rows in batches and return the number of rows sent"""
+        sent = 0
+        for batch in self.iter_batches(rows):
+            self.send_batch(file_id, batch)
+            sent += len(batch)
+            if on_batch:
+                on_batch(sent)
+        return sent
+
+    def close(self):
+        self.session.close()
+
+
+class CloudSync:
+    """Drain an outbox to the cloud API using the credentials in `settings`
+
+    Owns the pooled BatchSyncClient and the AsyncOutboxSender thread, and is
+    shared by all monitored files. Up to `sync_in_flight` batches are sent
+    at once, each given up after `sync_timeout_s` seconds. Requests are
+    capped at `sync_rate_limit` per second (0 for no cap), and batches shrink
+    while responses take longer than `sync_target_latency_ms`. Setting
+    `sync_wire_format` to 'columnar' sends inserted rows in the columnar
+    encoding, where the server accepts it, and setting `sync_endpoint` to
+    'per_row' posts inserted rows one by one to the older per-row endpoint.
+    `metrics` is passed on to the sender.
+    """
+
+    def __init__(self, settings, outbox, on_sent=None, on_error=None, metrics=None):
+        self.settings = settings
+        self.outbox = outbox
+        self.client = None
+        self.lock = threading.Lock()
+        self.max_in_flight = max(1, int(settings.value('sync_in_flight', 4)))
+        self.timeout = float(settings.value('sync_timeout_s', 30))
+        max_rows = int(settings.value('sync_batch_rows', 500))
+        self.flow = FlowControl(
+            max_rows,
+            rate=float(settings.value('sync_rate_limit', 0)),
+            target_latency=int(settings.value('sync_target_latency_ms', 2000)) / 1000,
+        )
+        self.sender = AsyncOutboxSender(
+            outbox,
+            self.send_batch,
+            max_in_flight=self.max_in_flight,
+            max_rows=max_rows,
+            max_bytes=int(settings.value('sync_batch_bytes', 1024 * 1024)),
+            timeout=self.timeout,
+            flow=self.flow,
+            on_sent=on_sent,
+            on_error=on_error,
+            metrics=metrics,
+        )
+
+    def start(self):
+        if not self.sender.is_alive():
+            self.sender.start()
+
+    def notify(self):
+        self.sender.notify()
+
+    def stop(self):
+        self.sender.stop()
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def get_client(self, api_url: str, api_key: str) -> BatchSyncClient:
+        """Return the pooled sync client, recreating it if the credentials changed"""
+        with self.lock:
+            client = self.client
+            if (client is None or client.api_url != api_url.rstrip('/')
+                    or client.api_key != api_key):
+                if client is not None:
+                    client.close()
+                client = BatchSyncClient(
+                    api_url,
+                    api_key,
+                    max_rows=int(self.settings.value('sync_batch_rows', 500)),
+                    max_bytes=int(self.settings.value('sync_batch_bytes', 1024 * 1024)),
+                    timeout=self.timeout,
+                    max_connections=self.max_in_flight,
+                    wire_format=self.settings.value('sync_wire_format', 'json'),
+                    endpoint=self.settings.value('sync_endpoint', 'bulk'),
+                )
+                self.client = client
+            return client
+
+    def send_batch(self, file_id: str, payloads, op: str = 'insert', seq: int = None):
+        """Send one batch of queued rows, raising on failure so it is retried"""
+        api_url = self.settings.value('api_url')
+        api_key = self.settings.value('api_key')
+        if not api_url or not api_key:
+            raise RuntimeError("API credentials not set")
+
+        self.get_client(api_url, api_key).send_batch(file_id, payloads, op, seq)
+
+    def stats(self) -> dict:
+        """Return the sender's latency and throughput counters and current batch size"""
+        stats = self.sender.stats.snapshot()
+        stats['batch_rows'] = self.flow.batch_rows
+        stats['throttled'] = self.flow.throttled
+        return stats
@@ -0,0 +1,285 @@
+import asyncio
+import collections
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.flow_control import FlowControl, is_permanent
+
+
+class SyncStats:
+    """Latency and throughput counters of a sender
+
+    Updated on the sender's event loop and read from any thread. Latencies
+    are kept for the most recent `window` requests.
+    """
+
+    def __init__(self, window: int = 256):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+        self.bytes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.started = None
+        self.latencies = collections.deque(maxlen=window)
+
+    def record(self, latency: float, rows: int, size: int):
+        with self.lock:
+            self.requests += 1
+            self.rows += rows
+            self.bytes += size
+            self.latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        """Return the counters, latency percentiles (ms) and rows per second"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            elapsed = time.monotonic() - self.started if self.started else 0.0
+            percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+            return {
+                'requests': self.requests,
+                'rows': self.rows,
+                'bytes': self.bytes,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'in_flight': self.in_flight,
+                'latency_p50_ms': percentile(0.5) if latencies else 0.0,
+                'latency_p95_ms': percentile(0.95) if latencies else 0.0,
+                'latency_max_ms': latencies[-1] * 1000 if latencies else 0.0,
+                'rows_per_s': self.rows / elapsed if elapsed > 0 else 0.0,
+            }
+
+
+class Batch:
+    """One outbox batch on its way to the server"""
+
+    __slots__ = ('file_id', 'op', 'ids', 'payloads', 'seq', 'failures', 'done', 'parked',
+                 'detected', 'answered')
+
+    def __init__(self, file_id: str, op: str, ids: list, payloads: list, seq: int):
+        self.file_id = file_id
+        self.op = op
+        self.ids = ids
+        self.payloads = payloads
+        self.seq = seq
+        self.failures = 0
+        self.done = False
+        self.parked = False
+        self.detected = ()
+        self.answered = None
+
+
+class AsyncOutboxSender(threading.Thread):
+    """Drain an Outbox from an asyncio loop with several requests in flight
+
+    Up to `max_in_flight` batches are sent at once, across files and within
+    one file, each through the blocking `send(file_id, payloads, op, seq)` on
+    a thread pool of the same size (so a pooled requests.Session keeps one
+    connection per slot) and abandoned after `timeout` seconds. A slow
+    response therefore no longer holds up the batches behind it.
+
+    Every batch of a file gets the next sequence number of that file, which
+    the outbox saves with its rows before it is sent (see Outbox.take), so
+    the server can apply batches in order and drop a resent one, even when
+    it is resent after a restart. Rows are acknowledged in the outbox in
+    queue order per file: a batch that completes early waits for the ones
+    before it. A failed batch is retried with exponential backoff while the
+    others carry on, unless the server refused it with a 4xx other than
+    408, 425 or 429: such a batch is parked in the outbox instead, so it
+    does not hold up the rest of its file.
+
+    `flow` (a FlowControl) paces every request and sets the size of each new
+    batch, shrinking batches when the API slows down or throttles and
+    waiting out Retry-After. Only the batches in flight are held in memory;
+    everything else stays in the outbox on disk.
+    `on_sent(file_id, count)` and `on_error(file_id, error, delay)` report
+    progress, with a delay of None for a parked batch, and `stats` holds the latency and throughput counters. With
+    `metrics` (a Metrics registry) the 'send' and 'ack' stages, the lag of
+    every row from detection to acknowledgement and the synced rows and
+    failures are recorded per file.
+    """
+
+    def __init__(self, outbox, send, max_in_flight: int = 4, max_rows: int = 500,
+                 max_bytes: int = 1024 * 1024, timeout: float = 30.0, base_delay: float = 1.0,
+                 max_delay: float = 60.0, idle_interval: float = 1.0,
+                 flow: FlowControl = None, on_sent=None, on_error=None, metrics=None):
+        super().__init__(daemon=True, name='sync-sender')
+        self.outbox = outbox
+        self.send = send
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_interval = idle_interval
+        self.flow = flow or FlowControl(max_rows)
+        self.on_sent = on_sent
+        self.on_error = on_error
+        self.metrics = metrics
+        self.stats = SyncStats()
+        self.stopped = threading.Event()
+        self.pending = {}
+        self.loop = None
+        self.wakeup = None
+
+    def notify(self):
+        """Wake the sender after new rows were queued"""
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self.wakeup.set)
+            except RuntimeError:
+                pass
+
+    def stop(self):
+        self.stopped.set()
+        self.notify()
+        if self.is_alive():
+            self.join()
+
+    def backoff_delay(self, failures: int) -> float:
+        """Exponential delay with jitter for a batch that failed `failures` times"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (failures - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def run(self):
+        asyncio.run(self.main())
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.slots = asyncio.Semaphore(self.max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                           thread_name_prefix='sync')
+        self.stats.started = time.monotonic()
+        tasks = set()
+        try:
+            while not self.stopped.is_set():
+                await self.slots.acquire()
+                batch = self.next_batch()
+                if batch is None:
+                    self.slots.release()
+                    await self.idle()
+                    continue
+                task = asyncio.create_task(self.deliver(batch))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.executor.shutdown(wait=False)
+            self.loop = None
+
+    async def idle(self):
+        self.wakeup.clear()
+        if self.stopped.is_set():
+            return
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), self.idle_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    def next_batch(self):
+        """Take the oldest rows not already in flight as a new batch"""
+        after = {file_id: batches[-1].ids[-1] for file_id, batches in self.pending.items()}
+        taken = self.outbox.take(self.flow.batch_rows, self.max_bytes, after=after)
+        if taken is None:
+            return None
+        batch = Batch(*taken)
+        if self.metrics is not None:
+            batch.detected = self.outbox.detected_at(batch.file_id, batch.ids)
+        self.pending.setdefault(batch.file_id, collections.deque()).append(batch)
+        return batch
+
+    async def deliver(self, batch: Batch):
+        size = sum(len(payload) + 1 for payload in batch.payloads)
+        try:
+            while not self.stopped.is_set():
+                wait = self.flow.acquire()
+                if wait > 0:
+                    await self.sleep(wait)
+                    continue
+                start = time.monotonic()
+                self.stats.in_flight += 1
+                try:
+                    await asyncio.wait_for(
+                        self.loop.run_in_executor(self.executor, self.send, batch.file_id,
+                                                  batch.payloads, batch.op, batch.seq),
+                        self.timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        e = TimeoutError(f"No response within {self.timeout:.0f}s")
+                        self.stats.timeouts += 1
+                    self.stats.failures += 1
+                    batch.failures += 1
+                    if self.metrics is not None:
+                        self.metrics.inc('sync_failures',
+                                         file=self.metrics.file_name(batch.file_id))
+                    if is_permanent(e):
+                        self.park(batch, e)
+                        return
+                    delay = self.flow.on_failure(e, self.backoff_delay(batch.failures))
+                    if self.on_error:
+                        self.on_error(batch.file_id, e, delay)
+                    await self.sleep(delay)
+                    continue
+                finally:
+                    self.stats.in_flight -= 1
+
+                batch.answered = time.monotonic()
+                latency = batch.answered - start
+                self.flow.on_success(latency)
+                self.stats.record(latency, len(batch.ids), size)
+                if self.metrics is not None:
+                    self.metrics.stage('send', latency, self.metrics.file_name(batch.file_id))
+                batch.done = True
+                self.acknowledge(batch.file_id)
+                return
+        finally:
+            self.slots.release()
+
+    def park(self, batch: Batch, error: Exception):
+        """Set aside a batch the server refused, so the file's queue moves on"""
+        self.outbox.park(batch.ids, str(error))
+        batch.parked = batch.done = True
+        if self.on_error:
+            self.on_error(batch.file_id, error, None)
+        self.acknowledge(batch.file_id)
+
+    async def sleep(self, delay: float):
+        """Sleep, waking early when the sender is stopped"""
+        deadline = time.monotonic() + delay
+        while not self.stopped.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.1, deadline - time.monotonic()))
+
+    def acknowledge(self, file_id: str):
+        """Ack the completed batches at the front of a file's queue"""
+        batches = self.pending[file_id]
+        while batches and batches[0].done:
+            batch = batches.popleft()
+            if batch.parked:
+                continue
+            self.outbox.ack(batch.ids)
+            if self.metrics is not None:
+                self.record_ack(batch)
+            if self.on_sent:
+                self.on_sent(file_id, len(batch.ids))
+        if not batches:
+            del self.pending[file_id]
+
+    def record_ack(self, batch: Batch):
+        """Record the ack stage and the detection-to-ack lag of a batch's rows"""
+        file = self.metrics.file_name(batch.file_id)
+        # The wait for earlier batches of the file counts towards the ack
+        self.metrics.stage('ack', time.monotonic() - batch.answered, file)
+        now = time.time()
+        for detected_at, count in batch.detected:
+            self.metrics.observe('lag_seconds', max(0.0, now - detected_at), count, file=file)
+        self.metrics.inc('rows_synced', len(batch.ids), file=file, op=batch.op)
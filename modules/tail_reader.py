@@ -0,0 +1,206 @@
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+from modules.schema import CsvSchema
+
+
+class CsvTailReader:
+    """Incrementally read rows appended to a growing CSV file
+
+    The reader remembers the byte offset just past the last complete line it
+    has parsed, so each update only parses the newly appended bytes using the
+    column names from the header it already knows. If the file shrinks, or the
+    header/prefix of the file or the bytes just before the offset change, the
+    whole file is re-read (resync).
+
+    With `typed` set, the column types are inferred on the first read and
+    cached as a CsvSchema, and every later read parses with explicit dtypes
+    and only the columns the schema uses. The schema is inferred again when
+    the header changes or a value no longer fits it.
+
+    Records must not contain quoted embedded newlines, which holds for the
+    historian exports this is used with.
+    """
+
+    __slots__ = ('file_path', 'prefix_size', 'typed', 'schema', 'offset', 'row_count',
+                 'columns', 'prefix_len', 'prefix_hash', 'anchor_hash')
+
+    def __init__(self, file_path: str, prefix_size: int = 4096, typed: bool = True):
+        self.file_path = file_path
+        self.prefix_size = prefix_size
+        self.typed = typed
+        self.schema = None
+        self.offset = 0
+        self.row_count = 0
+        self.columns = None
+        self.prefix_len = 0
+        self.prefix_hash = None
+        self.anchor_hash = None
+
+    def resync(self) -> pd.DataFrame:
+        """Re-read the whole file and reset the tail position"""
+        with open(self.file_path, 'rb') as f:
+            data = f.read()
+
+        # Only parse up to the last complete line, the rest may still be written
+        end = data.rfind(b'\n') + 1
+        header_end = data.find(b'\n') + 1
+        if not header_end:
+            self._reset()
+            return pd.DataFrame()
+
+        header = list(pd.read_csv(io.BytesIO(data[:header_end]), nrows=0).columns)
+        if header != self.columns:
+            self.schema = None
+        df = self.parse_all(data[:end])
+        self.offset = end
+        self.row_count = len(df)
+        self.columns = header
+        self.prefix_len = min(end, max(header_end, self.prefix_size))
+        self.prefix_hash = hashlib.sha1(data[:self.prefix_len]).digest()
+        self.anchor_hash = self._anchor(data[:end])
+        return df
+
+    def parse_all(self, data: bytes) -> pd.DataFrame:
+        """Parse a whole file, inferring the schema if there is none yet"""
+        if self.schema is not None:
+            try:
+                return self.schema.read_csv(io.BytesIO(data))
+            except (ValueError, OverflowError):
+                self.schema = None
+        return self.infer_schema(pd.read_csv(io.BytesIO(data)))
+
+    def infer_schema(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Cache the schema of the first rows read and convert them to it"""
+        if not self.typed or df.empty:
+            return df
+        self.schema = CsvSchema.infer(df)
+        return self.schema.apply(df)
+
+    def read_changes(self):
+        """Return (rows, resynced) for the changes since the previous call
+
+        Normally only the appended rows are returned. When the file was
+        truncated or rewritten it is re-read, and the whole frame is returned
+        with `resynced` set so the caller can diff it against what it had.
+        """
+        if self._needs_resync():
+            return self.resync(), True
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return pd.DataFrame(columns=self.columns), False
+
+        chunk = data[:end]
+        if not chunk.strip():
+            self._advance(end, chunk)
+            return pd.DataFrame(columns=self.columns), False
+
+        if self.schema is not None:
+            try:
+                df = self.schema.read_csv(io.BytesIO(chunk), header=None, names=self.columns)
+            except (ValueError, OverflowError):
+                # A value that no longer fits the cached types
+                self.schema = None
+                return self.resync(), True
+        else:
+            df = self.infer_schema(pd.read_csv(io.BytesIO(chunk), header=None, names=self.columns))
+        df.index = pd.RangeIndex(self.row_count, self.row_count + len(df))
+        self._advance(end, chunk)
+        self.row_count += len(df)
+        return df, False
+
+    def read_new_rows(self) -> pd.DataFrame:
+        """Return the rows appended since the previous call
+
+        Falls back to a full resync when the file was truncated or rewritten,
+        in which case only rows past the previously known row count are
+        returned.
+        """
+        previous_count = self.row_count
+        df, resynced = self.read_changes()
+        if resynced:
+            return df.iloc[previous_count:]
+        return df
+
+    def state(self) -> dict:
+        """Return the tail position as a JSON-serialisable checkpoint"""
+        return {
+            'offset': self.offset,
+            'row_count': self.row_count,
+            'columns': self.columns,
+            'prefix_len': self.prefix_len,
+            'prefix_hash': self.prefix_hash.hex() if self.prefix_hash else None,
+            'anchor_hash': self.anchor_hash.hex() if self.anchor_hash else None,
+            'schema': self.schema.to_dict() if self.schema else None,
+        }
+
+    def restore(self, state: dict) -> bool:
+        """Resume from a checkpoint, returning False if the file no longer matches it"""
+        if not state.get('prefix_hash') or not os.path.exists(self.file_path):
+            return False
+        self.offset = state['offset']
+        self.row_count = state['row_count']
+        self.columns = state['columns']
+        self.prefix_len = state['prefix_len']
+        self.prefix_hash = bytes.fromhex(state['prefix_hash'])
+        anchor = state.get('anchor_hash')
+        self.anchor_hash = bytes.fromhex(anchor) if anchor else None
+        schema = state.get('schema')
+        self.schema = CsvSchema.from_dict(schema) if schema and self.typed else None
+        if self._needs_resync():
+            self._reset()
+            return False
+        return True
+
+    def _anchor(self, parsed: bytes) -> bytes:
+        """Hash the last `prefix_size` bytes before the offset"""
+        return hashlib.sha1(parsed[-self.prefix_size:]).digest()
+
+    def _advance(self, end: int, chunk: bytes):
+        """Move the offset past `chunk` and update the anchor hash"""
+        if len(chunk) >= self.prefix_size:
+            self.anchor_hash = self._anchor(chunk)
+        else:
+            with open(self.file_path, 'rb') as f:
+                start = max(0, self.offset + end - self.prefix_size)
+                f.seek(start)
+                self.anchor_hash = self._anchor(f.read(self.offset + end - start))
+        self.offset += end
+
+    def _needs_resync(self) -> bool:
+        """Check whether the file was truncated or rewritten since the last read
+
+        Compares the prefix and the bytes just before the offset, so edits
+        that change the length of earlier rows are noticed too. An edit that
+        keeps every byte offset the same between the two is not.
+        """
+        if self.prefix_hash is None:
+            return True
+        if os.path.getsize(self.file_path) < self.offset:
+            return True
+        with open(self.file_path, 'rb') as f:
+            prefix = f.read(self.prefix_len)
+            if hashlib.sha1(prefix).digest() != self.prefix_hash:
+                return True
+            if self.anchor_hash is None:
+                return False
+            start = max(0, self.offset - self.prefix_size)
+            f.seek(start)
+            return self._anchor(f.read(self.offset - start)) != self.anchor_hash
+
+    def _reset(self):
+        self.offset = 0
+        self.row_count = 0
+        self.columns = None
+        self.prefix_len = 0
+        self.prefix_hash = None
+        self.anchor_hash = None
+        self.schema = None
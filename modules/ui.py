@@ -1,16 +1,20 @@
+import logging
 import os
-from datetime import datetime
-from typing import Optional
 
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QPushButton, 
-                            QTextEdit, QFileDialog, QLabel, QHBoxLayout, QFrame, 
+                            QFileDialog, QLabel, QHBoxLayout, QFrame, 
                             QStyle, QStyleFactory, QDialog)
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont, QPalette, QColor
 
-from modules.monitor import ExcelMonitor
+from modules.event_bridge import format_counters
+from modules.log_view import LogView
+from modules.metrics_panel import MetricsPanel
 from modules.settings import SettingsDialog
 
+log = logging.getLogger(__name__)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -18,9 +22,10 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 1000, 700)
         self.setStyle(QStyleFactory.create('Fusion'))
         self.set_dark_theme()
-        self.monitor: Optional[ExcelMonitor] = None
+        # An ExcelMonitor, imported with pandas and requests once a file is selected
+        self.monitor = None
         self.setup_ui()
-        print("[UI] Application started")
+        log.info("Application started")
         self.log_message("Application started")
 
     def set_dark_theme(self):
@@ -59,9 +64,18 @@ class MainWindow(QMainWindow):
         self.status_label = QLabel("Status: Not Monitoring")
         self.status_label.setFont(QFont('Arial', 10))
         header_layout.addWidget(self.status_label)
+
+        self.counters_label = QLabel("")
+        self.counters_label.setFont(QFont('Arial', 10))
+        header_layout.addWidget(self.counters_label)
         
         main_layout.addWidget(header_frame)
 
+        # Rows/s, end-to-end lag and stage latencies
+        self.metrics_panel = MetricsPanel()
+        self.metrics_panel.setFont(QFont('Arial', 9))
+        main_layout.addWidget(self.metrics_panel)
+
         # Buttons
         button_frame = QFrame()
         button_layout = QHBoxLayout(button_frame)
@@ -89,11 +103,10 @@ class MainWindow(QMainWindow):
         log_header.setFont(QFont('Arial', 12, QFont.Bold))
         log_layout.addWidget(log_header)
         
-        self.log_display = QTextEdit()
-        self.log_display.setReadOnly(True)
+        self.log_display = LogView()
         self.log_display.setFont(QFont('Consolas', 10))
         self.log_display.setStyleSheet("""
-            QTextEdit {
+            QListView {
                 background-color: #1e1e1e;
                 color: #ffffff;
                 border: 1px solid #3e3e3e;
@@ -105,20 +118,22 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(log_frame)
 
     def show_settings(self):
-        print("[UI] Opening settings dialog")
         dialog = SettingsDialog(self)
         if dialog.exec() == QDialog.Accepted:
-            print("[UI] Settings updated")
+            log.info("Settings updated")
             self.log_message("Settings updated")
             if self.monitor:
-                current_file = self.monitor.file_path
+                from modules.monitor import ExcelMonitor
+                current_files = self.monitor.file_paths()
+                # Stopping the manager also closes its outbox before the new one opens it
                 self.monitor.stop()
-                self.monitor = ExcelMonitor(current_file)
+                self.monitor = ExcelMonitor()
+                for file_path in current_files:
+                    self.monitor.add_file(file_path)
                 self.connect_monitor_signals()
                 self.monitor.start()
 
     def select_file(self):
-        print("[UI] Opening file dialog")
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "Select File",
@@ -127,59 +142,52 @@ class MainWindow(QMainWindow):
         )
         
         if file_path:
-            print(f"[UI] Selected file: {file_path}")
-            self.file_label.setText(f"Monitoring: {os.path.basename(file_path)}")
-            if self.monitor:
-                self.monitor.stop()
+            log.info("Selected file: %s", file_path)
+            if self.monitor is None:
+                from modules.monitor import ExcelMonitor
+                self.monitor = ExcelMonitor()
+                self.connect_monitor_signals()
+                self.monitor.start()
             
-            self.monitor = ExcelMonitor(file_path)
-            self.connect_monitor_signals()
-            self.monitor.start()
+            self.monitor.add_file(file_path)
+            file_count = len(self.monitor.file_paths())
+            if file_count == 1:
+                self.file_label.setText(f"Monitoring: {os.path.basename(file_path)}")
+            else:
+                self.file_label.setText(f"Monitoring: {file_count} files")
             self.log_message(f"Selected file: {os.path.basename(file_path)}")
 
     def connect_monitor_signals(self):
-        print("[UI] Connecting monitor signals")
         if self.monitor:
             try:
                 # Disconnect existing connections if any
-                self.monitor.log_signal.disconnect()
-                self.monitor.error_signal.disconnect()
-                self.monitor.status_signal.disconnect()
+                self.monitor.events_signal.disconnect()
             except:
                 pass
             
-            # Connect new signals
-            self.monitor.log_signal.connect(self.log_message)
-            self.monitor.error_signal.connect(self.log_error)
-            self.monitor.status_signal.connect(self.update_status)
-            
-            print("[UI] Monitor signals connected")
-            # Test signal connection
-            self.monitor.log_signal.emit("Signal connection test")
+            # Connect new signals; events arrive in batches on the GUI thread
+            self.monitor.events_signal.connect(self.on_events)
+            self.metrics_panel.set_metrics(self.monitor.manager.metrics)
+
+    def on_events(self, batch):
+        for file_path, level, message in batch.logs:
+            self.log_display.append(message, level)
+        for file_path, status in batch.statuses.items():
+            self.update_status(self.monitor.format_message(file_path, status))
+        self.counters_label.setText(format_counters(batch.counters, batch.rates))
 
     def log_message(self, message: str):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_text = f'<span style="color: #4CAF50;">[{timestamp}]</span> {message}'
-        self.log_display.append(log_text)
-        self.scroll_to_bottom()
-        print(f"[UI] {message}")
+        # Lines are batched into the view a few times a second, see LogModel
+        self.log_display.append(message)
 
     def log_error(self, message: str):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_text = f'<span style="color: #FF5252;">[{timestamp}] ERROR:</span> {message}'
-        self.log_display.append(log_text)
-        self.scroll_to_bottom()
-        print(f"[UI] ERROR: {message}")
-
-    def scroll_to_bottom(self):
-        self.log_display.verticalScrollBar().setValue(
-            self.log_display.verticalScrollBar().maximum()
-        )
+        self.log_display.append(message, 'error')
+        log.error("%s", message)
 
     def update_status(self, status: str):
-        print(f"[UI] Status changed to: {status}")
+        # The status label shows the status; logging it too doubled every change
+        log.debug("Status changed to: %s", status)
         self.status_label.setText(f"Status: {status}")
-        self.log_message(f"Status changed to: {status}")
 
     def closeEvent(self, event):
         if self.monitor:
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import uuid
+
+import requests
+
+UPLOAD_PATH = '/api/file-management/files/'
+CHUNKS_PATH = '/api/file-management/files/{file_id}/chunks/'
+COMPLETE_PATH = '/api/file-management/files/{file_id}/complete/'
+
+
+class MultipartStream:
+    """File-like multipart/form-data body that streams the file from disk
+
+    requests reads it in blocks, and because `len` is known it is sent with
+    a Content-Length header instead of being buffered in memory.
+    """
+
+    def __init__(self, file_path: str, fields: dict, file_field: str = 'file',
+                 block_size: int = 64 * 1024, on_progress=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.block_size = block_size
+        self.on_progress = on_progress
+        self.file_size = os.path.getsize(file_path)
+        self.file = open(file_path, 'rb')
+        self.sent = 0
+
+        head = b''
+        for name, value in fields.items():
+            head += (f'--{self.boundary}\r\n'
+                     f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f'{value}\r\n').encode('utf-8')
+        head += (f'--{self.boundary}\r\n'
+                 f'Content-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{os.path.basename(file_path)}"\r\n'
+                 'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8')
+        self.head = head
+        self.tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+        self.len = len(self.head) + self.file_size + len(self.tail)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.len
+        data = b''
+        if self.head:
+            data, self.head = self.head[:size], self.head[size:]
+        if len(data) < size and not self.file.closed:
+            block = self.file.read(min(size - len(data), self.block_size))
+            if block:
+                data += block
+                self.sent += len(block)
+                if self.on_progress:
+                    self.on_progress(self.sent, self.file_size)
+            else:
+                self.file.close()
+        if len(data) < size and self.file.closed and self.tail:
+            rest = size - len(data)
+            data, self.tail = data + self.tail[:rest], self.tail[rest:]
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class FileUploader:
+    """Upload a monitored file to the cloud without loading it into memory
+
+    Files up to `chunk_threshold` bytes are sent as one streamed multipart
+    request. Larger files are sent in resumable chunks of `chunk_size` bytes,
+    each with its SHA-256 checksum; chunks the server already has are
+    skipped, so an interrupted upload continues where it stopped.
+    """
+
+    def __init__(self, api_url: str, api_key: str, chunk_size: int = 8 * 1024 * 1024,
+                 chunk_threshold: int = 32 * 1024 * 1024, timeout: float = 60,
+                 session: requests.Session = None):
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.chunk_size = chunk_size
+        self.chunk_threshold = chunk_threshold
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def headers(self, file_path: str, file_type: str) -> dict:
+        return {
+            'Authorization': f'Token {self.api_key}',
+            'original_filename': os.path.basename(file_path),
+            'file_type': file_type,
+        }
+
+    def upload(self, file_path: str, file_id: str, file_type: str, on_progress=None):
+        """Upload the file, choosing streamed or chunked mode by its size"""
+        if os.path.getsize(file_path) > self.chunk_threshold:
+            return self.upload_chunked(file_path, file_id, file_type, on_progress)
+        return self.upload_multipart(file_path, file_id, file_type, on_progress)
+
+    def upload_multipart(self, file_path: str, file_id: str, file_type: str,
+                         on_progress=None) -> requests.Response:
+        """Send the whole file in one multipart request streamed from disk"""
+        body = MultipartStream(file_path, {'file_id': file_id}, on_progress=on_progress)
+        headers = self.headers(file_path, file_type)
+        headers['Content-Type'] = body.content_type
+        try:
+            response = self.session.post(f"{self.api_url}{UPLOAD_PATH}", data=body,
+                                         headers=headers, timeout=self.timeout)
+        finally:
+            body.close()
+        response.raise_for_status()
+        return response
+
+    def received_chunks(self, file_id: str, headers: dict) -> set:
+        """Return the indexes of chunks the server already has for this file"""
+        response = self.session.get(f"{self.api_url}{CHUNKS_PATH.format(file_id=file_id)}",
+                                    headers=headers, timeout=self.timeout)
+        if response.status_code == 404:
+            return set()
+        response.raise_for_status()
+        return set(response.json().get('chunks', []))
+
+    def upload_chunked(self, file_path: str, file_id: str, file_type: str,
+                       on_progress=None) -> requests.Response:
+        """Send the file in checksummed chunks, skipping chunks already received"""
+        size = os.path.getsize(file_path)
+        chunk_count = max(1, (size + self.chunk_size - 1) // self.chunk_size)
+        headers = self.headers(file_path, file_type)
+        done = self.received_chunks(file_id, headers)
+        file_hash = hashlib.sha256()
+        chunks_url = f"{self.api_url}{CHUNKS_PATH.format(file_id=file_id)}"
+
+        with open(file_path, 'rb') as f:
+            for index in range(chunk_count):
+                start = index * self.chunk_size
+                chunk = f.read(self.chunk_size)
+                file_hash.update(chunk)
+                if index not in done:
+                    chunk_headers = dict(headers)
+                    chunk_headers.update({
+                        'Content-Type': 'application/octet-stream',
+                        'Content-Range': f'bytes {start}-{start + len(chunk) - 1}/{size}',
+                        'X-Chunk-Index': str(index),
+                        'X-Chunk-SHA256': hashlib.sha256(chunk).hexdigest(),
+                    })
+                    response = self.session.put(f"{chunks_url}{index}/", data=chunk,
+                                                headers=chunk_headers, timeout=self.timeout)
+                    response.raise_for_status()
+                if on_progress:
+                    on_progress(start + len(chunk), size)
+
+        response = self.session.post(
+            f"{self.api_url}{COMPLETE_PATH.format(file_id=file_id)}",
+            json={'chunks': chunk_count, 'size': size, 'sha256': file_hash.hexdigest()},
+            headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,113 @@
+import json
+import struct
+
+import numpy as np
+
+JSON_CONTENT_TYPE = 'application/json'
+COLUMNAR_CONTENT_TYPE = 'application/vnd.excel-monitor.columns'
+
+# Leading bytes of a columnar batch, followed by the length of its JSON header
+MAGIC = b'XMC1'
+HEADER = struct.Struct('<4sI')
+LENGTH = struct.Struct('<I')
+NUMERIC_TYPES = {'f8': '<f8', 'i8': '<i8'}
+
+
+def column_type(values) -> str:
+    """Pick the packed type of a column: 'i8', 'f8' or 'json' for anything else
+
+    Integers stay 'i8' when they fit, and only share an 'f8' column with
+    floats while a float64 holds them exactly. Nulls go in a separate mask.
+    """
+    numbers = set(map(type, values)) - {type(None)}
+    if not numbers or not numbers <= {int, float}:
+        return 'json'
+    if int in numbers:
+        ints = [value for value in values if type(value) is int]
+        low, high = min(ints), max(ints)
+        if numbers == {int}:
+            return 'i8' if -2 ** 63 <= low and high < 2 ** 63 else 'json'
+        if low < -2 ** 53 or high > 2 ** 53:
+            return 'json'
+    return 'f8'
+
+
+def encode_columnar(file_id: str, payloads, op: str = 'insert', seq: int = None) -> bytes:
+    """Pack a batch of JSON-encoded rows as a column-name header and column arrays
+
+    The body is MAGIC, the length of a JSON header and the header itself,
+    holding the file id, op, seq, row count and the name and type of every
+    column, followed by one block per column: for 'f8' and 'i8' columns a
+    bit-packed null mask (if the header says `nulls`) and the little-endian
+    values, for 'json' columns the length and text of a JSON array. Tag names
+    are sent once per batch instead of once per row, and floats as 8 bytes.
+    """
+    rows = json.loads(b'[' + b','.join(payloads) + b']')
+    names = list(rows[0]) if rows else []
+    if all(len(row) == len(names) and list(row) == names for row in rows):
+        # Rows of one file share their columns, so transposing them is enough
+        table = zip(*(row.values() for row in rows)) if names else ()
+    else:
+        names = list(dict.fromkeys(name for row in rows for name in row))
+        table = ([row.get(name) for row in rows] for name in names)
+
+    columns, blocks = [], []
+    for name, values in zip(names, table):
+        kind = column_type(values)
+        column = {'name': name, 'type': kind}
+        if kind == 'json':
+            text = json.dumps(values).encode('utf-8')
+            blocks += [LENGTH.pack(len(text)), text]
+        else:
+            column['nulls'] = None in values
+            if column['nulls']:
+                nulls = np.array([value is None for value in values], dtype=bool)
+                blocks.append(np.packbits(nulls).tobytes())
+                fill = np.nan if kind == 'f8' else 0
+                values = [fill if value is None else value for value in values]
+            blocks.append(np.array(values, dtype=NUMERIC_TYPES[kind]).tobytes())
+        columns.append(column)
+
+    header = {'file_id': file_id, 'op': op, 'rows': len(rows), 'columns': columns}
+    if seq is not None:
+        header['seq'] = int(seq)
+    header = json.dumps(header).encode('utf-8')
+    return b''.join([HEADER.pack(MAGIC, len(header)), header] + blocks)
+
+
+def decode_columnar(body: bytes) -> dict:
+    """Unpack a columnar batch into the fields of the equivalent JSON body
+
+    Rows that lacked a column come back with None for it.
+    """
+    magic, length = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError("Not a columnar row batch")
+    offset = HEADER.size
+    header = json.loads(body[offset:offset + length])
+    offset += length
+    count = header['rows']
+    data = {}
+    for column in header['columns']:
+        if column['type'] == 'json':
+            (size,) = LENGTH.unpack_from(body, offset)
+            offset += LENGTH.size
+            data[column['name']] = json.loads(body[offset:offset + size])
+            offset += size
+            continue
+        nulls = None
+        if column['nulls']:
+            size = (count + 7) // 8
+            nulls = np.unpackbits(np.frombuffer(body, np.uint8, size, offset), count=count)
+            offset += size
+        values = np.frombuffer(body, NUMERIC_TYPES[column['type']], count, offset)
+        offset += values.nbytes
+        values = values.tolist()
+        if nulls is not None:
+            values = [None if null else value for value, null in zip(values, nulls)]
+        data[column['name']] = values
+
+    names = list(data)
+    header['rows'] = [dict(zip(names, row)) for row in zip(*data.values())] if names \
+        else [{} for _ in range(count)]
+    return header
@@ -0,0 +1,634 @@
+import hashlib
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from modules.row_diff import RowDiff
+
+# Date epochs of the two workbook calendars, as openpyxl's from_excel expects
+# them. openpyxl itself takes ~150 ms to import, so its helpers are only
+# imported once a workbook needs them.
+CALENDAR_WINDOWS_1900 = datetime(1899, 12, 30)
+CALENDAR_MAC_1904 = datetime(1904, 1, 1)
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+DOC_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+ROW_TAG = f'{{{MAIN_NS}}}row'
+CELL_TAG = f'{{{MAIN_NS}}}c'
+VALUE_TAG = f'{{{MAIN_NS}}}v'
+INLINE_TAG = f'{{{MAIN_NS}}}is'
+TEXT_TAG = f'{{{MAIN_NS}}}t'
+SHARED_ITEM_TAG = f'{{{MAIN_NS}}}si'
+
+ROOT_START = re.compile(rb'<(?![?!])([\w:]+)[^>]*>')
+SHEET_DATA_START = re.compile(rb'<([\w:]*sheetData)\b[^>]*?(/?)>')
+ROW_START = re.compile(rb'<(?:\w+:)?row\b[^>]*?\br="(\d+)"')
+ROW_END = re.compile(rb'</(?:\w+:)?row>')
+SHEET_DATA_END = re.compile(rb'</(?:\w+:)?sheetData>')
+
+WORKBOOK_PATH = 'xl/workbook.xml'
+WORKBOOK_RELS_PATH = 'xl/_rels/workbook.xml.rels'
+SHARED_STRINGS_PATH = 'xl/sharedStrings.xml'
+STYLES_PATH = 'xl/styles.xml'
+TABLES_FOLDER = 'xl/tables/'
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def column_index(ref: str) -> int:
+    """Return the 0-based column of a cell reference such as 'AB12'"""
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + (ord(char.upper()) - 64)
+    return index - 1
+
+
+def hash_values(values) -> int:
+    """Return a stable 64-bit hash of one row of cell values
+
+    Numbers are compared as floats and trailing empty cells are ignored, so
+    the hash only changes when the visible content of the row does.
+    """
+    values = list(values)
+    while values and values[-1] is None:
+        values.pop()
+    normal = tuple(float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else
+                   v.isoformat() if hasattr(v, 'isoformat') else v
+                   for v in values)
+    digest = hashlib.blake2b(repr(normal).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+BLANK_HASH = hash_values([])
+
+
+def part_path(base: str, target: str) -> str:
+    """Resolve a relationship target against the folder of its source part"""
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(base, target))
+
+
+def member_key(archive: zipfile.ZipFile, name: str) -> str:
+    """Return 'crc32:size' of a zip member from the central directory"""
+    try:
+        info = archive.getinfo(name)
+    except KeyError:
+        return '-'
+    return f'{info.CRC:08x}:{info.file_size}'
+
+
+class Region:
+    """Where the rows of a monitoring target are: a sheet and optional cell bounds
+
+    `bounds` is (min_col, min_row, max_col, max_row), 1-based and inclusive,
+    with None for an open side. Without a first row, the sheet's first row
+    is the header. `columns` names the columns of a table, and `parts` lists
+    the zip members besides the sheet that define the region.
+    """
+
+    __slots__ = ('sheet_path', 'bounds', 'header_rows', 'columns', 'parts')
+
+    def __init__(self, sheet_path: str, bounds=(None, None, None, None), header_rows: int = 1,
+                 columns=None, parts=()):
+        self.sheet_path = sheet_path
+        self.bounds = tuple(bounds)
+        self.header_rows = header_rows
+        self.columns = columns
+        self.parts = tuple(parts)
+
+
+class XlsxWorkbook:
+    """The parts of an .xlsx/.xlsm workbook shared by all its monitoring targets
+
+    Holds the sheet list, defined names and tables, which locate targets, and
+    the shared strings and date styles, which decode cells. Each is re-read
+    only when its zip member changed. run() serves the scans of any number
+    of targets from one opening of the archive, streaming each sheet once.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.sheets = []
+        self.names = {}
+        self.tables = {}
+        self.shared_strings = []
+        self.date_styles = set()
+        self.epoch = CALENDAR_WINDOWS_1900
+        self.from_excel = None
+        self._column_cache = {}
+        self._date_style_keys = set()
+        self._structure_key = None
+        self._shared_strings_key = None
+        self._styles_key = None
+
+    def load_structure(self, archive: zipfile.ZipFile):
+        """Read the sheets, defined names, tables and date epoch of the workbook"""
+        members = set(archive.namelist())
+        key = tuple((name, member_key(archive, name)) for name in
+                    [WORKBOOK_PATH, WORKBOOK_RELS_PATH] +
+                    sorted(m for m in members if m.startswith(TABLES_FOLDER)))
+        if key == self._structure_key:
+            return
+
+        workbook = ET.fromstring(archive.read(WORKBOOK_PATH))
+        properties = workbook.find(f'{{{MAIN_NS}}}workbookPr')
+        if properties is not None and properties.get('date1904') in ('1', 'true'):
+            self.epoch = CALENDAR_MAC_1904
+        else:
+            self.epoch = CALENDAR_WINDOWS_1900
+
+        rels = ET.fromstring(archive.read(WORKBOOK_RELS_PATH))
+        targets = {rel.get('Id'): rel.get('Target')
+                   for rel in rels.iter(f'{{{PKG_REL_NS}}}Relationship')}
+        self.sheets = [(sheet.get('name'), part_path('xl', targets[sheet.get(f'{{{DOC_REL_NS}}}id')]))
+                       for sheet in workbook.iter(f'{{{MAIN_NS}}}sheet')]
+        if not self.sheets:
+            raise ValueError("Workbook has no worksheets")
+
+        # Excel names are case-insensitive; a workbook-level name wins over sheet-level ones
+        self.names = {}
+        for defined in workbook.iter(f'{{{MAIN_NS}}}definedName'):
+            name = defined.get('name', '').lower()
+            if name not in self.names or defined.get('localSheetId') is None:
+                self.names[name] = defined.text or ''
+
+        self.tables = {}
+        for _, sheet_path in self.sheets:
+            folder, base = posixpath.split(sheet_path)
+            rels_path = posixpath.join(folder, '_rels', base + '.rels')
+            if rels_path not in members:
+                continue
+            for rel in ET.fromstring(archive.read(rels_path)).iter(f'{{{PKG_REL_NS}}}Relationship'):
+                if rel.get('Type', '').endswith('/table'):
+                    table_path = part_path(folder, rel.get('Target'))
+                    if table_path in members:
+                        self.read_table(archive, table_path, sheet_path)
+        self._structure_key = key
+
+    def read_table(self, archive: zipfile.ZipFile, table_path: str, sheet_path: str):
+        from openpyxl.utils.cell import range_boundaries
+        table = ET.fromstring(archive.read(table_path))
+        min_col, min_row, max_col, max_row = range_boundaries(table.get('ref'))
+        region = Region(sheet_path,
+                        (min_col, min_row, max_col, max_row - int(table.get('totalsRowCount', 0))),
+                        header_rows=int(table.get('headerRowCount', 1)),
+                        columns=[c.get('name') for c in table.iter(f'{{{MAIN_NS}}}tableColumn')],
+                        parts=(table_path,))
+        for name in {table.get('name'), table.get('displayName')} - {None}:
+            self.tables[name.lower()] = region
+
+    def load_values(self, archive: zipfile.ZipFile):
+        """Read the shared strings and date styles used to decode cells"""
+        shared_key = member_key(archive, SHARED_STRINGS_PATH)
+        if shared_key != self._shared_strings_key:
+            self.shared_strings = self.read_shared_strings(archive)
+            self._shared_strings_key = shared_key
+        styles_key = member_key(archive, STYLES_PATH)
+        if styles_key != self._styles_key:
+            self.date_styles = self.read_date_styles(archive)
+            self._date_style_keys = {str(i) for i in self.date_styles}
+            self._styles_key = styles_key
+
+    def resolve(self, target=None) -> Region:
+        """Locate a target: a sheet name or index, a named range or a table name
+
+        None is the first sheet. Names are looked up as sheet names first.
+        """
+        if target is None:
+            return Region(self.sheets[0][1])
+        if isinstance(target, int):
+            try:
+                return Region(self.sheets[target][1])
+            except IndexError:
+                raise ValueError(f"Worksheet not found: {target}")
+        for name, sheet_path in self.sheets:
+            if name == target:
+                return Region(sheet_path)
+        reference = self.names.get(target.lower())
+        if reference is not None:
+            return self.name_region(target, reference)
+        region = self.tables.get(target.lower())
+        if region is not None:
+            return region
+        raise ValueError(f"Worksheet, named range or table not found: {target}")
+
+    def name_region(self, name: str, reference: str) -> Region:
+        """Return the region of a defined name such as 'Data'!$A$1:$D$100"""
+        from openpyxl.utils.cell import range_boundaries
+        sheet, separator, cells = reference.rpartition('!')
+        if not separator or ',' in cells:
+            raise ValueError(f"Named range is not a single cell range: {name}")
+        if sheet.startswith("'") and sheet.endswith("'"):
+            sheet = sheet[1:-1].replace("''", "'")
+        sheet_path = dict(self.sheets).get(sheet)
+        if sheet_path is None:
+            raise ValueError(f"Worksheet of named range not found: {name}")
+        return Region(sheet_path, range_boundaries(cells.replace('$', '')), parts=(WORKBOOK_PATH,))
+
+    def run(self, scans: list):
+        """Run the scans of several targets with one read of the workbook
+
+        Each scan whose fingerprint still matches is marked skipped; a scan
+        whose target cannot be found gets its error. The remaining scans are
+        grouped by sheet, and every sheet is streamed once for its group,
+        skipping the rows none of them needs.
+        """
+        with zipfile.ZipFile(self.file_path) as archive:
+            self.load_structure(archive)
+            groups = {}
+            for scan in scans:
+                try:
+                    region = scan.reader.resolve()
+                except (KeyError, ValueError) as e:
+                    scan.error = e
+                    continue
+                scan.fingerprint = scan.reader.part_keys(archive)
+                if scan.fingerprint == scan.known_fingerprint:
+                    scan.skipped = True
+                    continue
+                groups.setdefault(region.sheet_path, []).append(scan)
+            if not groups:
+                return
+
+            self.load_values(archive)
+            for sheet_path, group in groups.items():
+                for scan in group:
+                    scan.begin()
+                first_row = lambda header: min(scan.first_row(header) for scan in group)
+                with archive.open(sheet_path) as stream:
+                    for number, values in self.stream_rows(stream, first_row):
+                        for scan in group:
+                            scan.feed(number, values)
+
+    def read_shared_strings(self, archive: zipfile.ZipFile) -> list:
+        if SHARED_STRINGS_PATH not in archive.namelist():
+            return []
+        strings = []
+        with archive.open(SHARED_STRINGS_PATH) as stream:
+            for _, element in ET.iterparse(stream):
+                if element.tag == SHARED_ITEM_TAG:
+                    strings.append(''.join(t.text or '' for t in element.iter(TEXT_TAG)))
+                    element.clear()
+        return strings
+
+    def read_date_styles(self, archive: zipfile.ZipFile) -> set:
+        """Return the indexes of cell styles whose number format is a date"""
+        if STYLES_PATH not in archive.namelist():
+            return set()
+        from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+        from openpyxl.utils.datetime import from_excel
+        # number_value() only converts dates once date styles were read
+        self.from_excel = from_excel
+        styles = ET.fromstring(archive.read(STYLES_PATH))
+        formats = dict(BUILTIN_FORMATS)
+        for fmt in styles.iter(f'{{{MAIN_NS}}}numFmt'):
+            formats[int(fmt.get('numFmtId'))] = fmt.get('formatCode', '')
+        cell_xfs = styles.find(f'{{{MAIN_NS}}}cellXfs')
+        if cell_xfs is None:
+            return set()
+        return {i for i, xf in enumerate(cell_xfs.findall(f'{{{MAIN_NS}}}xf'))
+                if is_date_format(formats.get(int(xf.get('numFmtId', 0)), ''))}
+
+    def cell_value(self, cell):
+        kind = cell.get('t', 'n')
+        if kind == 'inlineStr':
+            inline = cell.find(INLINE_TAG)
+            return None if inline is None else ''.join(t.text or '' for t in inline.iter(TEXT_TAG))
+        value = cell.find(VALUE_TAG)
+        text = None if value is None else value.text
+        if text is None:
+            return None
+        if kind == 'n':
+            return self.number_value(text, cell.get('s'))
+        if kind == 's':
+            return self.shared_strings[int(text)]
+        if kind == 'b':
+            return text == '1'
+        if kind == 'd':
+            return pd.Timestamp(text).to_pydatetime()
+        return text
+
+    def number_value(self, text: str, style):
+        number = float(text) if '.' in text or 'E' in text or 'e' in text else int(text)
+        if style is not None and style in self._date_style_keys:
+            return self.from_excel(number, self.epoch)
+        return number
+
+    def row_values(self, row) -> list:
+        values = []
+        columns = self._column_cache
+        for cell in row:
+            ref = cell.get('r')
+            if ref is None:
+                column = len(values)
+            else:
+                letters = ref.rstrip('0123456789')
+                column = columns.get(letters)
+                if column is None:
+                    column = columns[letters] = column_index(letters)
+            if column >= len(values):
+                values.extend([None] * (column + 1 - len(values)))
+            if cell.get('t') is None:
+                # Plain numbers are by far the most common cells
+                value = cell.find(VALUE_TAG)
+                if value is not None and value.text is not None:
+                    values[column] = self.number_value(value.text, cell.get('s'))
+            else:
+                values[column] = self.cell_value(cell)
+        return values
+
+    def stream_rows(self, stream, first_row):
+        """Yield (row number, values) for the first row of a sheet and its later rows
+
+        `first_row(header_number)` gives the row number to continue from
+        after the first row; the rows before it are skipped without parsing.
+        """
+        # Read until the first row is complete
+        buffer = b''
+        while True:
+            block = stream.read(BLOCK_SIZE)
+            buffer += block
+            sheet_data = SHEET_DATA_START.search(buffer)
+            if sheet_data and sheet_data.group(2):
+                return
+            header_start = ROW_START.search(buffer, sheet_data.end()) if sheet_data else None
+            header_end = ROW_END.search(buffer, header_start.end()) if header_start else None
+            if header_end:
+                break
+            if not block:
+                return
+
+        root = ROOT_START.search(buffer)
+        root_tag, root_name = root.group(0), root.group(1).decode('ascii')
+        header = ET.fromstring(root_tag + buffer[header_start.start():header_end.end()] +
+                               f'</{root_name}>'.encode('ascii'))
+        header_number = int(header_start.group(1))
+        yield header_number, self.row_values(header.find(ROW_TAG))
+
+        # Skip the rows before the first wanted one without parsing them
+        offset = header_end.end()
+        target = first_row(header_number)
+        if target > header_number + 1:
+            while True:
+                match = next((m for m in ROW_START.finditer(buffer, offset)
+                              if int(m.group(1)) >= target), None)
+                if match is not None:
+                    offset = match.start()
+                    break
+                block = stream.read(BLOCK_SIZE)
+                if not block:
+                    return
+                # Keep a row tag that may be split across blocks
+                last = buffer.rfind(b'<', offset)
+                buffer = (buffer[last:] if last >= 0 else b'') + block
+                offset = 0
+
+        # Parse complete rows a block at a time, so the tree is built in C
+        opening = root_tag + sheet_data.group(0)
+        closing = f'</{sheet_data.group(1).decode("ascii")}></{root_name}>'.encode('ascii')
+        pending = buffer[offset:]
+        del buffer
+        finished = False
+        while not finished:
+            block = stream.read(BLOCK_SIZE)
+            pending += block
+            end = SHEET_DATA_END.search(pending)
+            if end:
+                chunk, finished = pending[:end.start()], True
+            elif not block:
+                chunk, finished = pending, True
+            else:
+                cut = pending.rfind(b'row>')
+                if cut < 0 or pending[cut - 1:cut] not in (b'/', b':'):
+                    continue
+                chunk, pending = pending[:cut + 4], pending[cut + 4:]
+            for row in ET.fromstring(opening + chunk + closing)[0]:
+                number = int(row.get('r', 0))
+                if number > header_number:
+                    yield number, self.row_values(row)
+
+
+class SheetScan:
+    """The change scan of one target, fed the rows of its sheet by XlsxWorkbook.run()
+
+    Every row is hashed and only the rows whose hash differs from
+    `row_hashes` are kept, indexed by their position; rows past the end of
+    the new version are reported as deleted. Without `row_hashes`, rows past
+    `row_count` are reported as inserted. With `tail_only`, rows before
+    `row_count` are skipped unparsed and only the rows after them are
+    returned as inserted. A scan whose `fingerprint` equals
+    `known_fingerprint` is skipped.
+    """
+
+    def __init__(self, reader, row_hashes=None, row_count: int = 0, tail_only: bool = False,
+                 keep_rows: bool = True, known_fingerprint=None):
+        self.reader = reader
+        self.row_hashes = row_hashes
+        self.row_count = row_count
+        self.tail_only = tail_only
+        self.keep_rows = keep_rows
+        self.known_fingerprint = known_fingerprint
+        self.fingerprint = None
+        self.skipped = False
+        self.error = None
+        self.header_number = None
+        self.data_start = None
+        self.hashes = []
+        self.rows = []
+        self.positions = []
+
+    def begin(self):
+        """Reset the reader's columns when this scan will see the header row"""
+        region = self.reader.region
+        min_row = region.bounds[1]
+        if min_row is not None:
+            self.header_number = min_row if region.header_rows else None
+            self.data_start = min_row + region.header_rows
+        if region.columns is not None:
+            self.reader.columns = list(region.columns)
+        elif not self.tail_only or min_row is None or self.reader.columns is None:
+            self.reader.columns = []
+
+    def first_row(self, sheet_header: int) -> int:
+        """Return the first sheet row this scan needs after the sheet's first row"""
+        if not self.tail_only:
+            return 0
+        region = self.reader.region
+        min_row = region.bounds[1]
+        if min_row is None:
+            return sheet_header + 1 + self.row_count
+        if region.columns is None and region.header_rows and not self.reader.columns:
+            return min_row
+        return min_row + region.header_rows + self.row_count
+
+    def feed(self, number: int, values: list):
+        min_col, _, max_col, max_row = self.reader.region.bounds
+        if self.data_start is None:
+            # The first row of the sheet is the header
+            self.header_number, self.data_start = number, number + 1
+        if min_col is not None or max_col is not None:
+            values = values[(min_col or 1) - 1:max_col]
+        if number == self.header_number:
+            if self.reader.region.columns is None:
+                self.reader.columns = [name if name is not None else f'Unnamed: {i}'
+                                       for i, name in enumerate(values)]
+            return
+        if number < self.data_start or (max_row is not None and number > max_row):
+            return
+        if not any(v is not None for v in values):
+            return
+
+        position = number - self.data_start
+        if self.tail_only:
+            if position < self.row_count:
+                return
+            for blank in range(self.positions[-1] + 1 if self.positions else self.row_count,
+                               position):
+                self.rows.append([])
+                self.positions.append(blank)
+            self.rows.append(values)
+            self.positions.append(position)
+            return
+
+        known = self.row_hashes is not None
+        old_count = len(self.row_hashes) if known else self.row_count
+        self.hashes.extend([BLANK_HASH] * (position - len(self.hashes)))
+        value_hash = hash_values(values)
+        self.hashes.append(value_hash)
+        if self.keep_rows and (position >= old_count or
+                               (known and self.row_hashes[position] != value_hash)):
+            self.rows.append(values)
+            self.positions.append(position)
+
+    def result(self):
+        """Return (frame, diff, hashes, row_count); `hashes` is None when not known"""
+        if self.error is not None:
+            raise self.error
+        empty = np.empty(0, dtype=np.int64)
+        rows, positions = self.rows, self.positions
+        if self.tail_only:
+            row_count = self.row_count
+            new_count = positions[-1] + 1 if positions else row_count
+            hashes = None
+            if self.row_hashes is not None and len(self.row_hashes) >= row_count:
+                tail = np.array([hash_values(values) for values in rows], dtype=np.uint64)
+                hashes = np.concatenate([self.row_hashes[:row_count], tail])
+            return (self.reader.frame(rows, positions),
+                    RowDiff(np.array(positions, dtype=np.int64), empty, empty), hashes, new_count)
+
+        row_hashes = self.row_hashes
+        known = row_hashes is not None
+        old_count = len(row_hashes) if known else self.row_count
+        hashes = np.array(self.hashes, dtype=np.uint64)
+        new_count = len(hashes)
+        common = min(old_count, new_count)
+
+        if self.keep_rows:
+            # Rows that changed by becoming blank were never fed
+            changed = list(range(old_count, new_count))
+            if known:
+                changed += np.flatnonzero(hashes[:common] != row_hashes[:common]).tolist()
+            seen = set(positions)
+            blanks = [p for p in changed if p not in seen]
+            if blanks:
+                rows = rows + [[] for _ in blanks]
+                positions = positions + blanks
+                order = sorted(range(len(positions)), key=positions.__getitem__)
+                rows = [rows[i] for i in order]
+                positions = [positions[i] for i in order]
+
+        positions = np.array(positions, dtype=np.int64)
+        deleted = np.arange(new_count, old_count) if known else empty
+        diff = RowDiff(positions[positions >= common], positions[positions < common], deleted)
+        return self.reader.frame(rows, positions.tolist()), diff, hashes, new_count
+
+
+class XlsxSheetReader:
+    """Stream the rows of one monitoring target of an .xlsx/.xlsm workbook
+
+    The target is a worksheet (by name or index, the first by default), a
+    named range or a table. The worksheet XML is read straight from the zip
+    archive instead of loading the workbook, so memory does not grow with
+    the sheet. When only rows past a known row count are wanted, the
+    decompressed XML is scanned for the first such `<row r="...">` and
+    everything before it is never parsed.
+
+    The first row of the sheet or range is the header. Data rows are
+    numbered from 0, counting blank rows between them like pandas does.
+    Readers built on the same XlsxWorkbook can be scanned together by
+    XlsxWorkbook.run().
+    """
+
+    def __init__(self, file_path: str, sheet=None, workbook: XlsxWorkbook = None):
+        self.file_path = file_path
+        self.sheet = sheet
+        self.workbook = workbook or XlsxWorkbook(file_path)
+        self.columns = None
+        self.region = None
+
+    @property
+    def sheet_path(self):
+        return None if self.region is None else self.region.sheet_path
+
+    def resolve(self) -> Region:
+        """Locate the target in the workbook structure last loaded"""
+        self.region = self.workbook.resolve(self.sheet)
+        return self.region
+
+    def part_keys(self, archive: zipfile.ZipFile) -> str:
+        parts = (self.region.sheet_path, SHARED_STRINGS_PATH) + self.region.parts
+        return ','.join([self.region.sheet_path] + [member_key(archive, part) for part in parts])
+
+    def fingerprint(self):
+        """Return the CRC32 and size of the zip members holding the target
+
+        Only the zip central directory is read, so this is cheap enough to
+        run before every parse: when the fingerprint has not changed, the
+        target's cell data has not either, whatever else the save rewrote.
+        Returns None when the file is not a readable zip (e.g. mid-save).
+        """
+        try:
+            with zipfile.ZipFile(self.file_path) as archive:
+                self.workbook.load_structure(archive)
+                self.resolve()
+                return self.part_keys(archive)
+        except (OSError, zipfile.BadZipFile, KeyError, ValueError, ET.ParseError):
+            return None
+
+    def frame(self, rows: list, positions: list) -> pd.DataFrame:
+        """Build a DataFrame of the given rows, indexed by their positions"""
+        columns = list(self.columns or [])
+        width = max([len(columns)] + [len(values) for values in rows])
+        columns += [f'Unnamed: {i}' for i in range(len(columns), width)]
+        records = [values + [None] * (width - len(values)) for values in rows]
+        return pd.DataFrame.from_records(records, columns=columns,
+                                         index=pd.Index(positions, dtype='int64'))
+
+    def read_rows(self, start: int = 0) -> pd.DataFrame:
+        """Return the data rows from `start` on as a DataFrame indexed by position"""
+        return self.scan(row_count=start, tail_only=True)[0]
+
+    def begin_scan(self, row_hashes=None, row_count: int = 0, tail_only: bool = False,
+                   keep_rows: bool = True, fingerprint=None) -> SheetScan:
+        """Return a scan of this target to run together with others"""
+        return SheetScan(self, row_hashes, row_count, tail_only, keep_rows, fingerprint)
+
+    def scan(self, row_hashes=None, row_count: int = 0, tail_only: bool = False,
+             keep_rows: bool = True):
+        """Return (frame, diff, hashes, row_count) for the changes of the target
+
+        See SheetScan for how rows are compared.
+        """
+        scan = self.begin_scan(row_hashes, row_count, tail_only, keep_rows)
+        self.workbook.run([scan])
+        return scan.result()
@@ -0,0 +1,8 @@
+class FakeSettings:
+    """QSettings stand-in returning the given values, and the defaults otherwise"""
+
+    def __init__(self, **values):
+        self.values = values
+
+    def value(self, key, default=None):
+        return self.values.get(key, default)
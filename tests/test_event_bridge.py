@@ -0,0 +1,59 @@
+import unittest
+import threading
+from PySide6.QtCore import QCoreApplication
+from modules.event_bridge import EventBridge, format_counters
+
+class TestEventBridge(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.counters = {'rows_detected': 0, 'rows_synced': 0, 'sync_failures': 0,
+                         'queue_depth': 0}
+        self.bridge = EventBridge(counters=lambda: dict(self.counters), interval_ms=10000)
+        self.batches = []
+        self.bridge.batch_signal.connect(self.batches.append)
+
+    def tearDown(self):
+        # A timer left running fires during later tests, in a bridge only the
+        # garbage collector still holds
+        self.bridge.timer.stop()
+
+    def test_flushes_worker_events_as_one_batch(self):
+        def work(name):
+            for index in range(500):
+                self.bridge.log(name, f"Row {index}: {{}}")
+            self.bridge.status(name, "Monitoring")
+        threads = [threading.Thread(target=work, args=(f"file-{i}.csv",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.bridge.error("file-0.csv", "Sync failed")
+
+        self.bridge.flush()
+
+        self.assertEqual(len(self.batches), 1)
+        batch = self.batches[0]
+        self.assertEqual(len(batch.logs), 2001)
+        self.assertEqual(batch.logs[-1], ("file-0.csv", 'error', "Sync failed"))
+        self.assertEqual(set(batch.statuses.values()), {"Monitoring"})
+        self.assertEqual(len(batch.statuses), 4)
+
+    def test_counter_rates(self):
+        self.bridge.flush()
+        self.counters.update(rows_detected=1000, rows_synced=400, queue_depth=600)
+        self.bridge.flush()
+        self.bridge.flush()
+        self.bridge.flush()
+
+        self.assertEqual(len(self.batches), 3)
+        self.assertGreater(self.batches[1].rates['rows_detected'], 0)
+        self.assertEqual(self.batches[2].rates['rows_detected'], 0)
+        self.assertEqual(self.batches[2].counters['rows_synced'], 400)
+        self.assertIn("Synced 400", format_counters(self.batches[2].counters,
+                                                   self.batches[2].rates))
+
+if __name__ == '__main__':
+    unittest.main()
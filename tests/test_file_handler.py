@@ -1,6 +1,7 @@
 import unittest
 import os
 import tempfile
+import time
 import pandas as pd
 from unittest.mock import MagicMock
 from modules.file_handler import ExcelHandler
@@ -10,57 +11,106 @@ class TestExcelHandler(unittest.TestCase):
         # Create a temporary directory and Excel file
         self.temp_dir = tempfile.mkdtemp()
         self.excel_file = os.path.join(self.temp_dir, "test.xlsx")
-        
+
         # Create initial test data
         self.df = pd.DataFrame({
             'A': [1, 2, 3],
             'B': ['a', 'b', 'c']
         })
         self.df.to_excel(self.excel_file, index=False)
-        
+
         # Create handler with mock callback
         self.callback = MagicMock()
-        self.handler = ExcelHandler(self.callback)
-        self.handler.last_row_count = len(self.df)
-    
+        self.handler = ExcelHandler(self.callback, polling_interval=0.05, quiet_period=0.1)
+
     def tearDown(self):
         # Clean up
+        self.handler.stop()
         if os.path.exists(self.excel_file):
             os.remove(self.excel_file)
         os.rmdir(self.temp_dir)
-    
-    def test_detect_new_rows(self):
+
+    def wait_for_notifications(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.handler.notifications < count and time.monotonic() < deadline:
+            time.sleep(0.02)
+        # Give any duplicate notification a chance to show up
+        time.sleep(0.3)
+
+    def test_detect_change(self):
+        self.handler.start_watching(self.excel_file)
+
         # Add a new row
         new_df = pd.DataFrame({
             'A': [1, 2, 3, 4],
             'B': ['a', 'b', 'c', 'd']
         })
         new_df.to_excel(self.excel_file, index=False)
-        
-        # Create mock event
+        self.wait_for_notifications(1)
+
+        # Watchdog and the poll both see the write, but it is parsed once
+        self.callback.assert_called_once_with(self.excel_file)
+        self.assertEqual(self.handler.notifications, 1)
+
+    def test_burst_of_events_is_coalesced(self):
+        self.handler.start_watching(self.excel_file)
+
         event = MagicMock()
+        event.is_directory = False
         event.src_path = self.excel_file
-        
-        # Test detection
-        self.handler.on_modified(event)
-        
-        # Verify callback was called with new row
-        self.callback.assert_called_once()
-        new_rows = self.callback.call_args[0][0]
-        self.assertEqual(len(new_rows), 1)
-        self.assertEqual(new_rows[0]['A'], 4)
-        self.assertEqual(new_rows[0]['B'], 'd')
-    
+        for _ in range(20):
+            self.handler.on_modified(event)
+        with open(self.excel_file, 'ab') as f:
+            f.write(b'\0')
+        for _ in range(20):
+            self.handler.on_modified(event)
+        self.wait_for_notifications(1)
+
+        self.callback.assert_called_once_with(self.excel_file)
+        self.assertGreaterEqual(self.handler.events, 40)
+
+    def test_waits_for_multi_step_save(self):
+        self.callback.side_effect = lambda path: sizes.append(os.path.getsize(path))
+        sizes = []
+        self.handler.start_watching(self.excel_file)
+
+        # Write in several steps, each shorter than the quiet period
+        for _ in range(5):
+            with open(self.excel_file, 'ab') as f:
+                f.write(b'\0' * 100)
+            time.sleep(0.05)
+        self.wait_for_notifications(1)
+
+        self.assertEqual(self.handler.notifications, 1)
+        self.assertEqual(sizes, [os.path.getsize(self.excel_file)])
+
+    def test_max_latency_for_constant_writer(self):
+        self.handler.max_latency = 0.3
+        self.handler.start_watching(self.excel_file)
+
+        # Keep writing for longer than max_latency without going quiet
+        end = time.monotonic() + 1.0
+        while time.monotonic() < end:
+            with open(self.excel_file, 'ab') as f:
+                f.write(b'\0')
+            time.sleep(0.02)
+
+        self.assertGreaterEqual(self.handler.notifications, 2)
+
     def test_no_changes(self):
+        self.handler.start_watching(self.excel_file)
+
         # Create mock event
         event = MagicMock()
+        event.is_directory = False
         event.src_path = self.excel_file
-        
+
         # Test no changes
         self.handler.on_modified(event)
-        
+        time.sleep(0.3)
+
         # Verify callback was not called
         self.callback.assert_not_called()
 
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()
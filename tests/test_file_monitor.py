@@ -0,0 +1,221 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import pandas as pd
+from modules.file_monitor import FileMonitor, split_target
+from modules.outbox import Outbox
+from tests.helpers import FakeSettings
+
+class TestFileMonitor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.csv_file = os.path.join(self.temp_dir, "test.csv")
+        self.write("A,B,\n1,a,\n2,b,\n3,c,\n")
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+        self.monitor = FileMonitor(self.csv_file, FakeSettings(), self.outbox)
+        self.monitor.initialize()
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, text, mode='w'):
+        with open(self.csv_file, mode, newline='') as f:
+            f.write(text)
+
+    def drain(self):
+        """Return the queued (op, payload) pairs and clear the outbox"""
+        changes = []
+        while True:
+            batch = self.outbox.peek()
+            if batch is None:
+                return changes
+            _, op, ids, payloads = batch
+            changes.extend((op, json.loads(payload)) for payload in payloads)
+            self.outbox.ack(ids)
+
+    def test_appended_rows_are_inserted(self):
+        self.write("4,d,\n", mode='a')
+        self.monitor.check_excel_changes()
+
+        changes = self.drain()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0][0], 'insert')
+        self.assertEqual(changes[0][1]['A'], 4)
+        self.assertEqual(len(self.monitor.row_hashes), 4)
+
+    def test_one_log_line_per_batch(self):
+        messages = []
+        self.monitor.on_log = messages.append
+        self.write("4,d,\n5,e,\n6,f,\n", mode='a')
+        self.monitor.check_excel_changes()
+
+        self.assertEqual(messages[0], "New rows detected: 3 (rows 4-6)")
+        self.assertFalse(any(message.startswith("Row ") for message in messages))
+
+    def test_edited_rows_are_updated(self):
+        self.write("4,d,\n", mode='a')
+        self.monitor.check_excel_changes()
+        self.drain()
+
+        self.write("A,B,\n1,a,\n2,x,\n3,c,\n4,d,\n")
+        self.monitor.check_excel_changes()
+
+        changes = self.drain()
+        self.assertEqual([op for op, _ in changes], ['update'])
+        self.assertEqual(changes[0][1]['row_index'], 1)
+        self.assertEqual(changes[0][1]['data']['B'], 'x')
+
+    def test_removed_rows_are_deleted(self):
+        self.write("A,B,\n1,a,\n")
+        self.monitor.check_excel_changes()
+
+        changes = self.drain()
+        self.assertEqual(changes, [('delete', {'row_index': 1}), ('delete', {'row_index': 2})])
+        self.assertEqual(self.monitor.last_row_count, 1)
+
+    def restart(self, upload=False):
+        restarted = FileMonitor(self.csv_file, FakeSettings(), self.outbox)
+        restarted.initialize(upload=upload)
+        return restarted
+
+    def test_restart_only_stats_unchanged_file(self):
+        self.monitor.uploaded = True
+        self.outbox.save_checkpoint(self.monitor.file_key, self.monitor.checkpoint())
+        restarted = self.restart(upload=True)
+
+        self.assertEqual(restarted.file_id, self.monitor.file_id)
+        self.assertEqual(restarted.last_row_count, 3)
+        self.assertIsNone(restarted.reading)
+        # Without API credentials an upload would have failed
+        self.assertIsNone(restarted.last_error)
+
+    def test_restart_resumes_appended_rows(self):
+        self.write("4,d,\n", mode='a')
+        restarted = self.restart()
+
+        self.assertEqual(restarted.file_id, self.monitor.file_id)
+        self.assertEqual(self.drain(), [('insert', {'A': 4, 'B': 'd'})])
+        self.assertEqual(restarted.last_row_count, 4)
+
+    def test_restart_then_edit_is_updated(self):
+        self.write("4,d,\n", mode='a')
+        self.monitor.check_excel_changes()
+        restarted = self.restart()
+        self.write("5,e,\n", mode='a')
+        restarted.check_excel_changes()
+        self.drain()
+
+        self.write("A,B,\n9,a,\n2,b,\n3,c,\n4,d,\n5,e,\n")
+        restarted.check_excel_changes()
+
+        self.assertEqual(self.drain(), [('update', {'row_index': 0, 'data': {'A': 9, 'B': 'a'}})])
+
+    def test_restart_without_saved_hashes_rehashes(self):
+        self.outbox.conn.execute('DELETE FROM row_hashes')
+        restarted = self.restart()
+        self.assertEqual(len(restarted.row_hashes), 3)
+        self.assertEqual(self.outbox.get_row_hashes(restarted.file_key),
+                         restarted.row_hashes.tobytes())
+
+        self.write("A,B,\n1,a,\n2,x,\n3,c,\n")
+        restarted.check_excel_changes()
+
+        self.assertEqual([op for op, _ in self.drain()], ['update'])
+
+    def test_replaced_file_starts_over(self):
+        replacement = os.path.join(self.temp_dir, "export.csv")
+        with open(replacement, 'w', newline='') as f:
+            f.write("C\n7\n8\n")
+        os.replace(replacement, self.csv_file)
+        restarted = self.restart()
+
+        self.assertNotEqual(restarted.file_id, self.monitor.file_id)
+        self.assertEqual(restarted.last_row_count, 2)
+        self.assertIsNone(self.outbox.peek())
+
+class TestFileMonitorXlsx(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xlsx_file = os.path.join(self.temp_dir, "test.xlsx")
+        self.df = pd.DataFrame({'A': [1, 2, 3], 'B': ['a', 'b', 'c']})
+        self.df.to_excel(self.xlsx_file, index=False)
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+        self.monitor = FileMonitor(self.xlsx_file, FakeSettings(), self.outbox)
+        self.monitor.initialize()
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_edit_and_append(self):
+        self.df.loc[0, 'B'] = 'x'
+        pd.concat([self.df, pd.DataFrame({'A': [4], 'B': ['d']})]).to_excel(
+            self.xlsx_file, index=False)
+        self.monitor.check_excel_changes()
+
+        ops = []
+        while (batch := self.outbox.peek()) is not None:
+            ops.append((batch[1], [json.loads(p) for p in batch[3]]))
+            self.outbox.ack(batch[2])
+        self.assertEqual(ops, [('insert', [{'A': 4, 'B': 'd'}]),
+                               ('update', [{'row_index': 0, 'data': {'A': 1, 'B': 'x'}}])])
+        self.assertEqual(self.monitor.last_row_count, 4)
+
+    def test_unchanged_sheet_is_not_parsed(self):
+        parses = self.monitor.parse_count
+        # Rewrite the workbook with an extra sheet but the same data
+        with pd.ExcelWriter(self.xlsx_file) as writer:
+            self.df.to_excel(writer, index=False)
+            pd.DataFrame({'A': [9]}).to_excel(writer, sheet_name='Notes', index=False)
+        self.monitor.check_excel_changes()
+
+        self.assertEqual(self.monitor.parse_count, parses)
+        self.assertEqual(self.monitor.skip_count, 1)
+        self.assertIsNone(self.outbox.peek())
+
+class TestWorkbookTargetMonitor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xlsx_file = os.path.join(self.temp_dir, "test.xlsx")
+        self.write(pd.DataFrame({'A': [1, 2]}), pd.DataFrame({'T': [10]}))
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+        self.monitors = [FileMonitor(f"{self.xlsx_file}#{sheet}", FakeSettings(), self.outbox)
+                         for sheet in ('Live', 'Totals')]
+        for monitor in self.monitors:
+            monitor.initialize()
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, live, totals):
+        with pd.ExcelWriter(self.xlsx_file) as writer:
+            pd.DataFrame({'X': [0]}).to_excel(writer, sheet_name='Cover', index=False)
+            live.to_excel(writer, sheet_name='Live', index=False)
+            totals.to_excel(writer, sheet_name='Totals', index=False)
+
+    def test_split_target(self):
+        self.assertEqual(split_target("a#1/book.xlsx#Live"), ("a#1/book.xlsx", "Live"))
+        self.assertEqual(split_target("a#1/data.csv"), ("a#1/data.csv", None))
+
+    def test_targets_keep_their_own_state(self):
+        live, totals = self.monitors
+        self.assertEqual((live.last_row_count, totals.last_row_count), (2, 1))
+        self.assertNotEqual(live.file_key, totals.file_key)
+
+        self.write(pd.DataFrame({'A': [1, 2, 3]}), pd.DataFrame({'T': [10]}))
+        for monitor in self.monitors:
+            monitor.check_excel_changes()
+
+        batch = self.outbox.peek()
+        self.assertEqual(batch[0], live.file_id)
+        self.assertEqual([json.loads(p) for p in batch[3]], [{'A': 3}])
+        self.outbox.ack(batch[2])
+        self.assertIsNone(self.outbox.peek())
+        self.assertEqual(totals.skip_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
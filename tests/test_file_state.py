@@ -0,0 +1,26 @@
+import unittest
+import numpy as np
+from modules.file_state import FileState
+
+class TestFileState(unittest.TestCase):
+    def test_has_no_instance_dict(self):
+        state = FileState()
+        with self.assertRaises(AttributeError):
+            state.last_content = None
+
+    def test_append_hashes(self):
+        state = FileState()
+        state.append_hashes(np.arange(3, dtype=np.uint64))
+        self.assertIsNone(state.row_hashes)
+
+        state.set_hashes(np.arange(3, dtype=np.uint64))
+        for start in range(3, 200, 7):
+            state.append_hashes(np.arange(start, start + 7, dtype=np.uint64))
+        self.assertEqual(list(state.row_hashes), list(range(3 + 7 * 29)))
+        self.assertGreaterEqual(state.nbytes, (3 + 7 * 29) * 8)
+
+        state.clear_hashes()
+        self.assertEqual(state.nbytes, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import email.utils
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import MagicMock
+from modules.flow_control import FlowControl, TokenBucket, retry_after
+from modules.outbox import Outbox
+from modules.sync_client import CloudSync
+from benchmarks.stub_server import StubServer
+from tests.helpers import FakeSettings
+
+def http_error(status, headers=None):
+    error = Exception("HTTP error")
+    error.response = MagicMock(status_code=status, headers=headers or {})
+    return error
+
+class TestFlowControl(unittest.TestCase):
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 0.1, places=2)
+
+    def test_retry_after_seconds_and_date(self):
+        self.assertEqual(retry_after(http_error(429, {'Retry-After': '3'})), 3.0)
+        date = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertAlmostEqual(retry_after(http_error(503, {'Retry-After': date})), 60, delta=2)
+        self.assertIsNone(retry_after(ConnectionError("down")))
+
+    def test_batch_size_aimd(self):
+        flow = FlowControl(max_rows=100, target_latency=1.0, increase=10)
+        flow.on_failure(http_error(429), backoff=1.0)
+        self.assertEqual(flow.batch_rows, 50)
+        flow.on_success(latency=2.0)
+        self.assertEqual(flow.batch_rows, 25)
+        flow.on_success(latency=0.1)
+        self.assertEqual(flow.batch_rows, 35)
+        flow.on_failure(ConnectionError("down"), backoff=1.0)
+        self.assertEqual(flow.batch_rows, 35)
+        for _ in range(10):
+            flow.on_success(latency=0.1)
+        self.assertEqual(flow.batch_rows, 100)
+
+    def test_retry_after_pauses_requests(self):
+        flow = FlowControl(max_rows=10)
+        delay = flow.on_failure(http_error(429, {'Retry-After': '2'}), backoff=0.5)
+        self.assertEqual(delay, 2.0)
+        self.assertGreater(flow.acquire(), 1.5)
+        self.assertEqual(flow.throttled, 1)
+
+class TestThrottledSync(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_honours_retry_after_from_stub_server(self):
+        server = StubServer().start()
+        server.throttle = 1
+        server.retry_after = 1
+        errors = []
+        sync = CloudSync(FakeSettings(api_url=server.url, api_key="key", sync_batch_rows=8,
+                                      sync_in_flight=1),
+                         self.outbox, on_error=lambda file_id, error, delay: errors.append(delay))
+        try:
+            self.outbox.append("a", "file-a", [b'{"A": %d}' % i for i in range(8)])
+            start = time.monotonic()
+            sync.start()
+            deadline = start + 10
+            while self.outbox.pending() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            elapsed = time.monotonic() - start
+        finally:
+            sync.stop()
+            server.stop()
+
+        self.assertEqual(self.outbox.pending(), 0)
+        self.assertEqual(errors, [1.0])
+        self.assertGreaterEqual(elapsed, 1.0)
+        self.assertEqual(server.rows, 8)
+        stats = sync.stats()
+        self.assertEqual(stats['throttled'], 1)
+        self.assertLess(stats['batch_rows'], 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from modules.config import ConfigSettings
+from modules.headless import create_manager, run
+from benchmarks.stub_server import StubServer
+
+class TestConfigSettings(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "monitor.ini")
+        with open(self.path, 'w') as f:
+            f.write("[monitor]\napi_url = http://file\nsync_in_flight = 8\n"
+                    "files =\n    a.csv\n    book.xlsx#Sheet1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_environment_overrides_file(self):
+        settings = ConfigSettings(self.path, environ={'EXCEL_MONITOR_API_URL': 'http://env'})
+        self.assertEqual(settings.value('api_url'), 'http://env')
+        self.assertEqual(int(settings.value('sync_in_flight', 4)), 8)
+        self.assertEqual(settings.value('api_key', 'none'), 'none')
+        self.assertEqual(settings.files(), ['a.csv', 'book.xlsx#Sheet1'])
+
+    def test_no_qt_is_imported(self):
+        code = "import sys, modules.headless; print(any('PySide6' in m for m in sys.modules))"
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.dirname(__file__))).stdout
+        self.assertEqual(output.strip(), 'False')
+
+class TestHeadlessRun(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "sensor.csv")
+        with open(self.path, 'w') as f:
+            f.write("A,B\n1,a\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_detects_and_syncs_rows(self):
+        server = StubServer().start()
+        settings = ConfigSettings(environ={
+            'EXCEL_MONITOR_API_URL': server.url,
+            'EXCEL_MONITOR_API_KEY': 'key',
+            'EXCEL_MONITOR_OUTBOX_PATH': os.path.join(self.temp_dir, "outbox.db"),
+            'EXCEL_MONITOR_POLLING_INTERVAL_MS': '50',
+            'EXCEL_MONITOR_QUIET_PERIOD_MS': '50',
+        })
+        manager = create_manager(settings)
+        stopped = threading.Event()
+        thread = threading.Thread(target=run, args=(manager, [self.path], stopped, 0.1))
+        thread.start()
+        try:
+            deadline = time.monotonic() + 10
+            while manager.file_status()[0]['status'] != "Monitoring" and \
+                    time.monotonic() < deadline:
+                time.sleep(0.02)
+            with open(self.path, 'a') as f:
+                f.write("2,b\n3,c\n")
+            while manager.counters()['rows_synced'] < 2 and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            stopped.set()
+            thread.join()
+            server.stop()
+
+        self.assertEqual(manager.counters()['rows_synced'], 2)
+        self.assertEqual(server.rows, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+import os
+import subprocess
+import sys
+from benchmarks.bench_import_time import ENTRY_POINTS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestLazyImports(unittest.TestCase):
+    def loaded_at_import(self, module, names):
+        code = (f"import sys, {module}; "
+                f"print(' '.join(n for n in {names!r} if n in sys.modules))")
+        return subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                              text=True, cwd=ROOT,
+                              env=dict(os.environ, QT_QPA_PLATFORM='offscreen')).stdout.split()
+
+    def test_entry_points_defer_heavy_dependencies(self):
+        for entry, (module, lazy) in ENTRY_POINTS.items():
+            with self.subTest(entry=entry):
+                self.assertEqual(self.loaded_at_import(module, lazy), [])
+
+if __name__ == '__main__':
+    unittest.main()
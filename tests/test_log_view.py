@@ -0,0 +1,48 @@
+import unittest
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication
+from modules.log_view import LogModel, summarize
+
+class TestLogModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_ring_buffer_drops_oldest_lines(self):
+        model = LogModel(max_lines=3)
+        for index in range(5):
+            model.append(f"line {index}")
+        self.assertEqual(model.rowCount(), 0)
+
+        model.flush()
+
+        self.assertEqual(model.rowCount(), 3)
+        self.assertTrue(model.data(model.index(0)).endswith("line 2"))
+        model.append("line 5")
+        model.flush()
+        self.assertEqual(model.rowCount(), 3)
+        self.assertTrue(model.data(model.index(2)).endswith("line 5"))
+
+    def test_error_lines(self):
+        model = LogModel()
+        model.append("Sync failed", 'error')
+        model.flush()
+        self.assertIn("ERROR: Sync failed", model.data(model.index(0)))
+        self.assertIsNotNone(model.data(model.index(0), Qt.ForegroundRole))
+
+    def test_summarizes_bulk_events(self):
+        entries = [('12:00:00', 'info', "New rows detected: 3")]
+        entries += [('12:00:00', 'info', f"[a.csv] Row {row}: {{}}") for row in (12, 13, 14)]
+        entries += [('12:00:00', 'info', "[a.csv] Synced 500 rows (704 pending)"),
+                    ('12:00:00', 'info', "[b.csv] Row 2: {}"),
+                    ('12:00:01', 'info', "[a.csv] Synced 704 rows (0 pending)")]
+
+        messages = [message for _, _, message in summarize(entries)]
+
+        self.assertEqual(messages, ["New rows detected: 3",
+                                    "[a.csv] 3 rows detected (rows 12-14)",
+                                    "[a.csv] 1,204 rows synced (0 pending)",
+                                    "[b.csv] Row 2: {}"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import glob
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from modules.logger import (Logger, RotatingLogHandler, StructuredFormatter, setup_logging,
+                            shutdown_logging)
+
+class Counted:
+    """Argument that counts how often it is rendered"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "counted"
+
+class TestLogger(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.logger = logging.getLogger('tests.logger')
+
+    def tearDown(self):
+        shutdown_logging()
+        logging.getLogger().handlers.clear()
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def read_entries(self):
+        with open(os.path.join(self.log_dir, "excel_monitor.log"), encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_filtered_records_are_not_formatted(self):
+        setup_logging(level='INFO', log_dir=self.log_dir)
+        argument = Counted()
+        self.logger.debug("Row %s", argument)
+        self.logger.info("Row %s", argument)
+        shutdown_logging()
+        self.assertEqual(argument.calls, 1)
+        self.assertEqual([entry['message'] for entry in self.read_entries()], ["Row counted"])
+
+    def test_structured_fields(self):
+        setup_logging(level='DEBUG', log_dir=self.log_dir)
+        self.logger.info("Queued %d rows", 5, extra={'file_id': 'abc', 'rows': 5})
+        try:
+            raise ValueError("bad row")
+        except ValueError:
+            self.logger.exception("Failed")
+        shutdown_logging()
+        queued, failed = self.read_entries()
+        self.assertEqual(queued['message'], "Queued 5 rows")
+        self.assertEqual(queued['level'], 'INFO')
+        self.assertEqual(queued['logger'], 'tests.logger')
+        self.assertEqual((queued['file_id'], queued['rows']), ('abc', 5))
+        self.assertIn("ValueError: bad row", failed['exception'])
+
+    def test_row_lines_are_debug_only(self):
+        setup_logging(level='INFO', log_dir=self.log_dir)
+        activity = Logger('tests.activity')
+        activity.log('[a.csv] Row 3: {"A": 1}')
+        activity.log("New rows detected: 1")
+        activity.log("Row 4: failed", logging.ERROR)
+        shutdown_logging()
+        self.assertEqual([entry['message'] for entry in self.read_entries()],
+                         ["New rows detected: 1", "Row 4: failed"])
+
+    def test_records_are_written_by_the_listener_thread(self):
+        listener = setup_logging(level='INFO', log_dir=self.log_dir)
+        writers = []
+        handler = listener.handlers[0]
+        emit = handler.emit
+        handler.emit = lambda record: (writers.append(threading.current_thread()), emit(record))
+        self.logger.info("hello")
+        shutdown_logging()
+        self.assertEqual(len(writers), 1)
+        self.assertIsNot(writers[0], threading.current_thread())
+
+    def test_rotates_by_size(self):
+        path = os.path.join(self.log_dir, "excel_monitor.log")
+        handler = RotatingLogHandler(path, max_bytes=200, backup_count=3)
+        handler.setFormatter(StructuredFormatter())
+        for index in range(50):
+            handler.emit(logging.makeLogRecord({'msg': "line %d", 'args': (index,)}))
+        handler.close()
+        backups = glob.glob(path + ".*")
+        self.assertEqual(len(backups), 3)
+        self.assertLessEqual(os.path.getsize(path), 400)
+
+if __name__ == '__main__':
+    unittest.main()
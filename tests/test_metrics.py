@@ -0,0 +1,113 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from modules.file_monitor import FileMonitor
+from modules.metrics import STAGES, Histogram, Metrics, MetricsServer
+from modules.metrics_panel import summarize_metrics
+from modules.outbox import Outbox
+from modules.sync_client import CloudSync
+from benchmarks.stub_server import StubServer
+from tests.helpers import FakeSettings
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_quantiles(self):
+        histogram = Histogram()
+        for _ in range(90):
+            histogram.observe(0.004)
+        histogram.observe(2.0, count=10)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.sum, 90 * 0.004 + 20.0)
+        self.assertTrue(0.0025 < histogram.quantile(0.5) <= 0.005)
+        self.assertTrue(1.0 < histogram.quantile(0.99) <= 2.5)
+        merged = Histogram()
+        merged.merge(histogram)
+        self.assertEqual(merged.counts, histogram.counts)
+
+    def test_prometheus_text(self):
+        metrics = Metrics()
+        metrics.inc('rows_synced', 5, file='a "b".csv', op='insert')
+        metrics.stage('send', 0.03, 'a.csv')
+        metrics.stage('send', 0.2, 'a.csv')
+        lines = metrics.prometheus().splitlines()
+
+        self.assertIn('# TYPE excel_monitor_rows_synced_total counter', lines)
+        self.assertIn('excel_monitor_rows_synced_total{file="a \\"b\\".csv",op="insert"} 5', lines)
+        self.assertIn('# TYPE excel_monitor_stage_seconds histogram', lines)
+        self.assertIn('excel_monitor_stage_seconds_bucket{file="a.csv",stage="send",le="0.05"} 1',
+                      lines)
+        self.assertIn('excel_monitor_stage_seconds_bucket{file="a.csv",stage="send",le="+Inf"} 2',
+                      lines)
+        self.assertIn('excel_monitor_stage_seconds_count{file="a.csv",stage="send"} 2', lines)
+
+    def test_server_exports_text_and_json(self):
+        metrics = Metrics()
+        metrics.inc('rows_detected', 3, file='a.csv', op='insert')
+        server = MetricsServer(metrics, port=0)
+        server.start()
+        try:
+            base = f'http://127.0.0.1:{server.port}'
+            with urllib.request.urlopen(f'{base}/metrics') as response:
+                text = response.read().decode('utf-8')
+            with urllib.request.urlopen(f'{base}/metrics.json') as response:
+                snapshot = json.loads(response.read())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f'{base}/other')
+        finally:
+            server.stop()
+
+        self.assertIn('excel_monitor_rows_detected_total{file="a.csv",op="insert"} 3', text)
+        self.assertEqual(snapshot['counters'][0]['value'], 3)
+
+class TestPipelineMetrics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+        self.path = os.path.join(self.temp_dir, "sensor.csv")
+        with open(self.path, 'w') as f:
+            f.write("A,B\n1,a\n")
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_every_stage_is_timed(self):
+        server = StubServer().start()
+        settings = FakeSettings(api_url=server.url, api_key="key")
+        metrics = Metrics()
+        sync = CloudSync(settings, self.outbox, metrics=metrics)
+        monitor = FileMonitor(self.path, settings, self.outbox, notify_sender=sync.notify,
+                              metrics=metrics)
+        try:
+            monitor.initialize()
+            with open(self.path, 'a') as f:
+                f.write("2,b\n3,c\n")
+            monitor.check_excel_changes()
+            sync.start()
+            deadline = time.monotonic() + 10
+            while metrics.total('rows_synced') < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            sync.stop()
+            server.stop()
+
+        for stage in STAGES:
+            self.assertEqual(metrics.histogram('stage_seconds', stage=stage, file=self.path).count,
+                             1, stage)
+        self.assertEqual(metrics.total('rows_detected', file=self.path), 2)
+        self.assertEqual(metrics.total('rows_synced', file=self.path), 2)
+        lag = metrics.histogram('lag_seconds', file=self.path)
+        self.assertEqual(lag.count, 2)
+        self.assertLess(lag.quantile(0.99), 10)
+
+        summary, stages = summarize_metrics(metrics, 2.0)
+        self.assertTrue(summary.startswith("Synced 2 rows/s | End-to-end lag p50 "))
+        self.assertIn("send ", stages)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,12 @@
 import unittest
 import os
+import shutil
 import tempfile
+import time
 import pandas as pd
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 from modules.monitor import ExcelMonitor
+from modules.outbox import Outbox
 
 class TestExcelMonitor(unittest.TestCase):
     def setUp(self):
@@ -18,16 +21,17 @@ class TestExcelMonitor(unittest.TestCase):
         })
         self.df.to_excel(self.excel_file, index=False)
         
-        # Create monitor with mock signals
-        self.monitor = ExcelMonitor(self.excel_file)
+        # Create monitor with mock signals and its own outbox, not the application's
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+        self.monitor = ExcelMonitor(self.excel_file, self.outbox)
         self.monitor.log_signal = MagicMock()
         self.monitor.status_signal = MagicMock()
     
     def tearDown(self):
-        # Clean up
-        if os.path.exists(self.excel_file):
-            os.remove(self.excel_file)
-        os.rmdir(self.temp_dir)
+        # Clean up; stopping the monitor also stops its event bridge timer
+        self.monitor.stop()
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
     
     def test_read_excel_file(self):
         # Test reading Excel file
@@ -36,18 +40,12 @@ class TestExcelMonitor(unittest.TestCase):
         self.assertEqual(df.iloc[0]['A'], 1)
         self.assertEqual(df.iloc[0]['B'], 'a')
     
-    @patch('modules.monitor.requests.post')
-    def test_sync_to_cloud(self, mock_post):
-        # Mock successful API response
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"status": "success"}
-        mock_post.return_value = mock_response
-        
-        # Test syncing
-        result = self.monitor.sync_to_cloud([{"A": 4, "B": "d"}])
+    def test_sync_to_cloud(self):
+        # Rows are queued in the outbox; the sender thread posts them later
+        pending = self.outbox.pending()
+        result = self.monitor.sync_to_cloud(pd.DataFrame({'A': [4, 5], 'B': ['d', 'e']}))
         self.assertTrue(result)
-        mock_post.assert_called_once()
+        self.assertEqual(self.outbox.pending(), pending + 2)
     
     def test_detect_changes(self):
         # Add a new row
@@ -67,5 +65,25 @@ class TestExcelMonitor(unittest.TestCase):
         self.monitor.log_signal.emit.assert_called()
         self.monitor.status_signal.emit.assert_called()
 
+    def test_one_parse_per_write(self):
+        self.monitor.handler.polling_interval = 0.05
+        self.monitor.manager.start()
+        try:
+            deadline = time.monotonic() + 5
+            while self.monitor.file_monitor.status != "Monitoring" and time.monotonic() < deadline:
+                time.sleep(0.02)
+
+            pd.DataFrame({'A': [1, 2, 3, 4], 'B': ['a', 'b', 'c', 'd']}).to_excel(
+                self.excel_file, index=False)
+
+            while self.monitor.parse_count < 1 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            time.sleep(0.5)
+        finally:
+            self.monitor.manager.stop()
+
+        self.assertEqual(self.monitor.parse_count, 1)
+        self.assertEqual(self.monitor.last_row_count, 4)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,126 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from modules.monitor_manager import MonitorManager
+from modules.outbox import Outbox
+from tests.helpers import FakeSettings
+
+class TestMonitorManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+        self.manager = MonitorManager(
+            FakeSettings(polling_interval_ms=50, quiet_period_ms=50),
+            self.outbox,
+            max_workers=2,
+        )
+        self.files = []
+        for i in range(20):
+            path = os.path.join(self.temp_dir, f"sensor_{i}.csv")
+            with open(path, 'w') as f:
+                f.write("A,B,\n1,a,\n")
+            self.files.append(path)
+
+    def tearDown(self):
+        self.manager.stop()
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return condition()
+
+    def test_thread_count_is_flat(self):
+        self.manager.add_file(self.files[0])
+        self.manager.start()
+        self.assertTrue(self.wait_for(lambda: self.manager.file_status()[0]['status'] == "Monitoring"))
+        threads_one_file = threading.active_count()
+
+        for path in self.files[1:]:
+            self.manager.add_file(path)
+        self.assertTrue(self.wait_for(
+            lambda: all(s['status'] == "Monitoring" for s in self.manager.file_status())))
+
+        self.assertEqual(len(self.manager.directories), 1)
+        self.assertLessEqual(threading.active_count(), threads_one_file + 1)
+
+    def test_detects_rows_per_file(self):
+        for path in self.files:
+            self.manager.add_file(path)
+        self.manager.start()
+        self.assertTrue(self.wait_for(
+            lambda: all(s['status'] == "Monitoring" for s in self.manager.file_status())))
+
+        with open(self.files[3], 'a') as f:
+            f.write("2,b,\n3,c,\n")
+
+        status = {}
+        def rows_detected():
+            status.update({s['file_path']: s for s in self.manager.file_status()})
+            # The counters are updated just after the rows are queued
+            return status[self.files[3]]['rows'] == 3 and \
+                self.manager.counters()['rows_detected'] == 2
+        self.assertTrue(self.wait_for(rows_detected))
+
+        self.assertEqual(status[self.files[3]]['parses'], 1)
+        self.assertEqual(status[self.files[3]]['pending'], 2)
+        self.assertEqual(status[self.files[4]]['rows'], 1)
+        self.assertEqual(status[self.files[4]]['parses'], 0)
+        counters = self.manager.counters()
+        self.assertEqual(counters['rows_detected'], 2)
+        self.assertEqual(counters['queue_depth'], 2)
+        self.assertEqual(counters['rows_synced'], 0)
+
+    def test_failed_initialize_is_retried(self):
+        monitor = self.manager.add_file(self.files[0])
+        entry = next(iter(self.manager.files.values()))
+        with patch.object(monitor, 'parse_job', side_effect=OSError("file is locked")):
+            self.manager.parse(entry)
+        self.assertNotIn(monitor, entry.initialized)
+        self.assertEqual(monitor.status, "Error")
+
+        self.manager.parse(entry)
+        self.assertIn(monitor, entry.initialized)
+        self.assertEqual(monitor.last_row_count, 1)
+
+    def test_workbook_targets_share_one_watch(self):
+        import pandas as pd
+        path = os.path.join(self.temp_dir, "book.xlsx")
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame({'A': [1]}).to_excel(writer, sheet_name='One', index=False)
+            pd.DataFrame({'B': [1, 2]}).to_excel(writer, sheet_name='Two', index=False)
+        one = self.manager.add_file(f"{path}#One")
+        two = self.manager.add_file(f"{path}#Two")
+        self.assertIs(self.manager.add_file(f"{path}#Two"), two)
+        self.assertEqual(len(self.manager.files), 1)
+        self.assertIs(one.xlsx_reader.workbook, two.xlsx_reader.workbook)
+
+        self.manager.start()
+        self.assertTrue(self.wait_for(
+            lambda: all(s['status'] == "Monitoring" for s in self.manager.file_status())))
+        rows = {s['file_path']: s['rows'] for s in self.manager.file_status()}
+        self.assertEqual(rows, {f"{path}#One": 1, f"{path}#Two": 2})
+
+        self.manager.remove_file(f"{path}#One")
+        self.assertEqual(len(self.manager.files), 1)
+        self.manager.remove_file(f"{path}#Two")
+        self.assertEqual(self.manager.files, {})
+
+    def test_closes_the_outbox_it_opened(self):
+        manager = MonitorManager(FakeSettings(outbox_path=os.path.join(self.temp_dir, "own.db")))
+        manager.stop()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            manager.outbox.pending()
+        # An outbox passed in is left open for its owner
+        self.manager.stop()
+        self.assertEqual(self.outbox.pending(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
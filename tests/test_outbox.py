@@ -0,0 +1,112 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+from modules.outbox import Outbox
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "outbox.db")
+        self.outbox = Outbox(self.path)
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_append_peek_ack(self):
+        self.outbox.append("a.csv", "file-1", [b'{"A":1}', b'{"A":2}', b'{"A":3}'],
+                           first_row=10, checkpoint={'row_count': 13})
+
+        file_id, op, ids, payloads = self.outbox.peek(max_rows=2)
+        self.assertEqual(file_id, "file-1")
+        self.assertEqual(op, "insert")
+        self.assertEqual(payloads, [b'{"A":1}', b'{"A":2}'])
+
+        self.outbox.ack(ids)
+        self.assertEqual(self.outbox.pending("a.csv"), 1)
+        self.assertEqual(self.outbox.get_checkpoint("a.csv"),
+                         {'row_count': 13, 'acked_rows': 12})
+
+    def test_peek_respects_byte_limit(self):
+        self.outbox.append("a.csv", "file-1", [b'x' * 10, b'y' * 10])
+        _, _, ids, _ = self.outbox.peek(max_rows=10, max_bytes=15)
+        self.assertEqual(len(ids), 1)
+
+    def test_peek_stops_at_other_operation(self):
+        self.outbox.append_changes("a.csv", "file-1", [
+            ('insert', [3], [b'{"A":4}']),
+            ('update', [0], [b'{"row_index":0,"data":{"A":9}}']),
+        ], checkpoint={'row_count': 4})
+        self.outbox.append("a.csv", "file-1", [b'{"A":5}'], first_row=4)
+
+        _, op, ids, _ = self.outbox.peek()
+        self.assertEqual((op, len(ids)), ("insert", 1))
+        self.outbox.ack(ids)
+
+        _, op, ids, payloads = self.outbox.peek()
+        self.assertEqual((op, payloads), ("update", [b'{"row_index":0,"data":{"A":9}}']))
+        self.outbox.ack(ids)
+        # Updates do not move the acknowledged row count
+        self.assertEqual(self.outbox.get_checkpoint("a.csv")['acked_rows'], 4)
+
+    def test_take_numbers_batches_once(self):
+        self.outbox.append("a.csv", "file-1", [b'1', b'2', b'3'], checkpoint={'row_count': 3})
+        file_id, _, ids, payloads, seq = self.outbox.take(max_rows=2)
+        self.assertEqual((file_id, payloads, seq), ("file-1", [b'1', b'2'], 1))
+
+        # A numbered batch keeps its rows whatever the limits
+        self.assertEqual(self.outbox.take(max_rows=1)[3:], ([b'1', b'2'], 1))
+        self.assertEqual(self.outbox.take(after={"file-1": ids[-1]})[3:], ([b'3'], 2))
+        self.assertEqual(self.outbox.sequences(), {"file-1": 2})
+
+    def test_park_moves_rows_aside(self):
+        self.outbox.append("a.csv", "file-1", [b'1', b'2'], checkpoint={'row_count': 2})
+        _, _, ids, _, _ = self.outbox.take(max_rows=1)
+        self.outbox.park(ids, "400 Bad Request")
+
+        self.assertEqual(self.outbox.pending(), 1)
+        self.assertEqual(self.outbox.parked("a.csv"), 1)
+        self.assertEqual(self.outbox.get_checkpoint("a.csv")['acked_rows'], 1)
+        self.assertEqual(self.outbox.peek()[3], [b'2'])
+
+    def test_adds_operation_column_to_old_outbox(self):
+        self.outbox.close()
+        os.remove(self.path)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE rows (id INTEGER PRIMARY KEY AUTOINCREMENT, file_key TEXT NOT NULL, "
+                     "file_id TEXT NOT NULL, row_index INTEGER NOT NULL, payload BLOB NOT NULL)")
+        conn.execute("INSERT INTO rows (file_key, file_id, row_index, payload) "
+                     "VALUES ('a.csv', 'file-1', 0, x'7b7d')")
+        conn.commit()
+        conn.close()
+
+        self.outbox = Outbox(self.path)
+        self.assertEqual(self.outbox.peek()[1], "insert")
+
+    def test_survives_reopen(self):
+        self.outbox.append("a.csv", "file-1", [b'{"A":1}'], checkpoint={'row_count': 1})
+        self.outbox.close()
+
+        self.outbox = Outbox(self.path)
+        self.assertEqual(self.outbox.pending(), 1)
+        self.assertEqual(self.outbox.get_checkpoint("a.csv")['row_count'], 1)
+
+    def test_row_hashes_are_saved_in_chunks(self):
+        self.outbox.HASH_CHUNKS = 2
+        self.outbox.save_checkpoint("a.csv", {'row_count': 2}, hashes=(0, b'a' * 16))
+        self.outbox.append("a.csv", "file-1", [b'{"A":3}'], first_row=2,
+                           checkpoint={'row_count': 3})
+        self.outbox.append_changes("a.csv", "file-1", [], hashes=(2, b'b' * 8))
+        self.outbox.save_checkpoint("a.csv", {'row_count': 4}, hashes=(3, b'c' * 8))
+        self.assertEqual(self.outbox.get_row_hashes("a.csv"), b'a' * 16 + b'b' * 8 + b'c' * 8)
+
+        # Hashes overwritten inside a merged chunk leave a gap
+        self.outbox.save_checkpoint("a.csv", {'row_count': 2}, hashes=(1, b'd' * 8))
+        self.assertIsNone(self.outbox.get_row_hashes("a.csv"))
+        self.outbox.save_checkpoint("a.csv", {'row_count': 1}, hashes=(0, b'e' * 8))
+        self.assertEqual(self.outbox.get_row_hashes("a.csv"), b'e' * 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import pandas as pd
+from modules.file_monitor import FileMonitor
+from modules.outbox import Outbox
+from modules.parse_jobs import ParseBackend, SheetTarget, WorkbookJob
+from modules.xlsx_reader import XlsxWorkbook
+from tests.helpers import FakeSettings
+
+class TestProcessBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = ParseBackend(processes=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend.shutdown()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def drain(self):
+        batches = []
+        while (batch := self.outbox.peek()) is not None:
+            batches.append((batch[1], [json.loads(p) for p in batch[3]]))
+            self.outbox.ack(batch[2])
+        return batches
+
+    def test_csv_changes(self):
+        path = os.path.join(self.temp_dir, "data.csv")
+        with open(path, 'w') as f:
+            f.write("A,B\n1,a\n2,b\n")
+        monitor = FileMonitor(path, FakeSettings(), self.outbox, parse_backend=self.backend)
+        monitor.initialize()
+
+        with open(path, 'a') as f:
+            f.write("3,c\n")
+        monitor.check_excel_changes()
+        self.assertEqual(self.drain(), [('insert', [{'A': 3, 'B': 'c'}])])
+        # The tail reader state came back from the worker
+        self.assertEqual(monitor.tail_reader.row_count, 3)
+
+        with open(path, 'w') as f:
+            f.write("A,B\n1,x\n2,b\n3,c\n")
+        monitor.check_excel_changes()
+        self.assertEqual(self.drain(), [('update', [{'row_index': 0, 'data': {'A': 1, 'B': 'x'}}])])
+        self.assertEqual(monitor.parse_count, 2)
+
+    def test_workbook_job(self):
+        path = os.path.join(self.temp_dir, "book.xlsx")
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame({'A': [1, 2]}).to_excel(writer, sheet_name='One', index=False)
+            pd.DataFrame({'B': ['x']}).to_excel(writer, sheet_name='Two', index=False)
+        job = WorkbookJob(path, [SheetTarget('One'), SheetTarget('Two'), SheetTarget('Three')],
+                          XlsxWorkbook(path))
+        self.assertIsNone(pickle.loads(pickle.dumps(job)).workbook)
+
+        one, two, three = self.backend.run(job)
+        self.assertEqual(list(one.frame['A']), [1, 2])
+        self.assertEqual((one.row_count, two.row_count), (2, 1))
+        self.assertIsInstance(three.error, ValueError)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+import pandas as pd
+from modules.row_diff import diff_rows, hash_rows
+
+class TestRowDiff(unittest.TestCase):
+    def test_hashes_are_per_row(self):
+        df = pd.DataFrame({'A': [1, 2, 1], 'B': ['a', 'b', 'a']})
+        hashes = hash_rows(df)
+        self.assertEqual(hashes.dtype, np.uint64)
+        self.assertEqual(len(hashes), 3)
+        self.assertEqual(hashes[0], hashes[2])
+        self.assertNotEqual(hashes[0], hashes[1])
+
+    def test_hash_ignores_inferred_dtype(self):
+        # A tail read may parse a column as int that the full read sees as float
+        whole = pd.DataFrame({'A': [1.5, 2.0], 'B': ['a', 'b']})
+        tail = pd.DataFrame({'A': [2], 'B': ['b']}, index=[1])
+        self.assertEqual(hash_rows(whole)[1], hash_rows(tail)[0])
+
+    def test_hash_survives_float32_widening(self):
+        narrow = pd.DataFrame({'A': [0.500324, 12345.67]}, dtype='float32')
+        wide = pd.DataFrame({'A': [0.500324, 12345.67]})
+        self.assertEqual(list(hash_rows(narrow)), list(hash_rows(wide)))
+        # Frames read with a schema are rounded to the cached decimals
+        narrow = pd.DataFrame({'A': [0.500324, 26.5]}, dtype='float32')
+        narrow.attrs['decimals'] = {'A': 6}
+        wide = pd.DataFrame({'A': [0.500324, 26.5]})
+        self.assertEqual(list(hash_rows(narrow)), list(hash_rows(wide)))
+
+    def test_diff(self):
+        old = hash_rows(pd.DataFrame({'A': [1, 2, 3]}))
+        new = hash_rows(pd.DataFrame({'A': [1, 5, 3, 4, 6]}))
+
+        diff = diff_rows(old, new)
+        self.assertEqual(list(diff.updated), [1])
+        self.assertEqual(list(diff.inserted), [3, 4])
+        self.assertEqual(len(diff.deleted), 0)
+
+        diff = diff_rows(new, old)
+        self.assertEqual(list(diff.deleted), [3, 4])
+        self.assertFalse(diff_rows(old, old))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import io
+import numpy as np
+import pandas as pd
+from modules.schema import CsvSchema, TIMESTAMP_COLUMN, fits_float32
+
+DATA = (b"DATE,TIME,PI-501,FIC-502,TI-503,\n"
+        b"11/13/2023,12:08:28 PM,-12.499997,0.500324,26,\n"
+        b"11/13/2023,12:10:29 PM,199.590873,0.500124,27,\n")
+
+DATA_COLUMNS = pd.read_csv(io.BytesIO(DATA), nrows=0).columns
+
+class TestCsvSchema(unittest.TestCase):
+    def setUp(self):
+        self.schema = CsvSchema.infer(pd.read_csv(io.BytesIO(DATA)))
+
+    def test_infer(self):
+        self.assertEqual(self.schema.dtypes, {
+            'DATE': 'str', 'TIME': 'str', 'PI-501': 'float64',
+            'FIC-502': 'float32', 'TI-503': 'int32'})
+        self.assertEqual(self.schema.decimals, {'FIC-502': 6})
+        self.assertTrue(self.schema.timestamp)
+
+    def test_read_csv(self):
+        df = self.schema.read_csv(io.BytesIO(DATA))
+        self.assertEqual(list(df.columns), [TIMESTAMP_COLUMN, 'PI-501', 'FIC-502', 'TI-503'])
+        self.assertEqual(df[TIMESTAMP_COLUMN].iloc[0], pd.Timestamp('2023-11-13 12:08:28'))
+        self.assertEqual(df['FIC-502'].dtype, np.float32)
+        self.assertEqual(df.attrs['decimals'], {'FIC-502': 6})
+
+    def test_round_trip(self):
+        restored = CsvSchema.from_dict(self.schema.to_dict())
+        self.assertEqual(restored.dtypes, self.schema.dtypes)
+        self.assertEqual(restored.decimals, self.schema.decimals)
+        self.assertTrue(restored.timestamp)
+
+    def test_schema_without_decimals_reads_float64(self):
+        state = self.schema.to_dict()
+        del state['decimals']
+        restored = CsvSchema.from_dict(state)
+        self.assertEqual(restored.dtypes['FIC-502'], 'float64')
+
+    def test_float32_column_widens_when_values_no_longer_fit(self):
+        tail = (b"11/13/2023,12:12:30 PM,1.5,0.500324,28,\n"
+                b"11/13/2023,12:14:31 PM,1.5,199.590873,28,\n")
+        df = self.schema.read_csv(io.BytesIO(tail), header=None, names=list(DATA_COLUMNS))
+        self.assertEqual(df['FIC-502'].dtype, np.float64)
+        self.assertEqual(df['FIC-502'].iloc[1], 199.590873)
+        self.assertEqual(self.schema.dtypes['FIC-502'], 'float64')
+        self.assertEqual(self.schema.decimals, {})
+
+        df = self.schema.read_csv(io.BytesIO(DATA))
+        self.assertEqual(df['FIC-502'].dtype, np.float64)
+
+    def test_fits_float32(self):
+        self.assertTrue(fits_float32(np.array([0.500324, 26.5, np.nan])))
+        self.assertFalse(fits_float32(np.array([199.590873])))
+
+if __name__ == '__main__':
+    unittest.main()
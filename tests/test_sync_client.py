@@ -0,0 +1,88 @@
+import unittest
+import gzip
+import json
+import numpy as np
+import pandas as pd
+from unittest.mock import MagicMock
+from modules.sync_client import BatchSyncClient, BULK_UPDATE_PATH, encode_rows, encode_updates
+
+class TestBatchSyncClient(unittest.TestCase):
+    def setUp(self):
+        self.client = BatchSyncClient("http://api.test/", "key", max_rows=2)
+        self.client.session.post = MagicMock()
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_batches_by_row_count(self):
+        rows = [{"A": i} for i in range(5)]
+        batches = list(self.client.iter_batches(rows))
+        self.assertEqual([len(b) for b in batches], [2, 2, 1])
+
+    def test_batches_by_payload_bytes(self):
+        self.client.max_rows = 100
+        self.client.max_bytes = 20
+        rows = [{"A": "x" * 8} for _ in range(3)]
+        batches = list(self.client.iter_batches(rows))
+        self.assertEqual([len(b) for b in batches], [1, 1, 1])
+
+    def test_send_rows_compressed(self):
+        df = pd.DataFrame({'A': [1, 2, 3], 'B': ['a', 'b', 'c']})
+
+        sent = self.client.send_rows("file-1", df)
+
+        self.assertEqual(sent, 3)
+        self.assertEqual(self.client.session.post.call_count, 2)
+        args, kwargs = self.client.session.post.call_args_list[0]
+        self.assertEqual(args[0], f"http://api.test{BULK_UPDATE_PATH}")
+        self.assertEqual(kwargs['headers']['Content-Encoding'], 'gzip')
+        payload = json.loads(gzip.decompress(kwargs['data']))
+        self.assertEqual(payload['file_id'], "file-1")
+        self.assertEqual(payload['rows'], [{'A': 1, 'B': 'a'}, {'A': 2, 'B': 'b'}])
+        self.assertNotIn('op', payload)
+
+    def test_float32_is_encoded_short(self):
+        df = pd.DataFrame({'A': [0.500324]}, dtype='float32')
+        self.assertEqual(encode_rows(df), [b'{"A": 0.500324}'])
+        df.attrs['decimals'] = {'A': 6}
+        self.assertEqual(encode_rows(df), [b'{"A": 0.500324}'])
+
+    def test_missing_values_encode_as_null(self):
+        df = pd.DataFrame({
+            'f': [1.5, np.nan, np.inf],
+            'i': pd.array([1, None, 3], dtype='Int64'),
+            't': pd.to_datetime(['2023-11-13 12:08:28', None, '2023-11-14 00:00:00']),
+            'o': pd.Series([np.int64(7), pd.NaT, 'x'], dtype=object),
+            'b': [True, False, True],
+        })
+
+        payloads = encode_rows(df)
+
+        def strict(constant):
+            raise ValueError(constant)
+        rows = [json.loads(payload, parse_constant=strict) for payload in payloads]
+        self.assertEqual(rows[0], {'f': 1.5, 'i': 1, 't': '2023-11-13 12:08:28', 'o': 7, 'b': True})
+        self.assertEqual(rows[1], {'f': None, 'i': None, 't': None, 'o': None, 'b': False})
+        self.assertEqual(rows[2]['f'], None)
+        self.assertEqual(rows[2]['t'], '2023-11-14 00:00:00')
+
+    def test_frame_encoding_matches_json_dumps(self):
+        df = pd.DataFrame({'DATE': ['11/13/2023'], 'PI-501': [-12.499997], 'N': [3],
+                           'é': ['ü']})
+        self.assertEqual(encode_rows(df),
+                         [json.dumps(row).encode('utf-8') for row in df.to_dict('records')])
+        self.assertEqual(encode_updates(df, [4]),
+                         [json.dumps({'row_index': 4, 'data': df.to_dict('records')[0]})
+                          .encode('utf-8')])
+
+    def test_send_updates(self):
+        df = pd.DataFrame({'A': [7]})
+
+        self.client.send_batch("file-1", encode_updates(df, [4]), op='update')
+
+        payload = json.loads(gzip.decompress(self.client.session.post.call_args.kwargs['data']))
+        self.assertEqual(payload['op'], 'update')
+        self.assertEqual(payload['rows'], [{'row_index': 4, 'data': {'A': 7}}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock
+import requests
+from modules.outbox import Outbox
+from modules.sync_client import CloudSync
+from modules.sync_engine import AsyncOutboxSender
+from benchmarks.stub_server import StubServer
+from tests.helpers import FakeSettings
+
+class TestAsyncOutboxSender(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.outbox = Outbox(os.path.join(self.temp_dir, "outbox.db"))
+
+    def tearDown(self):
+        self.outbox.close()
+        shutil.rmtree(self.temp_dir)
+
+    def wait_until(self, condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_peek_skips_rows_in_flight(self):
+        self.outbox.append("a", "file-a", [b'{"A": 1}', b'{"A": 2}'])
+        self.outbox.append("b", "file-b", [b'{"B": 1}'])
+        first = self.outbox.peek(max_rows=1)
+
+        second = self.outbox.peek(max_rows=1, after={"file-a": first[2][-1]})
+        third = self.outbox.peek(after={"file-a": second[2][-1]})
+
+        self.assertEqual(second[0], "file-a")
+        self.assertEqual(second[3], [b'{"A": 2}'])
+        self.assertEqual(third[0], "file-b")
+
+    def test_requests_overlap_against_stub_server(self):
+        server = StubServer(delay=0.2).start()
+        settings = FakeSettings(api_url=server.url, api_key="key", sync_batch_rows=1,
+                                sync_in_flight=4)
+        sync = CloudSync(settings, self.outbox)
+        try:
+            self.outbox.append("a", "file-a", [b'{"A": %d}' % i for i in range(8)])
+            start = time.monotonic()
+            sync.start()
+            self.wait_until(lambda: self.outbox.pending() == 0)
+            elapsed = time.monotonic() - start
+        finally:
+            sync.stop()
+            server.stop()
+
+        # Eight 200 ms requests, four at a time
+        self.assertLess(elapsed, 1.2)
+        self.assertEqual(server.rows, 8)
+        self.assertEqual(sorted(seq for _, seq, _ in server.batches), list(range(1, 9)))
+        stats = sync.stats()
+        self.assertEqual(stats['requests'], 8)
+        self.assertEqual(stats['rows'], 8)
+        self.assertGreaterEqual(stats['latency_p50_ms'], 200)
+        self.assertGreater(stats['rows_per_s'], 0)
+
+    def test_acks_in_order_and_keeps_seq_on_retry(self):
+        self.outbox.append("a", "file-a", [b'1', b'2', b'3'])
+        calls = []
+        failed = threading.Event()
+        release = threading.Event()
+        sent = []
+
+        def send(file_id, payloads, op, seq):
+            calls.append((seq, payloads))
+            if seq == 1:
+                # The first batch is slow, then fails once
+                release.wait(5)
+                if not failed.is_set():
+                    failed.set()
+                    raise ConnectionError("boom")
+
+        sender = AsyncOutboxSender(self.outbox, send, max_in_flight=3, max_rows=1,
+                                   base_delay=0.01, max_delay=0.01,
+                                   on_sent=lambda file_id, count: sent.append(count))
+        sender.start()
+        try:
+            self.wait_until(lambda: len(calls) >= 3)
+            # Later batches are done, but stay queued until the first one is
+            self.assertEqual(self.outbox.pending(), 3)
+            release.set()
+            self.wait_until(lambda: self.outbox.pending() == 0)
+        finally:
+            sender.stop()
+
+        self.assertEqual([seq for seq, _ in calls], [1, 2, 3, 1])
+        self.assertEqual(sent, [1, 1, 1])
+        self.assertEqual(sender.stats.snapshot()['failures'], 1)
+
+    def test_retries_with_backoff(self):
+        self.outbox.append("a", "file-a", [b'1', b'2'])
+        send = MagicMock(side_effect=[ConnectionError("offline"), None])
+        on_error = MagicMock()
+        sender = AsyncOutboxSender(self.outbox, send, base_delay=0.01, max_delay=0.05,
+                                   on_error=on_error)
+        sender.start()
+        try:
+            self.wait_until(lambda: self.outbox.pending() == 0)
+        finally:
+            sender.stop()
+
+        self.assertEqual(send.call_count, 2)
+        on_error.assert_called_once()
+        self.assertEqual(sender.stats.snapshot()['failures'], 1)
+
+    def test_times_out_slow_requests(self):
+        self.outbox.append("a", "file-a", [b'1'])
+        errors = []
+        attempts = []
+
+        def send(file_id, payloads, op, seq):
+            attempts.append(seq)
+            if len(attempts) == 1:
+                time.sleep(0.5)
+
+        sender = AsyncOutboxSender(self.outbox, send, timeout=0.1, base_delay=0.01,
+                                   max_delay=0.01,
+                                   on_error=lambda file_id, error, delay: errors.append(error))
+        sender.start()
+        try:
+            self.wait_until(lambda: self.outbox.pending() == 0)
+        finally:
+            sender.stop()
+
+        self.assertIsInstance(errors[0], TimeoutError)
+        self.assertEqual(attempts, [1, 1])
+        self.assertEqual(sender.stats.snapshot()['timeouts'], 1)
+
+    def test_seq_continues_after_restart(self):
+        seqs = []
+        for _ in range(2):
+            self.outbox.append("a", "file-a", [b'1'])
+            sender = AsyncOutboxSender(self.outbox, lambda file_id, payloads, op, seq:
+                                       seqs.append(seq))
+            sender.start()
+            try:
+                self.wait_until(lambda: self.outbox.pending() == 0)
+            finally:
+                sender.stop()
+
+        self.assertEqual(seqs, [1, 2])
+        self.assertEqual(self.outbox.sequences(), {'file-a': 2})
+
+    def test_resent_batch_keeps_rows_and_seq(self):
+        self.outbox.append("a", "file-a", [b'1', b'2', b'3'])
+        # Taken by a sender that stopped before the batch was acknowledged
+        self.assertEqual(self.outbox.take(max_rows=2)[4], 1)
+        calls = []
+        sender = AsyncOutboxSender(self.outbox, lambda file_id, payloads, op, seq:
+                                   calls.append((seq, payloads)), max_rows=1)
+        sender.start()
+        try:
+            self.wait_until(lambda: self.outbox.pending() == 0)
+        finally:
+            sender.stop()
+
+        self.assertEqual(calls, [(1, [b'1', b'2']), (2, [b'3'])])
+
+    def test_refused_batch_is_parked(self):
+        self.outbox.append("a", "file-a", [b'1', b'2'])
+        response = requests.Response()
+        response.status_code = 400
+        calls, errors, sent = [], [], []
+
+        def send(file_id, payloads, op, seq):
+            calls.append(seq)
+            if seq == 1:
+                raise requests.HTTPError("400 Bad Request", response=response)
+
+        sender = AsyncOutboxSender(self.outbox, send, max_rows=1,
+                                   on_sent=lambda file_id, count: sent.append(count),
+                                   on_error=lambda file_id, error, delay: errors.append(delay))
+        sender.start()
+        try:
+            self.wait_until(lambda: self.outbox.pending() == 0)
+        finally:
+            sender.stop()
+
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(errors, [None])
+        self.assertEqual(sent, [1])
+        self.assertEqual(self.outbox.parked("a"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import os
+import tempfile
+from modules.tail_reader import CsvTailReader
+
+class TestCsvTailReader(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary CSV file with a trailing comma like the historian exports
+        self.temp_dir = tempfile.mkdtemp()
+        self.csv_file = os.path.join(self.temp_dir, "test.csv")
+        self.write("A,B,\n1,a,\n2,b,\n3,c,\n")
+
+        self.reader = CsvTailReader(self.csv_file)
+        self.reader.resync()
+
+    def tearDown(self):
+        # Clean up
+        if os.path.exists(self.csv_file):
+            os.remove(self.csv_file)
+        os.rmdir(self.temp_dir)
+
+    def write(self, text, mode='w'):
+        with open(self.csv_file, mode, newline='') as f:
+            f.write(text)
+
+    def test_initial_state(self):
+        self.assertEqual(self.reader.row_count, 3)
+        self.assertEqual(self.reader.offset, os.path.getsize(self.csv_file))
+        self.assertEqual(list(self.reader.columns)[:2], ['A', 'B'])
+
+    def test_read_appended_rows(self):
+        self.write("4,d,\n5,e,\n", mode='a')
+
+        new_rows = self.reader.read_new_rows()
+        self.assertEqual(len(new_rows), 2)
+        self.assertEqual(list(new_rows['A']), [4, 5])
+        self.assertEqual(list(new_rows.index), [3, 4])
+        self.assertEqual(self.reader.row_count, 5)
+
+        # Nothing new on the next read
+        self.assertEqual(len(self.reader.read_new_rows()), 0)
+
+    def test_partial_line_is_deferred(self):
+        self.write("4,d,\n5,", mode='a')
+
+        new_rows = self.reader.read_new_rows()
+        self.assertEqual(list(new_rows['A']), [4])
+
+        # The rest of the line arrives later
+        self.write("e,\n", mode='a')
+        new_rows = self.reader.read_new_rows()
+        self.assertEqual(list(new_rows['B']), ['e'])
+        self.assertEqual(self.reader.row_count, 5)
+
+    def test_truncation_resyncs(self):
+        self.write("A,B,\n1,a,\n")
+
+        new_rows = self.reader.read_new_rows()
+        self.assertEqual(len(new_rows), 0)
+        self.assertEqual(self.reader.row_count, 1)
+
+        self.write("2,b,\n", mode='a')
+        self.assertEqual(list(self.reader.read_new_rows()['A']), [2])
+
+    def test_rewrite_resyncs(self):
+        # Same size or larger, but the header changed
+        self.write("X,Y,\n1,a,\n2,b,\n3,c,\n4,d,\n")
+
+        new_rows = self.reader.read_new_rows()
+        self.assertEqual(list(new_rows.columns)[:2], ['X', 'Y'])
+        self.assertEqual(list(new_rows['X']), [4])
+        self.assertEqual(self.reader.row_count, 4)
+
+    def test_schema_is_cached(self):
+        self.write("1.5,e,\n", mode='a')
+        self.assertEqual(self.reader.schema.dtypes, {'A': 'int32', 'B': 'str'})
+
+        # 1.5 does not fit the cached int column, so the file is read again
+        df, resynced = self.reader.read_changes()
+        self.assertTrue(resynced)
+        self.assertEqual(list(df['A']), [1, 2, 3, 1.5])
+        self.assertEqual(self.reader.schema.dtypes['A'], 'float32')
+        self.assertNotIn('Unnamed: 2', df.columns)
+
+    def test_edit_past_prefix_resyncs(self):
+        reader = CsvTailReader(self.csv_file, prefix_size=6)
+        reader.resync()
+        self.write("4,d,\n", mode='a')
+        self.assertEqual(reader.read_changes()[1], False)
+
+        # Row 2 is edited in place, after the hashed prefix
+        self.write("A,B,\n1,a,\n22,b,\n3,c,\n4,d,\n")
+        df, resynced = reader.read_changes()
+        self.assertTrue(resynced)
+        self.assertEqual(list(df['A']), [1, 22, 3, 4])
+
+if __name__ == '__main__':
+    unittest.main()
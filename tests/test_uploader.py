@@ -0,0 +1,76 @@
+import unittest
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest.mock import MagicMock
+from modules.uploader import FileUploader, MultipartStream
+
+class TestFileUploader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "data.csv")
+        self.content = os.urandom(2500)
+        with open(self.file_path, 'wb') as f:
+            f.write(self.content)
+
+        self.session = MagicMock()
+        self.uploader = FileUploader("http://api.test", "key", chunk_size=1000,
+                                     chunk_threshold=2000, session=self.session)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_multipart_stream(self):
+        progress = []
+        body = MultipartStream(self.file_path, {'file_id': 'abc'}, block_size=700,
+                               on_progress=lambda sent, total: progress.append(sent))
+
+        data = b''
+        while True:
+            block = body.read(1024)
+            if not block:
+                break
+            data += block
+
+        self.assertEqual(len(data), body.len)
+        self.assertIn(b'name="file_id"\r\n\r\nabc\r\n', data)
+        self.assertIn(b'filename="data.csv"', data)
+        self.assertIn(self.content, data)
+        self.assertTrue(data.endswith(f'--{body.boundary}--\r\n'.encode()))
+        self.assertEqual(progress[-1], len(self.content))
+
+    def test_small_file_is_streamed(self):
+        self.uploader.chunk_threshold = 10000
+        self.uploader.upload(self.file_path, "abc", "csv")
+
+        args, kwargs = self.session.post.call_args
+        self.assertEqual(args[0], "http://api.test/api/file-management/files/")
+        self.assertIsInstance(kwargs['data'], MultipartStream)
+        self.assertTrue(kwargs['headers']['Content-Type'].startswith('multipart/form-data'))
+
+    def test_chunked_upload_resumes(self):
+        # The server already received the first chunk
+        self.session.get.return_value.status_code = 200
+        self.session.get.return_value.json.return_value = {'chunks': [0]}
+        progress = []
+
+        self.uploader.upload(self.file_path, "abc", "csv",
+                             on_progress=lambda sent, total: progress.append(sent))
+
+        urls = [call.args[0] for call in self.session.put.call_args_list]
+        self.assertEqual(urls, ["http://api.test/api/file-management/files/abc/chunks/1/",
+                                "http://api.test/api/file-management/files/abc/chunks/2/"])
+        last = self.session.put.call_args_list[-1].kwargs
+        self.assertEqual(last['data'], self.content[2000:])
+        self.assertEqual(last['headers']['Content-Range'], 'bytes 2000-2499/2500')
+        self.assertEqual(last['headers']['X-Chunk-SHA256'],
+                         hashlib.sha256(self.content[2000:]).hexdigest())
+
+        complete = self.session.post.call_args.kwargs['json']
+        self.assertEqual(complete['chunks'], 3)
+        self.assertEqual(complete['sha256'], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(progress, [1000, 2000, 2500])
+
+if __name__ == '__main__':
+    unittest.main()
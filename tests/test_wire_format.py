@@ -0,0 +1,90 @@
+import unittest
+import json
+import pandas as pd
+from modules.sync_client import BatchSyncClient, encode_rows
+from modules.wire_format import COLUMNAR_CONTENT_TYPE, MAGIC, decode_columnar, encode_columnar
+from benchmarks.stub_server import StubServer
+
+class TestColumnarFormat(unittest.TestCase):
+    def test_round_trip(self):
+        df = pd.DataFrame({
+            'DATE': ['11/13/2023', '11/13/2023', '11/14/2023'],
+            'PI-501': [0.1, float('nan'), 2.5],
+            'count': [1, 2, 3],
+            'mixed': [1.0, 'x', True],
+        })
+        payloads = encode_rows(df) + encode_rows([{'PI-501': None, 'extra': 2 ** 70}])
+
+        body = encode_columnar("file-1", payloads, seq=7)
+        decoded = decode_columnar(body)
+
+        self.assertTrue(body.startswith(MAGIC))
+        self.assertEqual(decoded['file_id'], "file-1")
+        self.assertEqual(decoded['seq'], 7)
+        self.assertEqual(decoded['op'], 'insert')
+        rows = decoded['rows']
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0], {'DATE': '11/13/2023', 'PI-501': 0.1, 'count': 1,
+                                   'mixed': 1.0, 'extra': None})
+        self.assertIsNone(rows[1]['PI-501'])
+        self.assertEqual(rows[1]['mixed'], 'x')
+        self.assertIs(rows[2]['mixed'], True)
+        self.assertIsNone(rows[3]['DATE'])
+        self.assertIsNone(rows[3]['PI-501'])
+        self.assertIsNone(rows[3]['count'])
+        self.assertEqual(rows[3]['extra'], 2 ** 70)
+        self.assertIs(type(rows[0]['count']), int)
+        types = {column['name']: column['type'] for column in decoded['columns']}
+        self.assertEqual(types, {'DATE': 'json', 'PI-501': 'f8', 'count': 'i8',
+                                 'mixed': 'json', 'extra': 'json'})
+
+    def test_tag_names_sent_once(self):
+        payloads = encode_rows([{'PI-501': 100.0 + i, 'FIC-502': 0.5} for i in range(100)])
+        body = encode_columnar("file-1", payloads)
+        self.assertEqual(body.count(b'FIC-502'), 1)
+        self.assertLess(len(body), sum(len(payload) for payload in payloads))
+
+class TestWireNegotiation(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_sends_columnar_inserts(self):
+        client = BatchSyncClient(self.server.url, "key", wire_format='columnar')
+        try:
+            client.send_batch("file-1", encode_rows([{'A': 1.5}, {'A': 2.5}]), seq=1)
+            client.send_batch("file-1", [json.dumps({'row_index': 0}).encode()], op='delete')
+        finally:
+            client.close()
+        self.assertEqual(self.server.rows, 3)
+        self.assertEqual(self.server.formats, {COLUMNAR_CONTENT_TYPE: 1, 'application/json': 1})
+        self.assertEqual(self.server.batches, [("file-1", 1, 2)])
+
+    def test_falls_back_to_json_on_415(self):
+        self.server.columnar = False
+        client = BatchSyncClient(self.server.url, "key", wire_format='columnar')
+        try:
+            client.send_batch("file-1", encode_rows([{'A': 1.5}]))
+            client.send_batch("file-1", encode_rows([{'A': 2.5}]))
+        finally:
+            client.close()
+        self.assertFalse(client.columnar)
+        self.assertEqual(self.server.rows, 2)
+        self.assertEqual(self.server.formats, {'application/json': 2})
+
+    def test_falls_back_to_per_row_endpoint_on_404(self):
+        self.server.bulk = False
+        client = BatchSyncClient(self.server.url, "key", wire_format='columnar')
+        try:
+            client.send_batch("file-1", encode_rows([{'A': 1.5}, {'A': 2.5}]), seq=1)
+            client.send_batch("file-1", encode_rows([{'A': 3.5}]), seq=2)
+        finally:
+            client.close()
+        self.assertFalse(client.bulk)
+        self.assertEqual(self.server.rows, 3)
+        self.assertEqual(self.server.formats, {'application/json': 3})
+
+if __name__ == '__main__':
+    unittest.main()
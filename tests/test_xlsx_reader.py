@@ -0,0 +1,155 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.workbook.defined_name import DefinedName
+from openpyxl.worksheet.table import Table
+from modules import xlsx_reader
+from modules.xlsx_reader import XlsxSheetReader, XlsxWorkbook
+
+class TestXlsxSheetReader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xlsx_file = os.path.join(self.temp_dir, "test.xlsx")
+        self.df = pd.DataFrame({
+            'A': [1, 2, None, 4, 5],
+            'B': ['a', 'b', None, 'd', 'e'],
+            'C': pd.to_datetime(['2023-11-13 12:08:28', '2023-11-13 12:10:29', None,
+                                 '2023-11-13 12:14:31', '2023-11-13 12:16:32']),
+            'D': [0.5, 1.25, None, 2.5, 3.75],
+        })
+        self.write(self.df)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, df):
+        with pd.ExcelWriter(self.xlsx_file) as writer:
+            pd.DataFrame({'X': [1]}).to_excel(writer, sheet_name='Notes', index=False)
+            df.to_excel(writer, sheet_name='Data', index=False)
+
+    def test_matches_read_excel(self):
+        df = XlsxSheetReader(self.xlsx_file, 'Data').read_rows()
+        expected = pd.read_excel(self.xlsx_file, sheet_name='Data')
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False, check_index_type=False)
+
+    def test_first_sheet_by_default(self):
+        self.assertEqual(list(XlsxSheetReader(self.xlsx_file).read_rows()['X']), [1])
+
+    def test_skips_to_start_row(self):
+        # A tiny block size makes the row scan cross block boundaries
+        original = xlsx_reader.BLOCK_SIZE
+        xlsx_reader.BLOCK_SIZE = 64
+        try:
+            df = XlsxSheetReader(self.xlsx_file, 'Data').read_rows(3)
+        finally:
+            xlsx_reader.BLOCK_SIZE = original
+        self.assertEqual(list(df.index), [3, 4])
+        self.assertEqual(list(df['B']), ['d', 'e'])
+
+    def test_scan_diff(self):
+        reader = XlsxSheetReader(self.xlsx_file, 'Data')
+        _, _, hashes, count = reader.scan(np.empty(0, dtype=np.uint64), keep_rows=False)
+        self.assertEqual(count, 5)
+
+        edited = self.df.copy()
+        edited.loc[1, 'B'] = 'x'
+        self.write(pd.concat([edited, pd.DataFrame({'A': [6], 'B': ['f']})], ignore_index=True))
+        frame, diff, hashes, count = reader.scan(hashes, count)
+        self.assertEqual((list(diff.updated), list(diff.inserted)), ([1], [5]))
+        self.assertEqual(frame.loc[1, 'B'], 'x')
+        self.assertEqual(count, 6)
+
+        self.write(edited.iloc[:4])
+        frame, diff, hashes, count = reader.scan(hashes, count)
+        self.assertEqual(list(diff.deleted), [4, 5])
+        self.assertEqual(len(frame), 0)
+
+    def test_fingerprint(self):
+        reader = XlsxSheetReader(self.xlsx_file, 'Data')
+        before = reader.fingerprint()
+        self.assertTrue(before.startswith('xl/worksheets/sheet2.xml,'))
+        self.write(self.df)
+        self.assertEqual(reader.fingerprint(), before)
+
+        self.write(self.df.iloc[:3])
+        self.assertNotEqual(reader.fingerprint(), before)
+
+    def test_tail_only(self):
+        reader = XlsxSheetReader(self.xlsx_file, 'Data')
+        frame, diff, hashes, count = reader.scan(None, 4, tail_only=True)
+        self.assertEqual(list(diff.inserted), [4])
+        self.assertIsNone(hashes)
+        self.assertEqual(count, 5)
+
+class TestWorkbookTargets(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xlsx_file = os.path.join(self.temp_dir, "targets.xlsx")
+        self.write(5)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, rows):
+        workbook = Workbook()
+        workbook.active.title = 'Notes'
+        workbook.active.append(['X'])
+        sheet = workbook.create_sheet('Data')
+        sheet.append(['Report'])
+        sheet.append([])
+        sheet.append(['A', 'B', 'C', 'Note'])
+        for i in range(rows):
+            sheet.append([i, f's{i}', i / 2, 'n'])
+        sheet.add_table(Table(displayName='Readings', ref=f'A3:C{3 + rows}'))
+        workbook.defined_names['Block'] = DefinedName('Block', attr_text="Data!$B$3:$C$6")
+        workbook.save(self.xlsx_file)
+
+    def scan_all(self, readers, hashes=None):
+        scans = [reader.begin_scan(None if hashes is None else hashes[i])
+                 for i, reader in enumerate(readers)]
+        readers[0].workbook.run(scans)
+        return [scan.result() for scan in scans]
+
+    def test_named_range_and_table(self):
+        table = XlsxSheetReader(self.xlsx_file, 'Readings').read_rows()
+        self.assertEqual(list(table.columns), ['A', 'B', 'C'])
+        self.assertEqual(list(table['B']), ['s0', 's1', 's2', 's3', 's4'])
+
+        block = XlsxSheetReader(self.xlsx_file, 'block').read_rows()
+        self.assertEqual(list(block.columns), ['B', 'C'])
+        self.assertEqual(list(block['C']), [0, 0.5, 1])
+
+    def test_one_pass_feeds_every_target(self):
+        workbook = XlsxWorkbook(self.xlsx_file)
+        readers = [XlsxSheetReader(self.xlsx_file, target, workbook)
+                   for target in ('Readings', 'Block', 'Notes')]
+        streamed = []
+        original = workbook.stream_rows
+        workbook.stream_rows = lambda stream, first_row: (
+            streamed.append(stream.name) or original(stream, first_row))
+        results = self.scan_all(readers, [np.empty(0, dtype=np.uint64)] * 3)
+        self.assertEqual(sorted(streamed), ['xl/worksheets/sheet1.xml', 'xl/worksheets/sheet2.xml'])
+        self.assertEqual([count for _, _, _, count in results], [5, 3, 0])
+
+        # Each target diffs against its own hashes
+        self.write(6)
+        hashes = [result[2] for result in results]
+        results = self.scan_all(readers, hashes)
+        self.assertEqual(list(results[0][1].inserted), [5])
+        self.assertFalse(results[1][1])
+
+    def test_unknown_target_fails_alone(self):
+        workbook = XlsxWorkbook(self.xlsx_file)
+        readers = [XlsxSheetReader(self.xlsx_file, target, workbook)
+                   for target in ('Missing', 'Readings')]
+        scans = [reader.begin_scan() for reader in readers]
+        workbook.run(scans)
+        self.assertRaises(ValueError, scans[0].result)
+        self.assertEqual(scans[1].result()[3], 5)
+
+if __name__ == '__main__':
+    unittest.main()
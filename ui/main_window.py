@@ -1,5 +1,7 @@
-from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QPushButton, QLabel, QTextEdit
+from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QPushButton, QLabel
 from PySide6.QtCore import Qt
+from modules.log_view import LogView
+from modules.metrics_panel import MetricsPanel
 
 class Ui_MainWindow:
     def setupUi(self, MainWindow):
@@ -20,6 +22,17 @@ class Ui_MainWindow:
         self.status_label.setAlignment(Qt.AlignCenter)
         self.verticalLayout.addWidget(self.status_label)
         
+        # Create throughput label
+        self.counters_label = QLabel(self.centralwidget)
+        self.counters_label.setObjectName("counters_label")
+        self.counters_label.setAlignment(Qt.AlignCenter)
+        self.verticalLayout.addWidget(self.counters_label)
+
+        # Create rows/s and lag panel
+        self.metrics_panel = MetricsPanel(self.centralwidget)
+        self.metrics_panel.setObjectName("metrics_panel")
+        self.verticalLayout.addWidget(self.metrics_panel)
+        
         # Create buttons layout
         self.buttons_layout = QVBoxLayout()
         self.buttons_layout.setObjectName("buttons_layout")
@@ -38,10 +51,9 @@ class Ui_MainWindow:
         
         self.verticalLayout.addLayout(self.buttons_layout)
         
-        # Create log text area
-        self.log_text = QTextEdit(self.centralwidget)
+        # Create log view (bounded ring buffer, refreshed a few times a second)
+        self.log_text = LogView(self.centralwidget)
         self.log_text.setObjectName("log_text")
-        self.log_text.setReadOnly(True)
         self.verticalLayout.addWidget(self.log_text)
         
         # Set central widget